@@ -0,0 +1,229 @@
+"""Кэш уровней доступа пользователей к проектам с инвалидацией между процессами приложения"""
+import logging
+import time
+import uuid
+from typing import Callable, Protocol
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models import ProjectGrantModel, ProjectModel
+from app.models.grant import GrantLevel
+from app.pg_notify import PostgresNotifyChannel
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY, через который процессы приложения сообщают об изменении доступов
+POSTGRES_CHANNEL = "lyrics_access_invalidations"
+# Порядок доступов пользователя к одному проекту, действует первый: активный, из них - последний активированный
+GRANT_PRIORITY = (ProjectGrantModel.is_active.desc(), ProjectGrantModel.created_at.desc())
+
+
+class ProjectAccess(BaseModel):
+    """Доступ пользователя к существующему проекту"""
+
+    is_owner: bool
+    # Уровень доступа последнего активированного кода, в том числе отозванного
+    grant_level: GrantLevel | None = None
+    is_grant_active: bool = False
+
+    @property
+    def level(self) -> GrantLevel | None:
+        """Действующий уровень доступа: у владельца GrantLevel.READ_WRITE, None - доступа нет"""
+        if self.is_owner:
+            return GrantLevel.READ_WRITE
+        if self.is_grant_active:
+            return self.grant_level
+        return None
+
+
+class AccessInvalidation(BaseModel):
+    """Сообщение об изменении доступа к проекту"""
+
+    # None - мог измениться доступ к любому проекту, например, канал переподключился после обрыва
+    project_id: uuid.UUID | None
+    # None - изменился доступ всех пользователей проекта, например, проект удален
+    user_id: uuid.UUID | None = None
+
+
+InvalidationHandler = Callable[[AccessInvalidation], None]
+
+
+class InvalidationChannel(Protocol):
+    """Канал, которым сообщение об изменении доступа доставляется обработчику каждого процесса приложения"""
+
+    async def start(self, handler: InvalidationHandler) -> None:
+        """Начать доставку сообщений обработчику"""
+
+    async def publish(self, invalidation: AccessInvalidation) -> None:
+        """Опубликовать сообщение"""
+
+    async def close(self) -> None:
+        """Прекратить доставку сообщений"""
+
+
+class InMemoryInvalidationChannel:
+    """Канал внутри одного процесса: для тестов и запуска приложения в один процесс.
+    Каналы с общим множеством обработчиков handlers имитируют несколько процессов"""
+
+    def __init__(self, handlers: set[InvalidationHandler] | None = None):
+        self._handlers = handlers if handlers is not None else set()
+        self._handler: InvalidationHandler | None = None
+
+    async def start(self, handler: InvalidationHandler) -> None:
+        """Начать доставку сообщений обработчику"""
+        self._handler = handler
+        self._handlers.add(handler)
+
+    async def publish(self, invalidation: AccessInvalidation) -> None:
+        """Передать сообщение всем обработчикам"""
+        for handler in list(self._handlers):
+            handler(invalidation)
+
+    async def close(self) -> None:
+        """Прекратить доставку сообщений"""
+        if self._handler is not None:
+            self._handlers.discard(self._handler)
+        self._handler = None
+
+
+class PostgresInvalidationChannel:
+    """Канал через LISTEN/NOTIFY Postgres: сообщение любого процесса приложения доходит до всех процессов.
+    Сообщения за время обрыва соединения теряются, поэтому после переподключения обработчик получает
+    сообщение об изменении доступа ко всем проектам"""
+
+    def __init__(self, database_url: str, channel: str = POSTGRES_CHANNEL):
+        self._channel = PostgresNotifyChannel(database_url, channel)
+        self._handler: InvalidationHandler | None = None
+
+    async def start(self, handler: InvalidationHandler) -> None:
+        """Подключиться и подписаться на канал"""
+        self._handler = handler
+        await self._channel.start(self._on_payload, self._on_reconnect)
+
+    async def publish(self, invalidation: AccessInvalidation) -> None:
+        """Отправить сообщение в канал"""
+        await self._channel.notify(invalidation.model_dump_json())
+
+    async def close(self) -> None:
+        """Отписаться от канала и закрыть соединение"""
+        await self._channel.close()
+        self._handler = None
+
+    def _on_payload(self, payload: str) -> None:
+        """Передать сообщение из канала обработчику"""
+        if self._handler is None:
+            return
+        try:
+            invalidation = AccessInvalidation.model_validate_json(payload)
+        except ValueError:
+            logger.exception("Некорректное сообщение в канале %s", self._channel.channel)
+            return
+        self._handler(invalidation)
+
+    def _on_reconnect(self) -> None:
+        """Сбросить доступ ко всем проектам: сообщения за время обрыва могли потеряться"""
+        if self._handler is not None:
+            self._handler(AccessInvalidation(project_id=None))
+
+
+async def load_project_access(
+    user_id: uuid.UUID, project_id: uuid.UUID, db_session: AsyncSession
+) -> ProjectAccess | None:
+    """Доступ пользователя к проекту одним запросом
+
+    :return: None - проект не найден
+    """
+    result = await db_session.execute(
+        select(ProjectModel.owner_user_id, ProjectGrantModel.level, ProjectGrantModel.is_active)
+        .outerjoin(
+            ProjectGrantModel,
+            (ProjectGrantModel.project_id == ProjectModel.project_id) & (ProjectGrantModel.user_id == user_id),
+        )
+        .where(ProjectModel.project_id == project_id)
+        .order_by(*GRANT_PRIORITY)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    owner_user_id, grant_level, is_grant_active = row
+    return ProjectAccess(
+        is_owner=owner_user_id == user_id, grant_level=grant_level, is_grant_active=bool(is_grant_active)
+    )
+
+
+class ProjectAccessCache:
+    """Кэш доступа пользователей к проектам. Доступ меняется только при активации кода, отзыве, изменении уровня,
+    выходе из проекта и удалении проекта - роутеры вызывают invalidate после commit, и сообщение об изменении
+    через канал получают все процессы приложения. Время жизни записи ограничивает устаревание, если сообщение
+    не дошло. До start (скрипты, тесты без lifespan) сообщения доставляются только этому процессу"""
+
+    def __init__(self, max_size: int, ttl_seconds: float, timer: Callable[[], float] = time.monotonic):
+        self._cache: TTLCache[tuple[uuid.UUID, uuid.UUID], ProjectAccess] = TTLCache(
+            max_size=max_size, ttl_seconds=ttl_seconds, timer=timer
+        )
+        self._channel: InvalidationChannel = InMemoryInvalidationChannel()
+        # Увеличивается при каждой инвалидации, чтобы не сохранить доступ, загруженный до нее
+        self._generation = 0
+
+    async def start(self, channel: InvalidationChannel) -> None:
+        """Переключиться на канал между процессами"""
+        await channel.start(self._evict)
+        self._channel = channel
+
+    async def close(self) -> None:
+        """Закрыть канал и очистить кэш"""
+        await self._channel.close()
+        self._channel = InMemoryInvalidationChannel()
+        self._cache.clear()
+
+    async def get(self, user_id: uuid.UUID, project_id: uuid.UUID, db_session: AsyncSession) -> ProjectAccess | None:
+        """Доступ пользователя к проекту из кэша или из базы данных
+
+        :return: None - проект не найден, отсутствие проекта не кэшируется
+        """
+        key = (user_id, project_id)
+        access = self._cache.get(key)
+        if access is not None:
+            return access
+        generation = self._generation
+        access = await load_project_access(user_id, project_id, db_session)
+        if access is not None and generation == self._generation:
+            self._cache.set(key, access)
+        return access
+
+    async def invalidate(self, project_id: uuid.UUID, user_id: uuid.UUID | None = None) -> None:
+        """Сбросить доступ пользователя (или всех пользователей) к проекту во всех процессах.
+        Ошибка канала не прерывает изменение, которое уже сохранено"""
+        invalidation = AccessInvalidation(project_id=project_id, user_id=user_id)
+        self._evict(invalidation)
+        try:
+            await self._channel.publish(invalidation)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Ошибка публикации инвалидации доступа к проекту %s", project_id)
+
+    def _evict(self, invalidation: AccessInvalidation) -> None:
+        """Удалить записи, которых касается сообщение"""
+        self._generation += 1
+        if invalidation.project_id is None:
+            self._cache.clear()
+        elif invalidation.user_id is None:
+            self._cache.pop_where(lambda key: key[1] == invalidation.project_id)
+        else:
+            self._cache.pop((invalidation.user_id, invalidation.project_id))
+
+
+def create_invalidation_channel() -> InvalidationChannel:
+    """Канал инвалидации из настроек"""
+    if settings.access_cache_backend == "postgres":
+        return PostgresInvalidationChannel(settings.database_url)
+    return InMemoryInvalidationChannel()
+
+
+project_access_cache = ProjectAccessCache(
+    max_size=settings.access_cache_size, ttl_seconds=settings.access_cache_ttl_seconds
+)
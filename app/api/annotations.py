@@ -1,21 +1,27 @@
 """Аннотации для зависимостей и валидации"""
+import datetime
 from typing import Annotated
 
 from fastapi import Depends, Query
 
 from app.api.dependencies.dependencies import (
+    ProjectVersion,
     get_grant_code_by_id,
     get_project_by_id,
     get_project_by_id_and_grant,
     get_project_by_id_and_owner,
+    get_project_version,
     get_text_access_level,
     get_text_by_id,
     get_text_by_id_and_grant,
     get_text_by_id_and_owner,
+    get_text_version,
+    get_text_with_access_level,
     get_tiptap_client,
 )
-from app.auth import get_current_user
-from app.models import ProjectGrantCodeModel, ProjectModel, TextModel, UserModel
+from app.auth import AuthContext, get_auth_context
+from app.grant_utils import ProjectExpand, ProjectFields
+from app.models import ProjectGrantCodeModel, ProjectModel, TextModel
 from app.models.grant import GrantLevel
 from app.tiptap_utils import TipTapClient
 
@@ -23,10 +29,19 @@ ProjectAnnotation = Annotated[ProjectModel, Depends(get_project_by_id)]
 OwnProjectAnnotation = Annotated[ProjectModel, Depends(get_project_by_id_and_owner)]
 OwnOrGrantProjectAnnotation = Annotated[ProjectModel, Depends(get_project_by_id_and_grant)]
 WordAnnotation = Annotated[str, Query(description="слово", min_length=3, max_length=33)]
-CurrentUserAnnotation = Annotated[UserModel, Depends(get_current_user)]
+CurrentUserAnnotation = Annotated[AuthContext, Depends(get_auth_context)]
 TextAnnotation = Annotated[TextModel, Depends(get_text_by_id)]
 OwnTextAnnotation = Annotated[TextModel, Depends(get_text_by_id_and_owner)]
 OwnOrGrantTextAnnotation = Annotated[TextModel, Depends(get_text_by_id_and_grant)]
 TextGrantLevelAnnotation = Annotated[GrantLevel, Depends(get_text_access_level)]
+TextWithAccessLevelAnnotation = Annotated[tuple[TextModel, GrantLevel | None], Depends(get_text_with_access_level)]
+ProjectVersionAnnotation = Annotated[ProjectVersion, Depends(get_project_version)]
+TextVersionAnnotation = Annotated[tuple[str, datetime.datetime], Depends(get_text_version)]
 ProjectGrantCodeAnnotation = Annotated[ProjectGrantCodeModel, Depends(get_grant_code_by_id)]
 TipTapClientAnnotation = Annotated[TipTapClient, Depends(get_tiptap_client)]
+ProjectFieldsAnnotation = Annotated[
+    ProjectFields, Query(description="full - проект со всеми связанными данными, summary - только поля проекта")
+]
+ProjectExpandAnnotation = Annotated[
+    list[ProjectExpand] | None, Query(description="Связанные данные, которые добавляются к fields=summary")
+]
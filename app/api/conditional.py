@@ -0,0 +1,48 @@
+"""Условные GET-запросы: слабые ETag, If-None-Match и If-Modified-Since"""
+import datetime
+import email.utils
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def weak_etag(*parts: object) -> str:
+    """Слабый ETag из частей версии ресурса"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def validator_headers(etag: str, last_modified: datetime.datetime | None = None) -> dict[str, str]:
+    """Заголовки ETag и Last-Modified, время в базе данных хранится в UTC без часового пояса"""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = email.utils.format_datetime(
+            last_modified.replace(tzinfo=datetime.timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime.datetime | None = None) -> bool:
+    """Есть ли у клиента актуальная версия ресурса. If-None-Match сравнивается слабым сравнением
+    и важнее If-Modified-Since, который учитывается с точностью до секунды"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified.replace(tzinfo=datetime.timezone.utc, microsecond=0) <= since
+
+
+def not_modified_response(etag: str, last_modified: datetime.datetime | None = None) -> Response:
+    """Ответ 304 без тела с актуальными ETag и Last-Modified"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, last_modified))
@@ -1,17 +1,18 @@
 """Зависимости для валидации данных в пути запроса"""
-from typing import Annotated, cast
+import datetime
+from typing import Annotated, NamedTuple, cast
 
 from fastapi import Depends, HTTPException, Path, status
 from pydantic import UUID4
-from sqlalchemy import ColumnElement, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import ColumnElement, and_, func, select
+from sqlalchemy.orm import contains_eager, selectinload
 
+from app.access_cache import project_access_cache
 from app.api.dependencies.core import DBSessionDep
-from app.auth import get_current_user
-from app.config import settings
-from app.models import ProjectGrantCodeModel, ProjectGrantModel, ProjectModel, TextModel, UserModel
+from app.auth import AuthContext, get_auth_context
+from app.models import MusicModel, ProjectGrantCodeModel, ProjectGrantModel, ProjectModel, TextModel
 from app.models.grant import GrantLevel
-from app.tiptap_utils import TipTapClient
+from app.tiptap_utils import TipTapClient, tiptap_client
 
 
 async def get_project_by_id(
@@ -33,7 +34,7 @@ async def get_project_by_id(
 
 async def get_project_by_id_and_owner(
     project_id: Annotated[UUID4, Path(description="Идентификатор проекта")],
-    current_user: Annotated[UserModel, Depends(get_current_user)],
+    current_user: Annotated[AuthContext, Depends(get_auth_context)],
     db_session: DBSessionDep,
 ) -> ProjectModel:
     """Получить проект по его идентификатору и проверить, что пользователь является владельцем"""
@@ -46,32 +47,78 @@ async def get_project_by_id_and_owner(
 
 async def get_project_by_id_and_grant(
     project_id: Annotated[UUID4, Path(description="Идентификатор проекта")],
-    current_user: Annotated[UserModel, Depends(get_current_user)],
+    current_user: Annotated[AuthContext, Depends(get_auth_context)],
     db_session: DBSessionDep,
 ) -> ProjectModel:
     """Получить проект по его идентификатору и проверить, что пользователь имеет доступ к проекту"""
+    access = await project_access_cache.get(current_user.user_id, project_id, db_session)
+    if access is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+    if access.level is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не имеете доступа к проекту")
+
+    return await get_project_by_id(project_id, db_session)
+
+
+class ProjectVersion(NamedTuple):
+    """Версия проекта для условных запросов"""
+
+    version: str
+    # ключ объекта музыки на s3, подписанная ссылка на который входит в ответ
+    music_key: str | None
+
+
+async def get_project_version(
+    project_id: Annotated[UUID4, Path(description="Идентификатор проекта")],
+    current_user: Annotated[AuthContext, Depends(get_auth_context)],
+    db_session: DBSessionDep,
+) -> ProjectVersion:
+    """Получить версию проекта для условных запросов и проверить, что пользователь имеет доступ к проекту.
+    Версия и доступ определяются одним запросом без загрузки вариантов текста и музыки"""
+    active_grant_level = (
+        select(ProjectGrantModel.level)
+        .where(ProjectGrantModel.project_id == ProjectModel.project_id)
+        .where(ProjectGrantModel.user_id == current_user.user_id)
+        .where(ProjectGrantModel.is_active.is_(True))
+        .limit(1)
+        .scalar_subquery()
+    )
+    # pylint: disable=not-callable
+    texts_count = select(func.count()).where(TextModel.project_id == ProjectModel.project_id).scalar_subquery()
+    # pylint: enable=not-callable
+    texts_updated_at = (
+        select(func.max(TextModel.updated_at)).where(TextModel.project_id == ProjectModel.project_id).scalar_subquery()
+    )
     result = await db_session.execute(
-        select(ProjectModel)
-        .options(selectinload(ProjectModel.music), selectinload(ProjectModel.texts))
+        select(
+            ProjectModel.owner_user_id,
+            active_grant_level,
+            # время изменения хранится с точностью до секунды не во всех базах данных
+            ProjectModel.updated_at,
+            ProjectModel.name,
+            ProjectModel.description,
+            texts_count,
+            texts_updated_at,
+            MusicModel.music_id,
+            MusicModel.status,
+            MusicModel.bpm,
+            MusicModel.custom_bpm,
+            MusicModel.content_hash,
+            MusicModel.url,
+        )
+        .outerjoin(MusicModel, MusicModel.project_id == ProjectModel.project_id)
         .where(ProjectModel.project_id == project_id)
     )
-    project = result.scalars().first()
+    version = result.first()
 
-    if project is None:
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
 
-    if project.owner_user_id != current_user.user_id:
-        result = await db_session.execute(
-            select(ProjectGrantModel)
-            .where(ProjectGrantModel.project_id == project_id)
-            .where(ProjectGrantModel.user_id == current_user.user_id)
-            .where(ProjectGrantModel.is_active.is_(True))
-        )
-        grant_code = result.scalars().first()
-        if grant_code is None:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не имеете доступа к проекту")
+    owner_user_id, grant_level, *_, music_key = version
+    if owner_user_id != current_user.user_id and grant_level is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не имеете доступа к проекту")
 
-    return project
+    return ProjectVersion(version="|".join(map(str, version)), music_key=music_key)
 
 
 async def get_text_by_id(
@@ -90,60 +137,87 @@ async def get_text_by_id(
     return text
 
 
-async def get_text_by_id_and_owner(
+async def get_text_with_access_level(
     text_id: Annotated[UUID4, Path(description="Идентификатор текста")],
-    current_user: Annotated[UserModel, Depends(get_current_user)],
+    current_user: Annotated[AuthContext, Depends(get_auth_context)],
     db_session: DBSessionDep,
+) -> tuple[TextModel, GrantLevel | None]:
+    """Получить вариант текста с его проектом и уровень доступа пользователя к нему одним запросом.
+    Зависимости текстов получают результат из кэша зависимостей FastAPI, поэтому запрос выполняется один раз
+
+    :return: текст и уровень доступа: GrantLevel.READ_WRITE у владельца, уровень активного доступа
+    у остальных пользователей, None - доступа нет
+    """
+    result = await db_session.execute(
+        select(TextModel, ProjectGrantModel.level)
+        .join(TextModel.project)
+        .outerjoin(
+            ProjectGrantModel,
+            and_(
+                ProjectGrantModel.project_id == TextModel.project_id,
+                ProjectGrantModel.user_id == current_user.user_id,
+                ProjectGrantModel.is_active.is_(True),
+            ),
+        )
+        .options(contains_eager(TextModel.project))
+        .where(cast(ColumnElement[bool], TextModel.text_id == text_id))
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Текст не найден")
+
+    text, grant_level = row
+    if text.project.owner_user_id == current_user.user_id:
+        return text, GrantLevel.READ_WRITE
+
+    return text, grant_level
+
+
+async def get_text_by_id_and_owner(
+    text_with_level: Annotated[tuple[TextModel, GrantLevel | None], Depends(get_text_with_access_level)],
+    current_user: Annotated[AuthContext, Depends(get_auth_context)],
 ) -> TextModel:
     """Получить текст по его идентификатору и проверить, что пользователь является владельцем"""
-    text = await get_text_by_id(text_id, db_session)
-    project = text.project
-    if project.owner_user_id != current_user.user_id:
+    text, _ = text_with_level
+    if text.project.owner_user_id != current_user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не владелец проекта")
 
     return text
 
 
 async def get_text_access_level(
-    text: Annotated[TextModel, Depends(get_text_by_id)],
-    current_user: Annotated[UserModel, Depends(get_current_user)],
-    db_session: DBSessionDep,
+    text_with_level: Annotated[tuple[TextModel, GrantLevel | None], Depends(get_text_with_access_level)],
 ) -> GrantLevel | None:
     """Получить значение уровеня доступа к тексту
 
     :return: уровень доступа к тексту, GrantLevel.READ_ONLY или GrantLevel.READ_WRITE
     если пользователь владелец, то возвращается GrantLevel.READ_WRITE
     """
-    if text.project.owner_user_id == current_user.user_id:
-        return GrantLevel.READ_WRITE
-
-    result = await db_session.execute(
-        select(ProjectGrantModel)
-        .where(ProjectGrantModel.project_id == text.project_id)
-        .where(ProjectGrantModel.user_id == current_user.user_id)
-        .where(ProjectGrantModel.is_active.is_(True))
-    )
-    grant = result.scalars().first()
-    if grant is None:
-        return None
-
-    return grant.level
+    _, grant_level = text_with_level
+    return grant_level
 
 
 async def get_text_by_id_and_grant(
-    text_id: Annotated[UUID4, Path(description="Идентификатор текста")],
-    grant_level: Annotated[GrantLevel, Depends(get_text_access_level)],
-    current_user: Annotated[UserModel, Depends(get_current_user)],
-    db_session: DBSessionDep,
+    text_with_level: Annotated[tuple[TextModel, GrantLevel | None], Depends(get_text_with_access_level)],
 ) -> TextModel:
     """Получить текст по его идентификатору и проверить, что пользователь имеет доступ к проекту"""
-    text = await get_text_by_id(text_id, db_session)
+    text, grant_level = text_with_level
     if grant_level is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не имеете доступа к проекту")
 
     return text
 
 
+async def get_text_version(
+    text: Annotated[TextModel, Depends(get_text_by_id_and_grant)],
+) -> tuple[str, datetime.datetime]:
+    """Получить версию и время изменения текста для условных запросов и проверить, что пользователь имеет доступ
+    к проекту"""
+    # время изменения хранится с точностью до секунды не во всех базах данных
+    return f"{text.text_id}|{text.updated_at}|{text.name}", text.updated_at
+
+
 async def get_grant_code_by_id(
     grant_code_id: Annotated[UUID4, Path(description="Идентификатор кода доступа")], db_session: DBSessionDep
 ) -> ProjectGrantCodeModel:
@@ -163,5 +237,5 @@ async def get_grant_code_by_id(
 
 
 async def get_tiptap_client() -> TipTapClient:
-    """Получить клиент TipTap"""
-    return TipTapClient(app_id=settings.tiptap_app_id, api_secret=settings.tiptap_api_secret)
+    """Получить общий клиент TipTap"""
+    return tiptap_client
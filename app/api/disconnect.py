@@ -0,0 +1,36 @@
+"""Отмена обработки запроса, если клиент отключился, не дождавшись ответа"""
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+T = TypeVar("T")
+
+# Код nginx для запроса, клиент которого закрыл соединение, ответ клиенту не отправляется
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Дождаться отключения клиента. Вызывается после чтения тела запроса"""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Выполнить awaitable и отменить его, если клиент отключится раньше, например, закроет вкладку
+    или отправит следующий запрос автодополнения
+
+    :raises HTTPException: 499, если клиент отключился
+    """
+    task = asyncio.ensure_future(awaitable)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Клиент отключился")
+    return task.result()
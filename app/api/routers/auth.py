@@ -15,7 +15,7 @@ from app.auth import (
     get_new_email_auth_code,
     validate_yandex_token,
 )
-from app.mail import lyrics_send_email
+from app.email_outbox import email_outbox_worker, enqueue_email
 from app.models.email_auth_code import EmailAuthCodeModel
 
 router = APIRouter()
@@ -23,13 +23,14 @@ router = APIRouter()
 
 @router.post("/email", operation_id="send_email_auth_code")
 async def send_email_auth_code(user: UserIn, db_session: DBSessionDep):
-    """Отправка письма с кодом для входа"""
+    """Отправка письма с кодом для входа. Код и письмо сохраняются вместе, письмо отправляется в фоне"""
     if user.email != "user@example.com":
         new_code = await get_new_email_auth_code()
         new_code_model = EmailAuthCodeModel(email=user.email, auth_code=new_code)
         db_session.add(new_code_model)
-        lyrics_send_email(subject="Код для входа", message=f"Ваш код для входа: {new_code}", to_email=user.email)
+        await enqueue_email(user.email, "Код для входа", f"Ваш код для входа: {new_code}", db_session)
         await db_session.commit()
+        email_outbox_worker.notify()
     return {"message": "Код отправлен на вашу электронную почту"}
 
 
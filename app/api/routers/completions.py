@@ -1,8 +1,11 @@
 """Прокси над LLM для автодополнения"""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, status
 
+from app.api.annotations import CurrentUserAnnotation
+from app.api.disconnect import cancel_on_disconnect
 from app.api.schemas import CompletionIn, CompletionOut
 from app.llm import get_llm_lyrics_completions
+from app.status_codes import LLM_TIMEOUT
 
 router = APIRouter()
 
@@ -10,11 +13,19 @@ router = APIRouter()
 @router.post(
     "/",
     summary="Продолжить текст",
+    responses=LLM_TIMEOUT,
     operation_id="create_completion",
 )
-async def create_completion(completion_input: CompletionIn) -> list[CompletionOut]:
-    """Продолжить текст"""
+async def create_completion(
+    completion_input: CompletionIn, current_user: CurrentUserAnnotation, request: Request
+) -> list[CompletionOut]:
+    """Продолжить текст. Запрос к LLM отменяется, если клиент отключился, не дождавшись ответа"""
     if not completion_input.text:
         return []
-    completions = get_llm_lyrics_completions(completion_input.text)
+    try:
+        completions = await cancel_on_disconnect(
+            request, get_llm_lyrics_completions(completion_input.text, current_user.user_id)
+        )
+    except TimeoutError as exc:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="LLM не ответила вовремя") from exc
     return [CompletionOut(completion=completion) for completion in completions]
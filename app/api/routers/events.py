@@ -0,0 +1,49 @@
+"""Лента изменений проектов пользователя (Server-Sent Events)"""
+import asyncio
+import uuid
+from typing import AsyncIterator
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.api.annotations import CurrentUserAnnotation
+from app.api.dependencies.core import DBSessionDep
+from app.change_feed import change_feed
+from app.config import settings
+
+router = APIRouter()
+
+
+async def stream_change_events(user_id: uuid.UUID, heartbeat_seconds: float) -> AsyncIterator[str]:
+    """События изменений проектов пользователя в формате text/event-stream.
+    Подписка снимается, когда клиент отключается и Starlette отменяет генератор"""
+    with change_feed.subscribe(user_id) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"event: {event.entity.value}\ndata: {event.model_dump_json(exclude={'user_ids'})}\n\n"
+
+
+@router.get(
+    "/",
+    summary="Подписаться на изменения проектов",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+    operation_id="get_change_events",
+)
+async def get_change_events(current_user: CurrentUserAnnotation, db_session: DBSessionDep) -> StreamingResponse:
+    """Поток Server-Sent Events об изменениях проектов, к которым у пользователя есть доступ:
+    проекта (event: project), вариантов текста (text), музыки (music) и доступов (grant).
+    В data событие в JSON с полями entity, action (created/updated/deleted), project_id и text_id.
+    Событие только сообщает об изменении, актуальные данные нужно запросить соответствующим эндпоинтом"""
+    # соединение с БД не удерживается на все время подписки
+    await db_session.close()
+    return StreamingResponse(
+        stream_change_events(current_user.user_id, settings.change_feed_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
+from app.access_cache import project_access_cache
 from app.api.annotations import (
     CurrentUserAnnotation,
     OwnOrGrantProjectAnnotation,
@@ -15,6 +16,7 @@ from app.api.annotations import (
 )
 from app.api.dependencies.core import DBSessionDep
 from app.api.schemas import ProjectGrant, ProjectGrantCode
+from app.change_feed import ChangeAction, ChangeEntity, publish_change
 from app.models.grant import GrantLevel, ProjectGrantCodeModel, ProjectGrantModel
 from app.status_codes import GRANT_CODE_NOT_FOUND, PROJECT_NOT_FOUND, PROJECT_NOT_OWNER
 
@@ -112,6 +114,8 @@ async def activate_project_share_code(
             await db_session.delete(old_grant)
 
     await db_session.commit()
+    # Старые доступы уже удалены: сбросить кэш до второго commit, который может не пройти
+    await project_access_cache.invalidate(grant_code.project_id, current_user.user_id)
 
     grant = ProjectGrantModel(
         project_id=grant_code.project_id,
@@ -131,6 +135,8 @@ async def activate_project_share_code(
         ) from exc
 
     await db_session.refresh(grant)
+    await project_access_cache.invalidate(grant.project_id, current_user.user_id)
+    await publish_change(db_session, ChangeEntity.GRANT, ChangeAction.CREATED, grant.project_id)
 
     user_email = current_user.email
 
@@ -208,6 +214,10 @@ async def revoke_project_access(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не имеет доступа к проекту")
     project_grant.is_active = False
     await db_session.commit()
+    await project_access_cache.invalidate(project.project_id, project_grant.user_id)
+    await publish_change(
+        db_session, ChangeEntity.GRANT, ChangeAction.DELETED, project.project_id, user_ids=[project_grant.user_id]
+    )
     return ProjectGrant(
         grant_code_id=project_grant.grant_code_id,
         project_id=project_grant.project_id,
@@ -307,6 +317,8 @@ async def update_project_access(
     project_grant.level = new_level
     project_grant.is_active = True
     await db_session.commit()
+    await project_access_cache.invalidate(project.project_id, project_grant.user_id)
+    await publish_change(db_session, ChangeEntity.GRANT, ChangeAction.UPDATED, project.project_id)
     return ProjectGrant(
         grant_code_id=project_grant.grant_code_id,
         project_id=project_grant.project_id,
@@ -346,3 +358,7 @@ async def leave_project(
 
     await db_session.delete(project_grant)
     await db_session.commit()
+    await project_access_cache.invalidate(project.project_id, current_user.user_id)
+    await publish_change(
+        db_session, ChangeEntity.GRANT, ChangeAction.DELETED, project.project_id, user_ids=[current_user.user_id]
+    )
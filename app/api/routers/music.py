@@ -1,31 +1,89 @@
 """CRUD музыки"""
+import uuid
+from hashlib import sha256
 from tempfile import NamedTemporaryFile
 from typing import Annotated
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, File, Header, HTTPException, Path, Query, Response, UploadFile, status
+from sqlalchemy import select
 
 from app.api.annotations import CurrentUserAnnotation, OwnOrGrantProjectAnnotation, OwnProjectAnnotation
 from app.api.dependencies.core import DBSessionDep
-from app.api.schemas import MusicOut, ProjectOut, TextVariantCompact
+from app.api.schemas import MusicBeatsOut, MusicJobOut, MusicOut, ProjectOut, TextVariantCompact
+from app.change_feed import ChangeAction, ChangeEntity, publish_change
 from app.grant_utils import get_grant_level_by_user_and_project
-from app.models import MusicModel
-from app.music_utils import get_file_bpm, get_song_duration
-from app.s3_helpers import delete, generate_presigned_url, upload
-from app.status_codes import MUSIC_NOT_FOUND, PROJECT_NOT_FOUND
+from app.models import MusicJobModel, MusicModel
+from app.models.music import MusicStatus
+from app.music_jobs import enqueue_music_job, music_job_workers
+from app.music_storage import (
+    apply_analysis,
+    get_beat_grid,
+    get_cached_analysis,
+    get_music_key,
+    get_waveform_peaks,
+    is_music_object_referenced,
+    lock_music_objects,
+    release_music,
+    save_analysis,
+)
+from app.music_utils import (
+    PEAKS_LEVELS,
+    PEAKS_SAMPLES_PER_PEAK,
+    AnalysisQueueFullError,
+    UploadTooLargeError,
+    WaveformPeaks,
+    analyze_music,
+    spool_upload,
+)
+from app.s3_helpers import generate_presigned_url, upload_file
+from app.status_codes import (
+    MUSIC_ANALYSIS_BUSY,
+    MUSIC_BEATS_NOT_FOUND,
+    MUSIC_JOB_NOT_FOUND,
+    MUSIC_NOT_FOUND,
+    MUSIC_PEAKS_NOT_FOUND,
+    MUSIC_TOO_LARGE,
+    PROJECT_NOT_FOUND,
+)
 
 router = APIRouter()
 
+ContentHashQuery = Annotated[
+    str | None,
+    Query(alias="hash", description="content_hash музыки. Если совпадает с текущим, ответ кэшируется на год"),
+]
+
+
+def get_cache_headers(etag: str, content_hash: str | None, music_hash: str | None) -> dict[str, str]:
+    """Заголовки кэширования производных данных музыки"""
+    return {
+        "ETag": etag,
+        # по адресу без хэша после замены музыки отдаются другие данные, поэтому такой ответ каждый раз перепроверяется
+        "Cache-Control": (
+            "private, max-age=31536000, immutable" if content_hash == music_hash else "private, no-cache"
+        ),
+    }
+
+
+def is_not_modified(etag: str, if_none_match: str | None) -> bool:
+    """Совпадает ли ETag с одним из перечисленных в If-None-Match"""
+    return if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]
+
 
 @router.post(
     "/{project_id}",
     summary="Загрузить музыку в проект",
-    responses=PROJECT_NOT_FOUND,
+    responses={**PROJECT_NOT_FOUND, **MUSIC_TOO_LARGE, **MUSIC_ANALYSIS_BUSY},
     operation_id="upload_music",
 )
 async def upload_music(
     project: OwnProjectAnnotation,
     music: Annotated[UploadFile, File(description="Файл музыки")],
     db_session: DBSessionDep,
+    background: Annotated[
+        bool,
+        Query(description="Сохранить файл и вернуть задачу фоновой обработки, не дожидаясь анализа"),
+    ] = False,
 ) -> MusicOut:
     """Загрузка музыки в проект"""
 
@@ -34,40 +92,100 @@ async def upload_music(
 
     with NamedTemporaryFile(suffix=f"{music.filename[music.filename.rindex('.'):]}") as temp_file:
         temp_file_path = temp_file.name
-        music_content = await music.read()
-        temp_file.write(music_content)
-        temp_file.flush()
+        content_hash = sha256()
+        try:
+            await spool_upload(music, temp_file, content_hash=content_hash)
+        except UploadTooLargeError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Файл превышает допустимый размер"
+            ) from exc
+        content_hash_hex = content_hash.hexdigest()
 
-        duration_seconds = await get_song_duration(temp_file_path)
-        bpm = int(await get_file_bpm(temp_file_path) or -1)
+        analysis = await get_cached_analysis(content_hash_hex, db_session)
+        if analysis is None and not background:
+            try:
+                analysis = await analyze_music(temp_file_path)
+            except AnalysisQueueFullError as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервер перегружен анализом музыки, повторите попытку позже",
+                    headers={"Retry-After": "30"},
+                ) from exc
+            except TimeoutError:
+                # анализ не уложился в таймаут, музыка дообрабатывается в фоне с повторами
+                analysis = None
+            else:
+                await save_analysis(content_hash_hex, analysis, db_session)
 
-    project_id = project.project_id
+        if project.music is not None:
+            await release_music(project.music, db_session)
+            await db_session.commit()
+            await db_session.refresh(project)
 
-    if project.music is not None:
-        await delete(project.music.url)
-        await db_session.delete(project.music)
-        await db_session.commit()
-        await db_session.refresh(project)
-
-    key = f"{project_id}/music/{music.filename}"
-    await upload(
-        key=key,
-        bytes_data=music_content,
-    )
+        key = get_music_key(project.project_id, music.filename, content_hash_hex)
+        # блокировка до коммита новой музыки: общий объект не удалится между проверкой и добавлением ссылки
+        await lock_music_objects([key], db_session)
+        if not await is_music_object_referenced(key, db_session):
+            await upload_file(key=key, file_path=temp_file_path)
 
-    project.music = MusicModel(
-        url=key,
-        duration_seconds=duration_seconds or -1,
-        bpm=bpm,
-    )
+    project.music = MusicModel(url=key, content_hash=content_hash_hex)
+    job = None
+    if analysis is None:
+        project.music.duration_seconds = -1
+        project.music.status = MusicStatus.PENDING
+        await db_session.flush()
+        job = await enqueue_music_job(project.music, db_session)
+    else:
+        apply_analysis(project.music, analysis)
     await db_session.commit()
+    if job is not None:
+        music_job_workers.notify()
+    await publish_change(db_session, ChangeEntity.MUSIC, ChangeAction.CREATED, project.project_id)
 
     url = await generate_presigned_url(key)
 
     return MusicOut(
         url=url,
-        duration_seconds=duration_seconds or -1,
-        bpm=bpm,
+        duration_seconds=project.music.duration_seconds,
+        bpm=project.music.bpm,
+        codec=project.music.codec,
+        bitrate=project.music.bitrate,
+        sample_rate=project.music.sample_rate,
+        channels=project.music.channels,
+        status=project.music.status,
+        content_hash=project.music.content_hash,
+        job_id=job.job_id if job is not None else None,
+    )
+
+
+@router.get(
+    "/{project_id}/jobs/{job_id}",
+    summary="Получить состояние фоновой обработки музыки",
+    responses={**PROJECT_NOT_FOUND, **MUSIC_JOB_NOT_FOUND},
+    operation_id="get_music_job",
+)
+async def get_music_job(
+    project: OwnOrGrantProjectAnnotation,
+    job_id: Annotated[uuid.UUID, Path(description="Идентификатор задачи")],
+    db_session: DBSessionDep,
+) -> MusicJobOut:
+    """Получение состояния задачи фоновой обработки музыки проекта"""
+    job = await db_session.scalar(
+        select(MusicJobModel)
+        .join(MusicModel, MusicModel.music_id == MusicJobModel.music_id)
+        .where(MusicJobModel.job_id == job_id)
+        .where(MusicModel.project_id == project.project_id)
+    )
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+
+    return MusicJobOut(
+        job_id=job.job_id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
     )
 
 
@@ -89,9 +207,97 @@ async def get_music(project: OwnOrGrantProjectAnnotation) -> MusicOut:
         duration_seconds=project.music.duration_seconds,
         bpm=project.music.bpm,
         custom_bpm=project.music.custom_bpm,
+        codec=project.music.codec,
+        bitrate=project.music.bitrate,
+        sample_rate=project.music.sample_rate,
+        channels=project.music.channels,
+        status=project.music.status,
+        content_hash=project.music.content_hash,
     )
 
 
+@router.get(
+    "/{project_id}/peaks",
+    summary="Получить пики формы волны музыки",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"application/octet-stream": {}},
+            "description": "Пары (min, max) в int8 подряд, значение 127 соответствует полной амплитуде",
+        },
+        **PROJECT_NOT_FOUND,
+        **MUSIC_NOT_FOUND,
+        **MUSIC_PEAKS_NOT_FOUND,
+    },
+    response_class=Response,
+    operation_id="get_music_peaks",
+)
+async def get_music_peaks(
+    project: OwnOrGrantProjectAnnotation,
+    db_session: DBSessionDep,
+    level: Annotated[
+        int,
+        Query(
+            ge=0,
+            lt=PEAKS_LEVELS,
+            description=f"Уровень детализации: 0 - {PEAKS_SAMPLES_PER_PEAK} сэмплов на пик, "
+            "каждый следующий уровень в 2 раза грубее",
+        ),
+    ] = 0,
+    content_hash: ContentHashQuery = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Получение пиков формы волны музыки проекта для отрисовки без скачивания файла"""
+    if project.music is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Музыка не найдена")
+
+    music_hash = project.music.content_hash
+    peaks = await get_waveform_peaks(music_hash, db_session) if music_hash is not None else None
+    if peaks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пики формы волны не найдены")
+
+    etag = f'"{music_hash}-{level}"'
+    headers = {
+        **get_cache_headers(etag, content_hash, music_hash),
+        "X-Peaks-Sample-Rate": str(peaks.sample_rate),
+        "X-Samples-Per-Peak": str(WaveformPeaks.samples_per_peak(level)),
+        "X-Peaks-Count": str(WaveformPeaks.level_count(peaks.count, level)),
+    }
+    if is_not_modified(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=peaks.level(level), media_type="application/octet-stream", headers=headers)
+
+
+@router.get(
+    "/{project_id}/beats",
+    summary="Получить сетку долей музыки",
+    responses={**PROJECT_NOT_FOUND, **MUSIC_NOT_FOUND, **MUSIC_BEATS_NOT_FOUND},
+    response_model=MusicBeatsOut,
+    operation_id="get_music_beats",
+)
+async def get_music_beats(
+    project: OwnOrGrantProjectAnnotation,
+    db_session: DBSessionDep,
+    response: Response,
+    content_hash: ContentHashQuery = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> MusicBeatsOut | Response:
+    """Получение моментов долей и сильных долей музыки проекта для выравнивания строк текста"""
+    if project.music is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Музыка не найдена")
+
+    await db_session.refresh(project.music, attribute_names=["beats", "downbeats"])
+    beats = get_beat_grid(project.music.beats, project.music.downbeats)
+    if beats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сетка долей не найдена")
+
+    etag = f'"{project.music.content_hash}-beats"'
+    headers = get_cache_headers(etag, content_hash, project.music.content_hash)
+    if is_not_modified(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return MusicBeatsOut(bpm=project.music.bpm, beats=beats.beats, downbeats=beats.downbeats)
+
+
 @router.patch(
     "/{project_id}",
     summary="Изменить BPM у музыки",
@@ -121,8 +327,15 @@ async def set_music_bpm(
         duration_seconds=project.music.duration_seconds,
         bpm=project.music.bpm,
         custom_bpm=project.music.custom_bpm,
+        codec=project.music.codec,
+        bitrate=project.music.bitrate,
+        sample_rate=project.music.sample_rate,
+        channels=project.music.channels,
+        status=project.music.status,
+        content_hash=project.music.content_hash,
     )
     await db_session.commit()
+    await publish_change(db_session, ChangeEntity.MUSIC, ChangeAction.UPDATED, project.project_id)
     return new_music
 
 
@@ -139,11 +352,10 @@ async def delete_music(
     if project.music is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Музыка не найдена")
 
-    await delete(project.music.url)
-
-    await db_session.delete(project.music)
+    await release_music(project.music, db_session)
     await db_session.commit()
     await db_session.refresh(project)
+    await publish_change(db_session, ChangeEntity.MUSIC, ChangeAction.DELETED, project.project_id)
 
     user_grant_level = await get_grant_level_by_user_and_project(
         user_id=current_user.user_id, project_id=project.project_id, db_session=db_session
@@ -1,21 +1,48 @@
 """CRUD проектов"""
-import itertools
+from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response, status
+from pydantic import UUID4
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
-from app.api.annotations import CurrentUserAnnotation, OwnOrGrantProjectAnnotation, OwnProjectAnnotation
+from app.access_cache import project_access_cache
+from app.api.annotations import (
+    CurrentUserAnnotation,
+    OwnProjectAnnotation,
+    ProjectExpandAnnotation,
+    ProjectFieldsAnnotation,
+    ProjectVersionAnnotation,
+    TipTapClientAnnotation,
+)
+from app.api.conditional import is_not_modified, not_modified_response, validator_headers, weak_etag
 from app.api.dependencies.core import DBSessionDep
 from app.api.schemas import MusicOut, ProjectBase, ProjectOut, TextVariantCompact
-from app.grant_utils import get_grant_level_by_user_and_project
+from app.change_feed import ChangeAction, ChangeEntity, get_project_audience, publish_change
+from app.grant_utils import (
+    ProjectExpand,
+    ProjectFields,
+    ProjectOwnership,
+    get_grant_level_by_user_and_project,
+    get_project_with_expand,
+    get_projects_with_grant_level,
+)
 from app.models import ProjectModel, TextModel
-from app.models.grant import ProjectGrantCodeModel, ProjectGrantModel
-from app.s3_helpers import delete, generate_presigned_url
-from app.status_codes import PROJECT_NO_PERMISSIONS, PROJECT_NOT_FOUND, PROJECT_NOT_OWNER
+from app.project_utils import decode_project_cursor, delete_projects, encode_project_cursor, sign_music_urls
+from app.s3_helpers import generate_presigned_url
+from app.status_codes import (
+    NOT_MODIFIED,
+    PROJECT_CURSOR_INVALID,
+    PROJECT_NO_PERMISSIONS,
+    PROJECT_NOT_FOUND,
+    PROJECT_NOT_OWNER,
+)
 
 router = APIRouter()
 
+# Заголовок с курсором следующей страницы списка проектов
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PROJECTS_MAX_LIMIT = 200
+
 
 @router.post("/", summary="Создать проект", operation_id="create_project")
 async def create_project(
@@ -60,8 +87,6 @@ async def create_project(
         music=None,
     )
 
-    await db_session.refresh(current_user)
-
     return project_out
 
 
@@ -86,6 +111,7 @@ async def update_project(
 
     await db_session.commit()
     await db_session.refresh(project)
+    await publish_change(db_session, ChangeEntity.PROJECT, ChangeAction.UPDATED, project.project_id)
 
     return ProjectOut(
         name=project.name,
@@ -105,67 +131,112 @@ async def update_project(
             )
             for text in project.texts
         ],
-        music=MusicOut(
-            url=await generate_presigned_url(project.music.url),
-            duration_seconds=project.music.duration_seconds,
-            bpm=project.music.bpm,
-            custom_bpm=project.music.custom_bpm,
-        )
-        if project.music
-        else None,
+        music=(
+            MusicOut(
+                url=await generate_presigned_url(project.music.url),
+                duration_seconds=project.music.duration_seconds,
+                bpm=project.music.bpm,
+                custom_bpm=project.music.custom_bpm,
+                codec=project.music.codec,
+                bitrate=project.music.bitrate,
+                sample_rate=project.music.sample_rate,
+                channels=project.music.channels,
+                status=project.music.status,
+                content_hash=project.music.content_hash,
+            )
+            if project.music
+            else None
+        ),
     )
 
 
-@router.get("/", summary="Получить список проектов", operation_id="get_projects")
-async def get_projects(db_session: DBSessionDep, current_user: CurrentUserAnnotation) -> list[ProjectOut]:
-    """Получить список проектов, на которые у пользователя есть доступ"""
-    query_grants = await db_session.execute(
-        select(ProjectModel)
-        .options(selectinload(ProjectModel.music), selectinload(ProjectModel.texts))
-        .join(ProjectGrantModel)
-        .where(ProjectGrantModel.user_id == current_user.user_id)
-        .where(ProjectGrantModel.is_active.is_(True))
-    )
-    projects_grants = query_grants.scalars().all()
-
-    query_ownership = await db_session.execute(
-        select(ProjectModel)
-        .options(selectinload(ProjectModel.music), selectinload(ProjectModel.texts))
-        .where(ProjectModel.owner_user_id == current_user.user_id)
+@router.get(
+    "/",
+    summary="Получить список проектов",
+    responses=PROJECT_CURSOR_INVALID,
+    operation_id="get_projects",
+)
+# pylint: disable=too-many-arguments
+async def get_projects(
+    db_session: DBSessionDep,
+    current_user: CurrentUserAnnotation,
+    response: Response,
+    limit: Annotated[int, Query(description="Количество проектов на странице", ge=1, le=PROJECTS_MAX_LIMIT)] = 50,
+    cursor: Annotated[str | None, Query(description="Курсор следующей страницы из заголовка X-Next-Cursor")] = None,
+    ownership: Annotated[
+        ProjectOwnership | None, Query(description="owned - только свои проекты, shared - только чужие с доступом")
+    ] = None,
+    has_music: Annotated[bool | None, Query(description="Только проекты с музыкой или только без нее")] = None,
+    name_prefix: Annotated[
+        str | None, Query(description="Начало названия проекта без учета регистра", max_length=255)
+    ] = None,
+    fields: ProjectFieldsAnnotation = ProjectFields.FULL,
+    expand: ProjectExpandAnnotation = None,
+) -> list[ProjectOut]:
+    """Получить страницу списка проектов, на которые у пользователя есть доступ, от недавно измененных к давним.
+    Если есть следующая страница, ее курсор возвращается в заголовке X-Next-Cursor.
+    С fields=summary варианты текста и музыка не загружаются и не возвращаются, если их нет в expand"""
+    expanded = set(ProjectExpand) if fields is ProjectFields.FULL else set(expand or ())
+    try:
+        after = decode_project_cursor(cursor) if cursor else None
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор") from error
+    projects = await get_projects_with_grant_level(
+        current_user.user_id,
+        db_session,
+        ownership=ownership,
+        has_music=has_music,
+        name_prefix=name_prefix,
+        after=after,
+        limit=limit + 1,
+        expand=expanded,
     )
-    projects_ownership = query_ownership.scalars().all()
+    if len(projects) > limit:
+        projects = projects[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_project_cursor(projects[-1][0])
 
+    music_urls = await sign_music_urls(project for project, _ in projects) if ProjectExpand.MUSIC in expanded else {}
     return [
         ProjectOut(
             name=project.name,
             description=project.description,
             owner_user_id=project.owner_user_id,
             is_owner=project.owner_user_id == current_user.user_id,
-            grant_level=await get_grant_level_by_user_and_project(
-                user_id=current_user.user_id, project_id=project.project_id, db_session=db_session
-            ),
+            grant_level=grant_level,
             created_at=project.created_at,
             updated_at=project.updated_at,
             project_id=project.project_id,
-            texts=[
-                TextVariantCompact(
-                    text_id=text.text_id,
-                    name=text.name,
-                    created_at=text.created_at,
-                    updated_at=text.updated_at,
+            texts=(
+                [
+                    TextVariantCompact(
+                        text_id=text.text_id,
+                        name=text.name,
+                        created_at=text.created_at,
+                        updated_at=text.updated_at,
+                    )
+                    for text in project.texts
+                ]
+                if ProjectExpand.TEXTS in expanded
+                else None
+            ),
+            music=(
+                MusicOut(
+                    url=music_urls[project.project_id],
+                    duration_seconds=project.music.duration_seconds,
+                    bpm=project.music.bpm,
+                    custom_bpm=project.music.custom_bpm,
+                    codec=project.music.codec,
+                    bitrate=project.music.bitrate,
+                    sample_rate=project.music.sample_rate,
+                    channels=project.music.channels,
+                    status=project.music.status,
+                    content_hash=project.music.content_hash,
                 )
-                for text in project.texts
-            ],
-            music=MusicOut(
-                url=await generate_presigned_url(project.music.url),
-                duration_seconds=project.music.duration_seconds,
-                bpm=project.music.bpm,
-                custom_bpm=project.music.custom_bpm,
-            )
-            if project.music
-            else None,
+                if project.project_id in music_urls
+                else None
+            ),
         )
-        for project in itertools.chain(projects_grants, projects_ownership)
+        for project, grant_level in projects
     ]
 
 
@@ -175,14 +246,44 @@ async def get_projects(db_session: DBSessionDep, current_user: CurrentUserAnnota
     responses={
         **PROJECT_NOT_FOUND,
         **PROJECT_NO_PERMISSIONS,
+        **NOT_MODIFIED,
     },
+    response_model=ProjectOut,
     operation_id="get_project",
 )
+# pylint: disable=too-many-arguments
 async def get_project(
-    project: OwnOrGrantProjectAnnotation, current_user: CurrentUserAnnotation, db_session: DBSessionDep
-) -> ProjectOut:
-    """Получить содержимое проекта"""
-    music = project.music
+    project_id: Annotated[UUID4, Path(description="Идентификатор проекта")],
+    version: ProjectVersionAnnotation,
+    request: Request,
+    response: Response,
+    current_user: CurrentUserAnnotation,
+    db_session: DBSessionDep,
+    fields: ProjectFieldsAnnotation = ProjectFields.FULL,
+    expand: ProjectExpandAnnotation = None,
+) -> ProjectOut | Response:
+    """Получить содержимое проекта. С fields=summary варианты текста и музыка не загружаются и не возвращаются,
+    если их нет в expand, и ссылка на музыку не подписывается.
+    Если ETag из If-None-Match совпадает с текущей версией проекта, возвращается 304 без загрузки проекта.
+    Подписанная ссылка на музыку входит в ETag: когда переиспользуемая ссылка подходит к концу срока действия
+    и подписывается заново, ETag меняется, и клиент не остается с просроченной ссылкой.
+    If-Modified-Since и Last-Modified не поддерживаются: ответ зависит от музыки, уровня доступа и срока действия
+    ссылки на музыку, у которых нет времени изменения"""
+    expanded = set(ProjectExpand) if fields is ProjectFields.FULL else set(expand or ())
+    music_url = (
+        await generate_presigned_url(version.music_key)
+        if version.music_key is not None and ProjectExpand.MUSIC in expanded
+        else None
+    )
+    etag = weak_etag(version.version, music_url, fields.value, *sorted(item.value for item in expanded))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
+
+    project = await get_project_with_expand(project_id, db_session, expanded)
+    if project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+    music = project.music if ProjectExpand.MUSIC in expanded else None
 
     user_grant_level = await get_grant_level_by_user_and_project(
         user_id=current_user.user_id, project_id=project.project_id, db_session=db_session
@@ -197,23 +298,35 @@ async def get_project(
         created_at=project.created_at,
         updated_at=project.updated_at,
         project_id=project.project_id,
-        texts=[
-            TextVariantCompact(
-                text_id=text.text_id,
-                name=text.name,
-                created_at=text.created_at,
-                updated_at=text.updated_at,
+        texts=(
+            [
+                TextVariantCompact(
+                    text_id=text.text_id,
+                    name=text.name,
+                    created_at=text.created_at,
+                    updated_at=text.updated_at,
+                )
+                for text in project.texts
+            ]
+            if ProjectExpand.TEXTS in expanded
+            else None
+        ),
+        music=(
+            MusicOut(
+                url=await generate_presigned_url(music.url),
+                duration_seconds=music.duration_seconds,
+                bpm=music.bpm,
+                custom_bpm=music.custom_bpm,
+                codec=music.codec,
+                bitrate=music.bitrate,
+                sample_rate=music.sample_rate,
+                channels=music.channels,
+                status=music.status,
+                content_hash=music.content_hash,
             )
-            for text in project.texts
-        ],
-        music=MusicOut(
-            url=await generate_presigned_url(project.music.url),
-            duration_seconds=music.duration_seconds,
-            bpm=music.bpm,
-            custom_bpm=music.custom_bpm,
-        )
-        if music
-        else None,
+            if music
+            else None
+        ),
     )
 
 
@@ -223,32 +336,54 @@ async def get_project(
     responses=PROJECT_NOT_FOUND,
     operation_id="delete_project",
 )
-async def delete_project(project: OwnProjectAnnotation, db_session: DBSessionDep):
+async def delete_project(
+    project: OwnProjectAnnotation, db_session: DBSessionDep, tiptap_client: TipTapClientAnnotation
+) -> None:
     """Удалить проект. Приводит к удалению всех текстов проекта, музыки, кодов доступа и прав."""
-    texts_query = await db_session.execute(select(TextModel).where(TextModel.project_id == project.project_id))
-    texts = texts_query.scalars().all()
-    for text in texts:
-        await db_session.delete(text)
-
-    if project.music:
-        await delete(project.music.url)
-        await db_session.delete(project.music)
-        await db_session.commit()
-        await db_session.refresh(project)
-
-    project_grants_query = await db_session.execute(
-        select(ProjectGrantModel).where(ProjectGrantModel.project_id == project.project_id)
-    )
-    project_grants = project_grants_query.scalars().all()
-    for grant in project_grants:
-        await db_session.delete(grant)
+    audience = await get_project_audience(project.project_id, db_session)
+    await delete_projects([project.project_id], db_session, tiptap_client)
+    await project_access_cache.invalidate(project.project_id)
+    await publish_change(db_session, ChangeEntity.PROJECT, ChangeAction.DELETED, project.project_id, user_ids=audience)
+
 
-    project_grant_codes_query = await db_session.execute(
-        select(ProjectGrantCodeModel).where(ProjectGrantCodeModel.project_id == project.project_id)
+@router.delete(
+    "/",
+    summary="Удалить несколько проектов. Уровень доступа: владелец всех проектов",
+    responses={
+        **PROJECT_NOT_FOUND,
+        **PROJECT_NOT_OWNER,
+    },
+    operation_id="delete_many_projects",
+)
+async def delete_many_projects(
+    project_ids: Annotated[
+        list[UUID4],
+        Query(alias="project_id", min_length=1, max_length=100, description="Идентификаторы проектов"),
+    ],
+    current_user: CurrentUserAnnotation,
+    db_session: DBSessionDep,
+    tiptap_client: TipTapClientAnnotation,
+) -> None:
+    """Удалить несколько проектов. Если хотя бы один проект не найден или принадлежит другому пользователю,
+    не удаляется ни один"""
+    owners = dict(
+        (
+            await db_session.execute(
+                select(ProjectModel.project_id, ProjectModel.owner_user_id).where(
+                    ProjectModel.project_id.in_(project_ids)
+                )
+            )
+        )
+        .tuples()
+        .all()
     )
-    project_grant_codes = project_grant_codes_query.scalars().all()
-    for grant_code in project_grant_codes:
-        await db_session.delete(grant_code)
+    if len(owners) != len(set(project_ids)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+    if any(owner_user_id != current_user.user_id for owner_user_id in owners.values()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не владелец проекта")
 
-    await db_session.delete(project)
-    await db_session.commit()
+    audiences = {project_id: await get_project_audience(project_id, db_session) for project_id in owners}
+    await delete_projects(owners, db_session, tiptap_client)
+    for project_id, audience in audiences.items():
+        await project_access_cache.invalidate(project_id)
+        await publish_change(db_session, ChangeEntity.PROJECT, ChangeAction.DELETED, project_id, user_ids=audience)
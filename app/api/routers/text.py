@@ -1,12 +1,25 @@
 """CRUD текстов"""
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from sqlalchemy import func, select
 
-from app.api.annotations import OwnOrGrantTextAnnotation, OwnTextAnnotation, TipTapClientAnnotation
+from app.api.annotations import (
+    OwnOrGrantTextAnnotation,
+    OwnTextAnnotation,
+    TextVersionAnnotation,
+    TipTapClientAnnotation,
+)
+from app.api.conditional import is_not_modified, not_modified_response, validator_headers, weak_etag
 from app.api.dependencies.core import DBSessionDep
 from app.api.schemas import TextVariant, TextVariantIn, TextVariantWithoutID
+from app.change_feed import ChangeAction, ChangeEntity, publish_change
 from app.models import TextModel
-from app.status_codes import CANNOT_REMOVE_SINGLE_TEXT, PROJECT_NOT_FOUND, TEXT_NOT_FOUND
+from app.status_codes import (
+    CANNOT_REMOVE_SINGLE_TEXT,
+    NOT_MODIFIED,
+    PROJECT_NOT_FOUND,
+    TEXT_NO_PERMISSIONS,
+    TEXT_NOT_FOUND,
+)
 
 router = APIRouter()
 
@@ -27,6 +40,9 @@ async def create_text(text_in: TextVariantIn, db_session: DBSessionDep) -> TextV
     await db_session.commit()
 
     await db_session.refresh(text_model)
+    await publish_change(
+        db_session, ChangeEntity.TEXT, ChangeAction.CREATED, text_model.project_id, text_id=text_model.text_id
+    )
 
     text_schema = TextVariant(
         text_id=text_model.text_id,
@@ -42,11 +58,24 @@ async def create_text(text_in: TextVariantIn, db_session: DBSessionDep) -> TextV
 @router.get(
     "/{text_id}",
     summary="Получить вариант текста",
-    responses=TEXT_NOT_FOUND,
+    responses={**TEXT_NOT_FOUND, **TEXT_NO_PERMISSIONS, **NOT_MODIFIED},
+    response_model=TextVariant,
     operation_id="get_text",
 )
-async def get_text(text: OwnOrGrantTextAnnotation) -> TextVariant:
-    """Получение варианта текста"""
+async def get_text(
+    text: OwnOrGrantTextAnnotation,
+    text_version: TextVersionAnnotation,
+    request: Request,
+    response: Response,
+) -> TextVariant | Response:
+    """Получение варианта текста. Текст и доступ к нему загружаются одним запросом.
+    Если версия клиента из If-None-Match или If-Modified-Since актуальна, возвращается 304"""
+    version, updated_at = text_version
+    etag = weak_etag(version)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+    response.headers.update(validator_headers(etag, updated_at))
+
     return TextVariant(
         text_id=text.text_id,
         name=text.name,
@@ -83,6 +112,9 @@ async def update_text(
 
     db_session.add(old_text)
     await db_session.commit()
+    await publish_change(
+        db_session, ChangeEntity.TEXT, ChangeAction.UPDATED, old_text.project_id, text_id=old_text.text_id
+    )
 
     return new_text_schema
 
@@ -110,3 +142,4 @@ async def delete_text(text: OwnTextAnnotation, db_session: DBSessionDep, tiptap_
 
     await db_session.delete(text)
     await db_session.commit()
+    await publish_change(db_session, ChangeEntity.TEXT, ChangeAction.DELETED, text.project_id, text_id=text.text_id)
@@ -1,18 +1,20 @@
 """Эндпоинты аутентификации"""
 import datetime
+import logging
 import uuid
 from typing import Annotated
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
-from sqlalchemy.orm import selectinload
 
-from app.api.annotations import TextAnnotation, TextGrantLevelAnnotation
+from app.api.annotations import TextWithAccessLevelAnnotation
 from app.api.dependencies.core import DBSessionDep
 from app.auth import Token, check_current_user, create_access_token
 from app.config import settings
-from app.models import TextModel
 from app.models.grant import GrantLevel
 from app.status_codes import TEXT_NO_PERMISSIONS
+from app.tiptap_webhooks import document_updates
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -26,8 +28,7 @@ router = APIRouter()
     operation_id="get_tiptap_token",
 )
 async def get_tiptap_access_token(
-    grant_level: TextGrantLevelAnnotation,
-    text_model: TextAnnotation,
+    text_with_level: TextWithAccessLevelAnnotation,
 ) -> Token:
     """Получение JWT токена для TipTap под конкретный текст.
     {
@@ -39,6 +40,7 @@ async def get_tiptap_access_token(
         "readonlyDocumentNames": [<text_id>] # если grant_level == "READ_ONLY", иначе [] (полный доступ)
     }
     """
+    text_model, grant_level = text_with_level
     if grant_level is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Вы не имеете доступа к тексту")
 
@@ -66,27 +68,10 @@ async def get_tiptap_access_token(
     operation_id="update_text_webhook",
 )
 async def update_document(json_body: Annotated[dict, Body], db_session: DBSessionDep) -> dict:
-    """Webhook, который вызывается TipTap после обновления текста"""
+    """Webhook, который вызывается TipTap после обновления текста. Время изменения текста и проекта
+    записывается в БД пачкой вместе с другими документами, ответ возвращается сразу"""
     text_id = uuid.UUID(json_body.get("name"), version=4)
-    # select text_model and project attribute
-    text_model = await db_session.get(
-        TextModel,
-        text_id,
-        options=[
-            selectinload(TextModel.project),
-        ],
-    )
-    if text_model is None:
-        return {"message": f"document {text_id} not found"}
-
-    new_updated_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
-    text_model.updated_at = new_updated_at
-    project_model = text_model.project
-    project_model.updated_at = new_updated_at
-
-    db_session.add(text_model)
-    await db_session.commit()
-
-    print(f"Обновлен текст {text_model.text_id} из TipTap:\n", json_body)
+    await document_updates.submit(text_id, db_session)
+    logger.debug("Webhook TipTap для документа %s", text_id)
 
     return {"message": "ok"}
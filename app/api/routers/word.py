@@ -1,11 +1,12 @@
 """Эндпоинты для получения мета информации о словах"""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, status
 
-from app.api.annotations import WordAnnotation
+from app.api.annotations import CurrentUserAnnotation, WordAnnotation
 from app.api.dependencies.core import DBSessionDep
+from app.api.disconnect import cancel_on_disconnect
 from app.api.schemas import WordMeaning
 from app.llm import get_llm_rhymes
-from app.status_codes import MEANING_NOT_FOUND
+from app.status_codes import LLM_TIMEOUT, MEANING_NOT_FOUND
 from app.word_utils import WordMeaningSource
 from app.word_utils import get_synonyms as get_synonyms_utils
 from app.word_utils import get_word_meanings as get_word_meanings_utils
@@ -38,8 +39,12 @@ async def get_synonyms(word: WordAnnotation) -> list[str]:
 @router.get(
     "/rhyming",
     summary="Получить рифмующиеся слова к слову",
+    responses=LLM_TIMEOUT,
     operation_id="get_word_rhyming",
 )
-async def get_rhyming(word: WordAnnotation) -> list[str]:
-    """Получить рифмующиеся слова к слову"""
-    return get_llm_rhymes(word=word)
+async def get_rhyming(word: WordAnnotation, current_user: CurrentUserAnnotation, request: Request) -> list[str]:
+    """Получить рифмующиеся слова к слову. Запрос к LLM отменяется, если клиент отключился, не дождавшись ответа"""
+    try:
+        return await cancel_on_disconnect(request, get_llm_rhymes(word=word, user_id=current_user.user_id))
+    except TimeoutError as exc:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="LLM не ответила вовремя") from exc
@@ -6,6 +6,8 @@ from fastapi import UploadFile
 from pydantic import UUID4, BaseModel, EmailStr, Field
 
 from app.models.grant import GrantLevel
+from app.models.music import MusicStatus
+from app.models.music_job import MusicJobStatus
 
 
 class TextVariantBase(BaseModel):
@@ -57,6 +59,37 @@ class MusicOut(MusicBase):
     duration_seconds: Annotated[float, Field(description="Длительность музыки в секундах")]
     bpm: Annotated[int | None, Field(description="BPM музыки определенный автоматически")]
     custom_bpm: Annotated[int | None, Field(description="BPM музыки установленный пользователем")] = None
+    codec: Annotated[str | None, Field(description="Аудиокодек")] = None
+    bitrate: Annotated[int | None, Field(description="Битрейт в бит/с")] = None
+    sample_rate: Annotated[int | None, Field(description="Частота дискретизации в Гц")] = None
+    channels: Annotated[int | None, Field(description="Количество каналов")] = None
+    status: Annotated[
+        MusicStatus,
+        Field(description="Состояние обработки. Пока музыка обрабатывается, длительность -1, а BPM не определен"),
+    ] = MusicStatus.READY
+    job_id: Annotated[UUID4 | None, Field(description="Идентификатор задачи фоновой обработки")] = None
+    content_hash: Annotated[str | None, Field(description="SHA-256 содержимого файла, меняется вместе с файлом")] = None
+
+
+class MusicBeatsOut(BaseModel):
+    """Схема сетки долей музыки"""
+
+    bpm: Annotated[int | None, Field(description="BPM музыки определенный автоматически")]
+    beats: Annotated[list[float], Field(description="Моменты долей в секундах от начала трека")]
+    downbeats: Annotated[
+        list[float], Field(description="Моменты сильных долей (начал тактов размера 4/4) в секундах от начала трека")
+    ]
+
+
+class MusicJobOut(BaseModel):
+    """Схема задачи фоновой обработки музыки"""
+
+    job_id: Annotated[UUID4, Field(description="Идентификатор задачи")]
+    status: Annotated[MusicJobStatus, Field(description="Состояние задачи")]
+    attempts: Annotated[int, Field(description="Количество попыток обработки")]
+    error: Annotated[str | None, Field(description="Ошибка последней попытки")] = None
+    created_at: Annotated[datetime.datetime, Field(description="Дата создания задачи")]
+    updated_at: Annotated[datetime.datetime, Field(description="Дата последнего изменения задачи")]
 
 
 class ProjectBase(BaseModel):
@@ -75,8 +108,14 @@ class ProjectOut(ProjectBase):
     grant_level: Annotated[GrantLevel | None, Field(description="Уровень доступа к проекту. null - владелец проекта")]
     created_at: Annotated[datetime.datetime, Field(description="Дата создания проекта")]
     updated_at: Annotated[datetime.datetime, Field(description="Дата последнего обновления проекта")]
-    texts: Annotated[list[TextVariantCompact], Field(description="Варианты текста")] = []
-    music: Annotated[MusicOut | None, Field(description="Музыкальный трек")] = None
+    texts: Annotated[
+        list[TextVariantCompact] | None,
+        Field(description="Варианты текста. null - не запрошены (fields=summary без expand=texts)"),
+    ] = []
+    music: Annotated[
+        MusicOut | None,
+        Field(description="Музыкальный трек. null - музыки нет или она не запрошена (fields=summary без expand=music)"),
+    ] = None
 
 
 class WordMeaning(BaseModel):
@@ -12,9 +12,7 @@ from pydantic import BaseModel, UUID4
 from jose import ExpiredSignatureError, JWTError, jwt
 from sqlalchemy import select, ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.api.dependencies.core import DBSessionDep
 from app.api.schemas import UserOut
 from app.config import settings
 from app.models import UserModel
@@ -86,8 +84,8 @@ async def create_user_if_not_exists(email: str, db_session: AsyncSession) -> Use
     return user
 
 
-async def check_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
-    """Проверяет текущего пользователя и возвращает его данные"""
+def decode_access_token(token: str) -> TokenData:
+    """Проверка подписи и срока действия токена без обращения к базе данных"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Ошибка проверки ключа доступа",
@@ -99,36 +97,42 @@ async def check_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         user_id = payload.get("user_id")
         if username is None or not isinstance(username, str) or user_id is None or not isinstance(user_id, str):
             raise credentials_exception
-        token_data = TokenData(username=username, user_id=uuid.UUID(user_id, version=4))
-    except JWTError as exc:
+        return TokenData(username=username, user_id=uuid.UUID(user_id, version=4))
+    except (JWTError, ValueError) as exc:
         raise credentials_exception from exc
-    user = UserOut(email=token_data.username, user_id=token_data.user_id)
-    return user
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db_session: DBSessionDep) -> UserModel | None:
-    """Получает текущего пользователя из базы данных"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Ошибка проверки ключа доступа",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        user_id = payload.get("user_id")
-        if username is None or not isinstance(username, str) or user_id is None or not isinstance(user_id, str):
-            raise credentials_exception
-        token_data = TokenData(username=username, user_id=uuid.UUID(user_id, version=4))
-    except JWTError as exc:
-        raise credentials_exception from exc
+async def get_token_data(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    """Данные токена запроса. FastAPI кэширует зависимость, поэтому токен декодируется один раз за запрос"""
+    return decode_access_token(token)
 
-    result = await db_session.execute(
-        select(UserModel).options(selectinload(UserModel.grants)).where(UserModel.email == token_data.username)
-    )
-    user = result.scalars().first()
 
-    return user
+async def check_current_user(token_data: Annotated[TokenData, Depends(get_token_data)]) -> UserOut:
+    """Проверяет текущего пользователя и возвращает его данные"""
+    return UserOut(email=token_data.username, user_id=token_data.user_id)
+
+
+class AuthContext:
+    """Контекст аутентификации запроса: ID и почта пользователя из токена, без обращения к базе данных.
+    Существование пользователя не проверяется: токен удаленного пользователя действует до истечения срока"""
+
+    def __init__(self, token_data: TokenData):
+        self.token_data = token_data
+
+    @property
+    def user_id(self) -> uuid.UUID:
+        """ID пользователя из токена"""
+        return self.token_data.user_id
+
+    @property
+    def email(self) -> str:
+        """Почта пользователя из токена"""
+        return self.token_data.username
+
+
+async def get_auth_context(token_data: Annotated[TokenData, Depends(get_token_data)]) -> AuthContext:
+    """Контекст аутентификации запроса"""
+    return AuthContext(token_data)
 
 
 async def get_new_email_auth_code() -> str:
@@ -0,0 +1,59 @@
+"""Кэш в памяти процесса с ограничением размера (LRU) и временем жизни записей"""
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """LRU-кэш, записи которого устаревают через ttl_seconds после добавления.
+    Не потокобезопасен, рассчитан на использование из одного event loop"""
+
+    def __init__(self, max_size: int, ttl_seconds: float, timer: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._timer = timer
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """Значение по ключу, если оно есть и не устарело"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._timer():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        """Добавление значения, при переполнении вытесняется давно не использованная запись"""
+        expires_at = self._timer() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Удаление значения по ключу"""
+        self._entries.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        """Удаление значений, ключи которых удовлетворяют условию
+
+        :return: количество удаленных значений
+        """
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Удаление всех значений"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
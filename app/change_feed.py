@@ -0,0 +1,251 @@
+"""Лента изменений проектов: pub/sub внутри процесса с подключаемым транспортом событий между процессами"""
+import asyncio
+import contextlib
+import enum
+import logging
+import uuid
+from typing import Callable, Iterable, Iterator, Protocol
+
+from pydantic import BaseModel
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import ProjectGrantModel, ProjectModel
+from app.pg_notify import PostgresNotifyChannel
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY, через который процессы приложения обмениваются событиями
+POSTGRES_CHANNEL = "lyrics_changes"
+# Postgres принимает payload NOTIFY меньше 8000 байт: UUID получателя занимает в JSON 39 байт,
+# остальные поля события - меньше 300 байт, поэтому получатели отправляются частями
+NOTIFY_USER_IDS_BATCH_SIZE = 150
+
+
+class ChangeEntity(enum.Enum):
+    """Что изменилось в проекте"""
+
+    PROJECT = "project"
+    TEXT = "text"
+    MUSIC = "music"
+    GRANT = "grant"
+
+
+class ChangeAction(enum.Enum):
+    """Вид изменения"""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+class ChangeEvent(BaseModel):
+    """Событие изменения проекта"""
+
+    entity: ChangeEntity
+    action: ChangeAction
+    project_id: uuid.UUID
+    text_id: uuid.UUID | None = None
+    # Получатели события: владелец проекта и пользователи с доступом, клиентам не отправляется
+    user_ids: list[uuid.UUID]
+
+
+ChangeHandler = Callable[[ChangeEvent], None]
+
+
+class ChangeBackend(Protocol):
+    """Транспорт событий: доставляет опубликованное событие обработчику каждого процесса приложения"""
+
+    async def start(self, handler: ChangeHandler) -> None:
+        """Начать доставку событий обработчику"""
+
+    async def publish(self, event: ChangeEvent) -> None:
+        """Опубликовать событие"""
+
+    async def close(self) -> None:
+        """Прекратить доставку событий"""
+
+
+class InMemoryChangeBackend:
+    """Транспорт внутри одного процесса: для тестов и запуска приложения в один процесс"""
+
+    def __init__(self, handler: ChangeHandler | None = None) -> None:
+        self._handler = handler
+
+    async def start(self, handler: ChangeHandler) -> None:
+        """Начать доставку событий обработчику"""
+        self._handler = handler
+
+    async def publish(self, event: ChangeEvent) -> None:
+        """Передать событие обработчику этого процесса"""
+        if self._handler is not None:
+            self._handler(event)
+
+    async def close(self) -> None:
+        """Прекратить доставку событий"""
+        self._handler = None
+
+
+class PostgresChangeBackend:
+    """Транспорт через LISTEN/NOTIFY Postgres: событие, опубликованное любым процессом приложения,
+    доходит до подписчиков всех процессов. После обрыва соединения канал переподключается сам,
+    события, опубликованные за время обрыва, теряются"""
+
+    def __init__(self, database_url: str, channel: str = POSTGRES_CHANNEL):
+        self._channel = PostgresNotifyChannel(database_url, channel)
+        self._handler: ChangeHandler | None = None
+
+    async def start(self, handler: ChangeHandler) -> None:
+        """Подключиться и подписаться на канал"""
+        self._handler = handler
+        await self._channel.start(self._on_payload)
+
+    async def publish(self, event: ChangeEvent) -> None:
+        """Отправить событие в канал. Получатели разбиваются на части по NOTIFY_USER_IDS_BATCH_SIZE,
+        каждая часть - отдельное сообщение, чтобы payload уложился в ограничение NOTIFY"""
+        for start in range(0, len(event.user_ids), NOTIFY_USER_IDS_BATCH_SIZE):
+            part = event.model_copy(update={"user_ids": event.user_ids[start : start + NOTIFY_USER_IDS_BATCH_SIZE]})
+            await self._channel.notify(part.model_dump_json())
+
+    async def close(self) -> None:
+        """Отписаться от канала и закрыть соединение"""
+        await self._channel.close()
+        self._handler = None
+
+    def _on_payload(self, payload: str) -> None:
+        """Передать событие из канала обработчику"""
+        if self._handler is None:
+            return
+        try:
+            event = ChangeEvent.model_validate_json(payload)
+        except ValueError:
+            logger.exception("Некорректное событие в канале %s", self._channel.channel)
+            return
+        self._handler(event)
+
+
+class ChangeFeed:
+    """Подписки пользователей на изменения проектов. Каждая подписка - ограниченная очередь, если клиент
+    не успевает читать события, новые события для него отбрасываются. До start (скрипты, тесты без lifespan)
+    события доставляются только подписчикам этого процесса"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[uuid.UUID, set[asyncio.Queue[ChangeEvent]]] = {}
+        self._backend: ChangeBackend = InMemoryChangeBackend(self._deliver)
+
+    async def start(self, backend: ChangeBackend) -> None:
+        """Переключиться на транспорт событий между процессами"""
+        await backend.start(self._deliver)
+        self._backend = backend
+
+    async def close(self) -> None:
+        """Закрыть транспорт событий"""
+        await self._backend.close()
+        self._backend = InMemoryChangeBackend(self._deliver)
+
+    async def publish(self, event: ChangeEvent) -> None:
+        """Опубликовать событие. Ошибка транспорта не прерывает изменение, которое уже сохранено"""
+        try:
+            await self._backend.publish(event)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Ошибка публикации события %s проекта %s", event.entity.value, event.project_id)
+
+    @contextlib.contextmanager
+    def subscribe(self, user_id: uuid.UUID) -> Iterator[asyncio.Queue[ChangeEvent]]:
+        """Подписка пользователя на изменения его проектов на время контекста"""
+        queue: asyncio.Queue[ChangeEvent] = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers[user_id]
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _deliver(self, event: ChangeEvent) -> None:
+        """Положить событие в очереди подписок получателей"""
+        for user_id in event.user_ids:
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    logger.warning("Очередь событий пользователя %s переполнена, событие отброшено", user_id)
+
+
+def create_change_backend() -> ChangeBackend:
+    """Транспорт событий из настроек"""
+    if settings.change_feed_backend == "postgres":
+        return PostgresChangeBackend(settings.database_url)
+    return InMemoryChangeBackend()
+
+
+async def get_projects_audience(
+    project_ids: Iterable[uuid.UUID], db_session: AsyncSession
+) -> dict[uuid.UUID, set[uuid.UUID]]:
+    """Владельцы проектов и пользователи с активным доступом к ним одним запросом независимо от числа проектов"""
+    audiences: dict[uuid.UUID, set[uuid.UUID]] = {project_id: set() for project_id in project_ids}
+    if not audiences:
+        return audiences
+    result = await db_session.execute(
+        union(
+            select(ProjectModel.project_id, ProjectModel.owner_user_id).where(ProjectModel.project_id.in_(audiences)),
+            select(ProjectGrantModel.project_id, ProjectGrantModel.user_id)
+            .where(ProjectGrantModel.project_id.in_(audiences))
+            .where(ProjectGrantModel.is_active.is_(True)),
+        )
+    )
+    for project_id, user_id in result.tuples():
+        if user_id is not None:
+            audiences[project_id].add(user_id)
+    return audiences
+
+
+async def get_project_audience(project_id: uuid.UUID, db_session: AsyncSession) -> set[uuid.UUID]:
+    """Владелец проекта и пользователи с активным доступом к нему"""
+    return (await get_projects_audience([project_id], db_session))[project_id]
+
+
+# pylint: disable=too-many-arguments
+async def publish_change(
+    db_session: AsyncSession,
+    entity: ChangeEntity,
+    action: ChangeAction,
+    project_id: uuid.UUID,
+    *,
+    text_id: uuid.UUID | None = None,
+    user_ids: Iterable[uuid.UUID] = (),
+) -> None:
+    """Сообщить об изменении проекта всем, у кого есть к нему доступ, и пользователям user_ids
+    (например, потерявшим доступ). Вызывается после commit изменения"""
+    audience = await get_project_audience(project_id, db_session) | set(user_ids)
+    if not audience:
+        return
+    await change_feed.publish(
+        ChangeEvent(entity=entity, action=action, project_id=project_id, text_id=text_id, user_ids=sorted(audience))
+    )
+
+
+async def publish_text_changes(
+    db_session: AsyncSession, action: ChangeAction, texts: Iterable[tuple[uuid.UUID, uuid.UUID]]
+) -> None:
+    """Сообщить об изменении нескольких текстов, (text_id, project_id). Получатели определяются одним запросом
+    на все проекты, а не запросом на каждый текст. Вызывается после commit изменения"""
+    texts = list(texts)
+    audiences = await get_projects_audience({project_id for _, project_id in texts}, db_session)
+    for text_id, project_id in texts:
+        if audiences[project_id]:
+            await change_feed.publish(
+                ChangeEvent(
+                    entity=ChangeEntity.TEXT,
+                    action=action,
+                    project_id=project_id,
+                    text_id=text_id,
+                    user_ids=sorted(audiences[project_id]),
+                )
+            )
+
+
+change_feed = ChangeFeed(queue_size=settings.change_feed_queue_size)
@@ -1,4 +1,6 @@
 """Настройки приложения"""
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -22,12 +24,93 @@ class Settings(BaseSettings):
     s3_access_key: str
     s3_secret_key: str
     s3_bucket: str
+    # Файлы больше порога загружаются на s3 через multipart upload частями заданного размера (минимум 5 МиБ)
+    s3_multipart_threshold: int = 8 * 1024 * 1024
+    s3_multipart_chunk_size: int = 8 * 1024 * 1024
+    # Размер пула соединений общего клиента s3
+    s3_max_pool_connections: int = 20
+    # Количество кэшируемых pre-signed URL и минимальный оставшийся срок действия URL, отдаваемого из кэша
+    s3_presigned_url_cache_size: int = 10000
+    s3_presigned_url_min_ttl_seconds: int = 900
+
+    # Максимальный размер загружаемого музыкального файла в байтах
+    music_max_upload_size: int = 100 * 1024 * 1024
+    # Размер части, которыми загружаемый файл копируется на диск
+    music_upload_chunk_size: int = 1024 * 1024
+
+    # Количество процессов для анализа музыки (определение BPM)
+    music_analysis_workers: int = 2
+    # Сколько задач анализа может ждать свободный процесс, сверх этого загрузки отклоняются
+    music_analysis_max_queue: int = 8
+    # Максимальное время ожидания результата анализа одного файла
+    music_analysis_timeout_seconds: float = 120
+    # Частота дискретизации, до которой понижается звук перед анализом
+    music_analysis_samplerate: int = 22050
+    # Алгоритм определения BPM: aubio (покадровый детектор) или numpy (автокорреляция огибающей онсетов)
+    music_tempo_engine: Literal["aubio", "numpy"] = "aubio"
+    # Длительность фрагмента из середины трека, по которому определяется BPM, None - весь трек
+    music_tempo_window_seconds: float | None = None
+    # Вычислять пики формы волны при анализе (трек декодируется целиком, даже если BPM определяется по фрагменту)
+    music_waveform_peaks: bool = True
+    # Хранить одинаковые файлы музыки разных проектов в одном объекте на s3
+    music_deduplicate_objects: bool = False
+
+    # Количество asyncio-воркеров фоновой обработки загруженной музыки
+    music_job_workers: int = 2
+    # Как часто свободный воркер проверяет таблицу задач, если его не разбудили
+    music_job_poll_interval_seconds: float = 5
+    # Через сколько секунд задача, взятая воркером, считается брошенной и берется снова
+    music_job_lease_seconds: float = 300
+    # Количество попыток обработки, после которого задача считается неудачной
+    music_job_max_attempts: int = 3
+
+    # Транспорт ленты изменений между процессами: postgres (LISTEN/NOTIFY) или memory (только этот процесс)
+    change_feed_backend: Literal["postgres", "memory"] = "postgres"
+    # Сколько непрочитанных событий хранится для одной подписки, лишние события отбрасываются
+    change_feed_queue_size: int = 100
+    # Интервал комментариев-пингов в потоке событий, чтобы прокси не закрывали неактивное соединение
+    change_feed_heartbeat_seconds: float = 15
+    # Пауза перед повторным подключением каналов LISTEN/NOTIFY Postgres после обрыва соединения
+    postgres_notify_reconnect_seconds: float = 5
+
+    # Кэш доступа пользователей к проектам: количество записей, время жизни записи и транспорт инвалидации
+    # между процессами: postgres (LISTEN/NOTIFY) или memory (только этот процесс)
+    access_cache_size: int = 10000
+    access_cache_ttl_seconds: float = 30
+    access_cache_backend: Literal["postgres", "memory"] = "postgres"
+
+    # SMTP-сервер, через который отправляются письма, и отправитель
+    smtp_server: str = ""
+    smtp_port: int = 465
+    smtp_user: str = ""
+    smtp_password: str = ""
+    smtp_email: str = ""
+    smtp_name: str = ""
+    # SMTP поверх TLS (SMTP_SSL), иначе соединение без шифрования, например, с локальным релеем
+    smtp_use_ssl: bool = True
+    smtp_timeout_seconds: float = 30
+    # Очередь писем: как часто воркер проверяет таблицу, если его не разбудили, количество попыток отправки
+    # и задержка перед повтором, которая удваивается с каждой попыткой
+    email_outbox_poll_interval_seconds: float = 5
+    email_outbox_max_attempts: int = 5
+    email_outbox_retry_delay_seconds: float = 10
+    # Через сколько секунд письмо, взятое воркером, считается брошенным и берется снова
+    email_outbox_lease_seconds: float = 120
+    # Сколько секунд хранится отправленное письмо, после этого воркер удаляет его из очереди
+    email_outbox_retention_seconds: float = 7 * 24 * 3600
 
     yandex_dict_key: str
 
     tiptap_app_id: str
     tiptap_secret_key: str
     tiptap_api_secret: str
+    # Размер пула соединений клиента TipTap, количество параллельных запросов пакетных операций
+    # и повторов запроса при сетевых ошибках и ответах 429/5xx
+    tiptap_max_connections: int = 20
+    tiptap_concurrency: int = 10
+    tiptap_retries: int = 2
+    # Как часто накопленные обновления документов из webhook TipTap записываются в БД одной пачкой
+    tiptap_webhook_flush_interval_seconds: float = 0.5
 
     openai_lyrics_prompt: str = (
         "Продолжи текст песни. "
@@ -45,6 +128,12 @@ class Settings(BaseSettings):
     openai_temperature: float = 0.7
     openai_api_key: str
     openai_max_tokens: int = 150
+    # Размер пула соединений клиента OpenAI, количество одновременных запросов к LLM всего и одного пользователя
+    # и максимальное время запроса вместе с ожиданием очереди
+    openai_max_connections: int = 20
+    openai_concurrency: int = 10
+    openai_user_concurrency: int = 2
+    openai_timeout_seconds: float = 30
 
 
 settings = Settings()  # type: ignore
@@ -0,0 +1,130 @@
+"""Очередь писем в БД (outbox) и asyncio-воркер, который отправляет их в фоне"""
+import datetime
+import logging
+import time
+from contextlib import AbstractAsyncContextManager
+from typing import Callable
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import sessionmanager
+from app.lease_queue import LeaseQueue, LeaseQueueWorkers, utcnow
+from app.mail import SMTPSender, smtp_sender
+from app.models import EmailOutboxModel
+from app.models.email_outbox import EmailOutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер удаляет отправленные письма старше settings.email_outbox_retention_seconds
+PURGE_INTERVAL_SECONDS = 3600
+
+email_queue = LeaseQueue(EmailOutboxModel, pending=EmailOutboxStatus.PENDING, processing=EmailOutboxStatus.SENDING)
+
+
+async def enqueue_email(to_email: str, subject: str, body: str, db_session: AsyncSession) -> EmailOutboxModel:
+    """Постановка письма в очередь. Письмо сохраняется в той же транзакции, что и данные, о которых оно
+    сообщает, поэтому не теряется и не уходит, если транзакция откатилась"""
+    email = EmailOutboxModel(to_email=to_email, subject=subject, body=body, status=EmailOutboxStatus.PENDING)
+    db_session.add(email)
+    return email
+
+
+async def claim_email(db_session: AsyncSession) -> EmailOutboxModel | None:
+    """Захват следующего письма, одно письмо не возьмут два воркера разных процессов"""
+    return await email_queue.claim(settings.email_outbox_lease_seconds, db_session)
+
+
+async def deliver_email(email: EmailOutboxModel, sender: SMTPSender, db_session: AsyncSession) -> None:
+    """Отправка захваченного письма. При ошибке письмо откладывается с удваивающейся задержкой
+    или, если попытки кончились, помечается неудачным"""
+    try:
+        await sender.send(email.to_email, email.subject, email.body)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        logger.exception("Ошибка отправки письма %s", email.message_id)
+        email.error = str(exc) or type(exc).__name__
+        if email.attempts >= settings.email_outbox_max_attempts:
+            email.status = EmailOutboxStatus.FAILED
+            email.locked_until = None
+        else:
+            email.status = EmailOutboxStatus.PENDING
+            email.locked_until = utcnow() + datetime.timedelta(
+                seconds=settings.email_outbox_retry_delay_seconds * 2 ** (email.attempts - 1)
+            )
+        await db_session.commit()
+        return
+
+    email.status = EmailOutboxStatus.SENT
+    email.sent_at = utcnow()
+    email.locked_until = None
+    email.error = None
+    await db_session.commit()
+
+
+async def run_next_email(sender: SMTPSender, db_session: AsyncSession) -> bool:
+    """Захват и отправка одного письма
+
+    :return: было ли письмо для отправки
+    """
+    email = await claim_email(db_session)
+    if email is None:
+        return False
+    await deliver_email(email, sender, db_session)
+    return True
+
+
+async def purge_sent_emails(db_session: AsyncSession) -> int:
+    """Удаление писем, отправленных раньше settings.email_outbox_retention_seconds назад.
+    Неудачные письма остаются для разбора
+
+    :return: количество удаленных писем
+    """
+    sent_before = utcnow() - datetime.timedelta(seconds=settings.email_outbox_retention_seconds)
+    result = await db_session.execute(
+        delete(EmailOutboxModel)
+        .where(EmailOutboxModel.status == EmailOutboxStatus.SENT)
+        .where(EmailOutboxModel.sent_at < sent_before)
+    )
+    await db_session.commit()
+    return result.rowcount
+
+
+class EmailOutboxWorker(LeaseQueueWorkers):
+    """Asyncio-воркер, который отправляет письма из очереди через одно SMTP-соединение. Очередь хранится в БД,
+    поэтому письма, поставленные до start (скрипты, тесты без lifespan) или прерванные перезапуском,
+    отправляет воркер запущенного приложения. Когда писем нет, раз в PURGE_INTERVAL_SECONDS воркер удаляет
+    старые отправленные письма"""
+
+    name = "email-outbox-worker"
+
+    def __init__(
+        self,
+        sender: SMTPSender,
+        poll_interval_seconds: float,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = sessionmanager.session,
+    ):
+        super().__init__(workers=1, poll_interval_seconds=poll_interval_seconds, session_factory=session_factory)
+        self.sender = sender
+        self._purged_at: float | None = None
+
+    async def stop(self) -> None:
+        """Остановка воркера и закрытие SMTP-соединения"""
+        await super().stop()
+        await self.sender.close()
+
+    async def run_next(self, db_session: AsyncSession) -> bool:
+        """Отправка одного письма, если писем нет - удаление старых отправленных писем"""
+        if await run_next_email(self.sender, db_session):
+            return True
+        if self._purged_at is None or time.monotonic() - self._purged_at >= PURGE_INTERVAL_SECONDS:
+            self._purged_at = time.monotonic()
+            purged = await purge_sent_emails(db_session)
+            if purged:
+                logger.info("Удалено %d отправленных писем", purged)
+        return False
+
+
+email_outbox_worker = EmailOutboxWorker(
+    sender=smtp_sender, poll_interval_seconds=settings.email_outbox_poll_interval_seconds
+)
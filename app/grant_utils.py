@@ -1,21 +1,123 @@
 """Утилиты для работы с уровнями доступа к проектам"""
+import datetime
+import enum
 import uuid
+from typing import Collection
 
-from sqlalchemy import select
+from sqlalchemy import and_, exists, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
-from app.models import ProjectGrantModel
+from app.access_cache import GRANT_PRIORITY, project_access_cache
+from app.models import ProjectGrantModel, ProjectModel
 from app.models.grant import GrantLevel
 
 
 async def get_grant_level_by_user_and_project(
     user_id: uuid.UUID, project_id: uuid.UUID, db_session: AsyncSession
 ) -> GrantLevel | None:
-    """Получить уровень доступа пользователя к проекту"""
-    project_grant_query = await db_session.execute(
+    """Получить уровень доступа пользователя к проекту по коду доступа, в том числе отозванному"""
+    access = await project_access_cache.get(user_id, project_id, db_session)
+    if access is None:
+        return None
+    return access.grant_level
+
+
+class ProjectOwnership(enum.Enum):
+    """Фильтр списка проектов по владению"""
+
+    OWNED = "owned"
+    SHARED = "shared"
+
+
+class ProjectExpand(enum.Enum):
+    """Связанные данные проекта, которые загружаются вместе с ним"""
+
+    TEXTS = "texts"
+    MUSIC = "music"
+
+
+class ProjectFields(enum.Enum):
+    """Набор полей проекта в ответе: full - со всеми связанными данными, summary - только поля самого проекта
+    и связанные данные из expand"""
+
+    FULL = "full"
+    SUMMARY = "summary"
+
+
+def get_expand_options(expand: Collection[ProjectExpand]) -> list[LoaderOption]:
+    """Опции загрузки связанных данных проекта из expand, остальные связанные данные не загружаются"""
+    relationships = {ProjectExpand.TEXTS: ProjectModel.texts, ProjectExpand.MUSIC: ProjectModel.music}
+    return [selectinload(relationships[item]) for item in ProjectExpand if item in expand]
+
+
+async def get_project_with_expand(
+    project_id: uuid.UUID, db_session: AsyncSession, expand: Collection[ProjectExpand] = tuple(ProjectExpand)
+) -> ProjectModel | None:
+    """Получить проект по идентификатору, загрузив из связанных данных только перечисленные в expand"""
+    result = await db_session.execute(
+        select(ProjectModel).options(*get_expand_options(expand)).where(ProjectModel.project_id == project_id)
+    )
+    return result.scalars().first()
+
+
+# pylint: disable=too-many-arguments
+async def get_projects_with_grant_level(
+    user_id: uuid.UUID,
+    db_session: AsyncSession,
+    *,
+    ownership: ProjectOwnership | None = None,
+    has_music: bool | None = None,
+    name_prefix: str | None = None,
+    after: tuple[datetime.datetime, uuid.UUID] | None = None,
+    limit: int | None = None,
+    expand: Collection[ProjectExpand] = tuple(ProjectExpand),
+) -> list[tuple[ProjectModel, GrantLevel | None]]:
+    """Получить проекты пользователя и проекты с активным доступом вместе с уровнем доступа пользователя
+    одним запросом. Музыка и тексты проектов из expand загружаются еще одним запросом каждые
+    независимо от числа проектов, остальные связанные данные не загружаются.
+
+    Проекты отсортированы по убыванию (updated_at, project_id), after - ключ последнего проекта предыдущей страницы
+    """
+    grant_level = (
         select(ProjectGrantModel.level)
         .where(ProjectGrantModel.user_id == user_id)
-        .where(ProjectGrantModel.project_id == project_id)
+        .where(ProjectGrantModel.project_id == ProjectModel.project_id)
+        .order_by(*GRANT_PRIORITY)
+        .limit(1)
+        .scalar_subquery()
+    )
+    has_active_grant = (
+        exists()
+        .where(ProjectGrantModel.user_id == user_id)
+        .where(ProjectGrantModel.project_id == ProjectModel.project_id)
+        .where(ProjectGrantModel.is_active.is_(True))
+    )
+    is_owner = ProjectModel.owner_user_id == user_id
+    query = (
+        select(ProjectModel, grant_level)
+        .order_by(ProjectModel.updated_at.desc(), ProjectModel.project_id.desc())
+        .limit(limit)
     )
-    project_grant = project_grant_query.scalars().first()
-    return project_grant
+    query = query.options(*get_expand_options(expand))
+    if ownership is ProjectOwnership.OWNED:
+        query = query.where(is_owner)
+    elif ownership is ProjectOwnership.SHARED:
+        query = query.where(ProjectModel.owner_user_id.is_distinct_from(user_id), has_active_grant)
+    else:
+        query = query.where(or_(is_owner, has_active_grant))
+    if has_music is not None:
+        query = query.where(ProjectModel.music.has() if has_music else ~ProjectModel.music.has())
+    if name_prefix:
+        query = query.where(ProjectModel.name.istartswith(name_prefix, autoescape=True))
+    if after is not None:
+        after_updated_at, after_project_id = after
+        query = query.where(
+            or_(
+                ProjectModel.updated_at < after_updated_at,
+                and_(ProjectModel.updated_at == after_updated_at, ProjectModel.project_id < after_project_id),
+            )
+        )
+    projects_query = await db_session.execute(query)
+    return list(projects_query.tuples())
@@ -0,0 +1,125 @@
+"""Очередь задач в таблице БД с захватом на срок и asyncio-воркеры, которые ее разбирают"""
+import asyncio
+import datetime
+import enum
+import logging
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Generic, TypeVar
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import sessionmanager
+from app.models import Base
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 5
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+
+def utcnow() -> datetime.datetime:
+    """Текущее время UTC без часового пояса, в таком виде время хранится в БД"""
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+class LeaseQueue(Generic[ModelT]):
+    """Очередь задач в таблице модели с колонками status, attempts, locked_until и created_at. Задача в состоянии
+    processing с истекшим locked_until считается брошенной (например, при перезапуске) и берется снова,
+    у задачи в состоянии pending locked_until - время следующей попытки"""
+
+    def __init__(self, model: type[ModelT], pending: enum.Enum, processing: enum.Enum):
+        self.model = model
+        self.pending = pending
+        self.processing = processing
+
+    async def claim(self, lease_seconds: float, db_session: AsyncSession) -> ModelT | None:
+        """Захват следующей задачи на lease_seconds. Задача захватывается условным UPDATE, поэтому одну задачу
+        не возьмут два воркера, даже если они работают в разных процессах"""
+        columns = self.model.__table__.c
+        [key] = self.model.__table__.primary_key
+        now = utcnow()
+        claimable = and_(
+            columns.status.in_([self.pending, self.processing]),
+            or_(columns.locked_until.is_(None), columns.locked_until < now),
+        )
+        keys = await db_session.scalars(
+            select(key).where(claimable).order_by(columns.created_at).limit(CLAIM_BATCH_SIZE)
+        )
+        for value in keys.all():
+            result = await db_session.execute(
+                update(self.model)
+                .where(key == value, claimable)
+                .values(
+                    status=self.processing,
+                    locked_until=now + datetime.timedelta(seconds=lease_seconds),
+                    attempts=columns.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db_session.commit()
+            if result.rowcount == 1:
+                return await db_session.get(self.model, value, populate_existing=True)
+        return None
+
+
+class LeaseQueueWorkers:
+    """Asyncio-воркеры очереди в БД. Наследник реализует run_next: захват и обработку одной задачи.
+    Состояние очереди хранится в БД, поэтому задачи, поставленные до start (скрипты, тесты без lifespan)
+    или прерванные перезапуском, обрабатывают воркеры запущенного приложения"""
+
+    name = "lease-queue-worker"
+
+    def __init__(
+        self,
+        workers: int,
+        poll_interval_seconds: float,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = sessionmanager.session,
+    ):
+        self.workers = workers
+        self.poll_interval_seconds = poll_interval_seconds
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Запуск воркеров в текущем event loop"""
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"{self.name}-{number}") for number in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Остановка воркеров, незавершенные задачи будут взяты снова после истечения срока захвата"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Разбудить свободных воркеров после постановки задачи, не дожидаясь опроса БД"""
+        self._wakeup.set()
+
+    async def run_next(self, db_session: AsyncSession) -> bool:
+        """Захват и обработка одной задачи
+
+        :return: была ли задача для обработки
+        """
+        raise NotImplementedError
+
+    async def _work(self) -> None:
+        """Цикл воркера: обрабатывать задачи, пока они есть, затем ждать уведомления или интервала опроса"""
+        while True:
+            try:
+                async with self._session_factory() as db_session:
+                    processed = await self.run_next(db_session)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Ошибка воркера %s", self.name)
+                processed = False
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
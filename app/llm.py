@@ -1,21 +1,126 @@
 """Функции для интеграции с LLM"""
+import asyncio
+import contextlib
 import json
-from typing import cast
+import uuid
+from typing import Any, AsyncIterator, cast
+
+import httpx
+from openai import APITimeoutError, AsyncOpenAI
+from openai.types.chat import ChatCompletion
 
-from openai import OpenAI
 from app.config import settings
 
-client = OpenAI(api_key=settings.openai_api_key)
+
+class LLMClient:
+    """Асинхронный клиент OpenAI: один пул HTTP-соединений на все время работы приложения,
+    не больше concurrency запросов к LLM сразу и не больше user_concurrency запросов одного пользователя.
+    Запрос, включая ожидание очереди, ограничен timeout_seconds. До start (скрипты, тесты без lifespan)
+    клиент создается на время вызова"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 20,
+        concurrency: int = 10,
+        user_concurrency: int = 2,
+        timeout_seconds: float = 30,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.user_concurrency = user_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._transport = transport
+        self._client: AsyncOpenAI | None = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._user_semaphores: dict[uuid.UUID, asyncio.Semaphore] = {}
+        self._user_requests: dict[uuid.UUID, int] = {}
+
+    def _create_client(self) -> AsyncOpenAI:
+        """Новый клиент OpenAI со своим пулом соединений"""
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            timeout=self.timeout_seconds,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=self._limits, timeout=self.timeout_seconds, transport=self._transport),
+        )
+
+    async def start(self) -> None:
+        """Создание общего клиента"""
+        self._client = self._create_client()
+
+    async def close(self) -> None:
+        """Закрытие общего клиента и его соединений"""
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+
+    @contextlib.asynccontextmanager
+    async def client(self) -> AsyncIterator[AsyncOpenAI]:
+        """Клиент OpenAI. До start клиент создается на время вызова"""
+        if self._client is not None:
+            yield self._client
+            return
+        client = self._create_client()
+        try:
+            yield client
+        finally:
+            await client.close()
+
+    @contextlib.asynccontextmanager
+    async def _limit(self, user_id: uuid.UUID | None) -> AsyncIterator[None]:
+        """Место в очереди запросов пользователя и в общей очереди"""
+        if user_id is None:
+            async with self._semaphore:
+                yield
+            return
+        semaphore = self._user_semaphores.setdefault(user_id, asyncio.Semaphore(self.user_concurrency))
+        self._user_requests[user_id] = self._user_requests.get(user_id, 0) + 1
+        try:
+            async with semaphore, self._semaphore:
+                yield
+        finally:
+            self._user_requests[user_id] -= 1
+            if not self._user_requests[user_id]:
+                del self._user_requests[user_id]
+                del self._user_semaphores[user_id]
+
+    async def complete(self, user_id: uuid.UUID | None = None, **kwargs: Any) -> ChatCompletion:
+        """Запрос chat completions
+
+        :raises TimeoutError: LLM не ответила за timeout_seconds с учетом ожидания очереди
+        """
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async with self._limit(user_id), self.client() as client:
+                    completion: ChatCompletion = await client.chat.completions.create(**kwargs)
+                    return completion
+        except APITimeoutError as exc:
+            raise TimeoutError from exc
+
+
+llm_client = LLMClient(
+    api_key=settings.openai_api_key,
+    max_connections=settings.openai_max_connections,
+    concurrency=settings.openai_concurrency,
+    user_concurrency=settings.openai_user_concurrency,
+    timeout_seconds=settings.openai_timeout_seconds,
+)
 
 
-def get_llm_lyrics_completions(text_input: str):
+async def get_llm_lyrics_completions(text_input: str, user_id: uuid.UUID | None = None) -> list[str]:
     """
     Функция принимает на вход часть текста песни и возвращает продолжение этого текста.
 
     :param text_input: текст для дополнения
-    :return: продолжение текста
+    :param user_id: пользователь, для которого действует ограничение одновременных запросов
+    :return: варианты продолжения текста, варианты без текста пропускаются
     """
-    response = client.chat.completions.create(
+    response = await llm_client.complete(
+        user_id,
         model=settings.openai_model,
         messages=[
             {"role": "system", "content": settings.openai_lyrics_prompt},
@@ -26,17 +131,19 @@ def get_llm_lyrics_completions(text_input: str):
         n=settings.openai_lyrics_completions_count,
     )
 
-    return [choice.message.content for choice in response.choices]
+    return [choice.message.content for choice in response.choices if choice.message.content is not None]
 
 
-def get_llm_rhymes(word: str) -> list[str]:
+async def get_llm_rhymes(word: str, user_id: uuid.UUID | None = None) -> list[str]:
     """
     Поиск рифмы к слову
 
     :param word: слово к которому надо подобрать рифму
+    :param user_id: пользователь, для которого действует ограничение одновременных запросов
     :return: рифма
     """
-    response = client.chat.completions.create(
+    response = await llm_client.complete(
+        user_id,
         model=settings.openai_model,
         messages=[{"role": "system", "content": settings.openai_rhyme_prompt}, {"role": "user", "content": word}],
         response_format={"type": "json_object"},
@@ -45,9 +152,10 @@ def get_llm_rhymes(word: str) -> list[str]:
     )
 
     rhymes = []
-    if response.choices:
+    content = response.choices[0].message.content if response.choices else None
+    if content is not None:
         try:
-            rhymes = json.loads(str(response.choices[0].message.content))["rhymes"]
+            rhymes = json.loads(content)["rhymes"]
         except json.JSONDecodeError:
             rhymes = []
 
@@ -1,47 +1,106 @@
 """Компонент для отправки электронной почты"""
-import os
+import asyncio
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
-
-def send_email(
-    subject: str,
-    message: str,
-    from_name: str,
-    from_email: str,
-    to_email: str,
-    smtp_server: str,
-    smtp_port: int,
-    smtp_user: str,
-    smtp_password: str,
-):
-    """Отправка электронной почты"""
-
-    msg = MIMEMultipart()
-    msg["From"] = f"{from_name} <{from_email}>"
-    msg["To"] = to_email
-    msg["Subject"] = subject
-
-    msg.attach(MIMEText(message, "plain"))
-
-    server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-    server.login(smtp_user, smtp_password)
-
-    server.sendmail(from_email, to_email, msg.as_string())
-    server.quit()
-
-
-def lyrics_send_email(subject: str, message: str, to_email: str):
-    """Отправка электронной почты с подстановкой переменных из окружения"""
-    send_email(
-        subject=subject,
-        message=message,
-        to_email=to_email,
-        from_name=os.environ["SMTP_NAME"],
-        from_email=os.environ["SMTP_EMAIL"],
-        smtp_server=os.environ["SMTP_SERVER"],
-        smtp_port=int(os.environ["SMTP_PORT"]),
-        smtp_user=os.environ["SMTP_USER"],
-        smtp_password=os.environ["SMTP_PASSWORD"],
-    )
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from app.config import settings
+
+
+class SMTPSender:
+    """Отправка писем через SMTP. Соединение открывается и авторизуется при первом письме и переиспользуется
+    для следующих, если сервер его закрыл - открывается заново. Блокирующий smtplib выполняется в отдельном
+    потоке, поэтому медленный SMTP-сервер не останавливает event loop. Письма отправляются по одному"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        user: str,
+        password: str,
+        from_email: str,
+        from_name: str = "",
+        use_ssl: bool = True,
+        timeout_seconds: float = 30,
+    ):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_email = from_email
+        self.from_name = from_name
+        self.use_ssl = use_ssl
+        self.timeout_seconds = timeout_seconds
+        self._connection: smtplib.SMTP | None = None
+        self._lock = asyncio.Lock()
+
+    def build_message(self, to_email: str, subject: str, body: str) -> EmailMessage:
+        """Письмо от отправителя из настроек"""
+        message = EmailMessage()
+        message["From"] = formataddr((self.from_name, self.from_email))
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
+
+    async def send(self, to_email: str, subject: str, body: str) -> None:
+        """Отправка письма, ошибка SMTP пробрасывается"""
+        message = self.build_message(to_email, subject, body)
+        async with self._lock:
+            await asyncio.to_thread(self._send, message)
+
+    async def close(self) -> None:
+        """Закрытие соединения"""
+        async with self._lock:
+            await asyncio.to_thread(self._disconnect)
+
+    def _connect(self) -> smtplib.SMTP:
+        """Новое авторизованное соединение"""
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        connection: smtplib.SMTP = smtp_class(self.server, self.port, timeout=self.timeout_seconds)
+        try:
+            if self.user:
+                connection.login(self.user, self.password)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def _send(self, message: EmailMessage) -> None:
+        """Отправка письма через открытое соединение"""
+        if self._connection is None:
+            self._connection = self._connect()
+        try:
+            try:
+                self._connection.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # сервер закрыл простаивавшее соединение
+                self._connection = self._connect()
+                self._connection.send_message(message)
+        except Exception:
+            # после ошибки состояние SMTP-сессии неизвестно, следующее письмо откроет новое соединение
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        """Закрытие соединения без ошибок, если сервер уже недоступен"""
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except OSError:
+            self._connection.close()
+        self._connection = None
+
+
+smtp_sender = SMTPSender(
+    server=settings.smtp_server,
+    port=settings.smtp_port,
+    user=settings.smtp_user,
+    password=settings.smtp_password,
+    from_email=settings.smtp_email,
+    from_name=settings.smtp_name,
+    use_ssl=settings.smtp_use_ssl,
+    timeout_seconds=settings.smtp_timeout_seconds,
+)
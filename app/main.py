@@ -6,10 +6,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.access_cache import create_invalidation_channel, project_access_cache
 from app.auth import check_current_user
+from app.change_feed import change_feed, create_change_backend
 from app.config import settings
 from app.database import sessionmanager
-from app.api.routers import auth, project, music, text, word, tiptap, completions, health, grant, user
+from app.email_outbox import email_outbox_worker
+from app.llm import llm_client
+from app.music_jobs import music_job_workers
+from app.music_utils import analysis_pool
+from app.s3_helpers import s3_client_manager
+from app.tiptap_utils import tiptap_client
+from app.tiptap_webhooks import document_updates
+from app.api.routers import auth, project, music, text, word, tiptap, completions, health, grant, user, events
 
 logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if settings.debug_logs else logging.INFO)
 
@@ -17,14 +26,32 @@ logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if settings.debug_log
 @asynccontextmanager
 async def lifespan(_):
     """Жизненный цикл приложения"""
+    await s3_client_manager.start()
+    await tiptap_client.start()
+    await llm_client.start()
+    await change_feed.start(create_change_backend())
+    await project_access_cache.start(create_invalidation_channel())
+    music_job_workers.start()
+    document_updates.start()
+    email_outbox_worker.start()
     yield
-    sessionmanager.close()
+    await email_outbox_worker.stop()
+    await document_updates.stop()
+    await music_job_workers.stop()
+    await project_access_cache.close()
+    await change_feed.close()
+    await llm_client.close()
+    await tiptap_client.close()
+    await s3_client_manager.close()
+    analysis_pool.shutdown()
+    await sessionmanager.close()
 
 
 app = FastAPI(
     title="Lyrics IDE Backend",
     summary="Серверная часть веб-приложения для создания текстов песен",
-    version="1.33.0",
+    version="1.58.16",
+    lifespan=lifespan,
 )
 
 app.include_router(
@@ -79,6 +106,12 @@ app.include_router(
     dependencies=[Depends(check_current_user)],
     tags=["users"],
 )
+app.include_router(
+    events.router,
+    prefix="/events",
+    dependencies=[Depends(check_current_user)],
+    tags=["events"],
+)
 app.include_router(
     health.router,
     prefix="/health",
@@ -99,6 +132,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["DELETE", "GET", "POST", "PUT", "PATCH"],
     allow_headers=["*"],
+    expose_headers=[project.NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 
@@ -8,8 +8,11 @@ class Base(DeclarativeBase):
 
 from .user import UserModel  # isort:skip
 from .email_auth_code import EmailAuthCodeModel  # isort:skip
+from .email_outbox import EmailOutboxModel  # isort:skip
 from .project import ProjectModel  # isort:skip
 from .music import MusicModel  # isort:skip
+from .music_analysis import MusicAnalysisModel  # isort:skip
+from .music_job import MusicJobModel  # isort:skip
 from .text import TextModel  # isort:skip
 from .word_meaning import WordMeaningModel  # isort:skip
 from .grant import ProjectGrantModel, ProjectGrantCodeModel  # isort:skip
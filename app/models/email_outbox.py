@@ -0,0 +1,52 @@
+# pylint: disable=cyclic-import, unsubscriptable-object
+"""ORM модель письма в очереди отправки"""
+import datetime
+import enum
+import uuid
+
+from sqlalchemy import Enum, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+from app.models.uuid_type import UUID
+
+
+class EmailOutboxStatus(enum.Enum):
+    """Состояние письма в очереди отправки"""
+
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+class EmailOutboxModel(Base):  # type: ignore
+    """ORM модель письма в очереди отправки"""
+
+    __tablename__ = "email_outbox"
+
+    message_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    to_email: Mapped[str]
+    subject: Mapped[str]
+    body: Mapped[str]
+    status: Mapped[EmailOutboxStatus] = mapped_column(
+        Enum(EmailOutboxStatus),
+        default=EmailOutboxStatus.PENDING,
+        nullable=False,
+        index=True,
+    )
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    # Письмо в состоянии SENDING с истекшим сроком считается брошенным и берется снова,
+    # у письма в состоянии PENDING - время следующей попытки
+    locked_until: Mapped[datetime.datetime | None]
+    error: Mapped[str | None]
+    sent_at: Mapped[datetime.datetime | None]
+    # pylint: disable=not-callable
+    created_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now(), index=False, nullable=False)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=False,
+        nullable=False,
+    )
+    # pylint: enable=not-callable
@@ -4,7 +4,7 @@ import datetime
 import enum
 import uuid
 
-from sqlalchemy import Enum, ForeignKey, func
+from sqlalchemy import Enum, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models import Base
@@ -22,6 +22,8 @@ class ProjectGrantModel(Base):  # type: ignore
     """ORM модель гранта (доступа) пользователя к проекту"""
 
     __tablename__ = "project_grant"
+    # проекты с активным доступом пользователя для списка проектов
+    __table_args__ = (Index("ix_project_grant_user_id_is_active", "user_id", "is_active", "project_id"),)
 
     project_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -1,14 +1,23 @@
 # pylint: disable=cyclic-import, unsubscriptable-object
 """ORM модель музыки"""
+import enum
 import uuid
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import Enum, ForeignKey, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models import Base, ProjectModel
 from app.models.uuid_type import UUID
 
 
+class MusicStatus(enum.Enum):
+    """Состояние обработки музыки"""
+
+    PENDING = "PENDING"
+    READY = "READY"
+    FAILED = "FAILED"
+
+
 class MusicModel(Base):  # type: ignore
     """ORM модель музыки"""
 
@@ -21,9 +30,24 @@ class MusicModel(Base):  # type: ignore
         nullable=True,
         index=True,
     )
-    url: Mapped[str]
+    url: Mapped[str] = mapped_column(index=True)
+    content_hash: Mapped[str | None] = mapped_column(index=True)
     duration_seconds: Mapped[float]
     bpm: Mapped[int | None]
     custom_bpm: Mapped[int | None]
+    codec: Mapped[str | None]
+    bitrate: Mapped[int | None]
+    sample_rate: Mapped[int | None]
+    channels: Mapped[int | None]
+    # Сетка долей (app.music_utils.encode_beat_times), загружается только при обращении
+    beats: Mapped[bytes | None] = mapped_column(LargeBinary, deferred=True)
+    downbeats: Mapped[bytes | None] = mapped_column(LargeBinary, deferred=True)
+    status: Mapped[MusicStatus] = mapped_column(
+        Enum(MusicStatus),
+        default=MusicStatus.READY,
+        server_default=MusicStatus.READY.value,
+        nullable=False,
+        index=False,
+    )
 
     project: Mapped["ProjectModel"] = relationship("ProjectModel", back_populates="music")
@@ -0,0 +1,33 @@
+# pylint: disable=cyclic-import, unsubscriptable-object
+"""ORM модель результата анализа музыкального файла"""
+import datetime
+
+from sqlalchemy import LargeBinary, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+
+
+class MusicAnalysisModel(Base):  # type: ignore
+    """ORM модель результата анализа музыкального файла, ключ - SHA-256 содержимого файла"""
+
+    __tablename__ = "music_analysis"
+
+    content_hash: Mapped[str] = mapped_column(primary_key=True)
+    tempo_engine: Mapped[str]
+    duration_seconds: Mapped[float | None]
+    bpm: Mapped[int | None]
+    codec: Mapped[str | None]
+    bitrate: Mapped[int | None]
+    sample_rate: Mapped[int | None]
+    channels: Mapped[int | None]
+    # Пики формы волны (app.music_utils.WaveformPeaks): int8 пары (min, max) всех уровней детализации подряд
+    peaks: Mapped[bytes | None] = mapped_column(LargeBinary)
+    peaks_count: Mapped[int | None]
+    peaks_sample_rate: Mapped[int | None]
+    # Сетка долей (app.music_utils.encode_beat_times)
+    beats: Mapped[bytes | None] = mapped_column(LargeBinary)
+    downbeats: Mapped[bytes | None] = mapped_column(LargeBinary)
+    # pylint: disable=not-callable
+    created_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now(), index=False, nullable=False)
+    # pylint: enable=not-callable
@@ -0,0 +1,53 @@
+# pylint: disable=cyclic-import, unsubscriptable-object
+"""ORM модель задачи фоновой обработки музыки"""
+import datetime
+import enum
+import uuid
+
+from sqlalchemy import Enum, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models import Base
+from app.models.uuid_type import UUID
+
+
+class MusicJobStatus(enum.Enum):
+    """Состояние задачи обработки музыки"""
+
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class MusicJobModel(Base):  # type: ignore
+    """ORM модель задачи фоновой обработки музыки"""
+
+    __tablename__ = "music_job"
+
+    job_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    music_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("music.music_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    status: Mapped[MusicJobStatus] = mapped_column(
+        Enum(MusicJobStatus),
+        default=MusicJobStatus.PENDING,
+        nullable=False,
+        index=True,
+    )
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    # Задача в состоянии PROCESSING с истекшим сроком считается брошенной (например, при перезапуске) и берется снова
+    locked_until: Mapped[datetime.datetime | None]
+    error: Mapped[str | None]
+    # pylint: disable=not-callable
+    created_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now(), index=False, nullable=False)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=False,
+        nullable=False,
+    )
+    # pylint: enable=not-callable
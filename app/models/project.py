@@ -3,7 +3,7 @@
 import datetime
 import uuid
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models import Base
@@ -14,6 +14,11 @@ class ProjectModel(Base):  # type: ignore
     """ORM модель проекта"""
 
     __tablename__ = "project"
+    # keyset-пагинация списка проектов: свои проекты и все проекты в порядке (updated_at, project_id)
+    __table_args__ = (
+        Index("ix_project_owner_user_id_updated_at", "owner_user_id", "updated_at", "project_id"),
+        Index("ix_project_updated_at_project_id", "updated_at", "project_id"),
+    )
 
     project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     owner_user_id: Mapped[uuid.UUID] = mapped_column(
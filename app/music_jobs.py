@@ -0,0 +1,110 @@
+"""Фоновая обработка загруженной музыки: очередь задач в БД и asyncio-воркеры"""
+import datetime
+import logging
+from pathlib import PurePath
+from tempfile import NamedTemporaryFile
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.change_feed import ChangeAction, ChangeEntity, publish_change
+from app.config import settings
+from app.lease_queue import LeaseQueue, LeaseQueueWorkers, utcnow
+from app.models import MusicJobModel, MusicModel
+from app.models.music import MusicStatus
+from app.models.music_job import MusicJobStatus
+from app.music_storage import apply_analysis, get_cached_analysis, save_analysis
+from app.music_utils import AnalysisQueueFullError, analyze_music
+from app.s3_helpers import download_file
+
+logger = logging.getLogger(__name__)
+
+music_job_queue = LeaseQueue(MusicJobModel, pending=MusicJobStatus.PENDING, processing=MusicJobStatus.PROCESSING)
+
+
+async def enqueue_music_job(music: MusicModel, db_session: AsyncSession) -> MusicJobModel:
+    """Постановка музыки в очередь фоновой обработки, музыка должна быть уже сохранена в сессии"""
+    job = MusicJobModel(music_id=music.music_id, status=MusicJobStatus.PENDING, attempts=0)
+    db_session.add(job)
+    return job
+
+
+async def claim_music_job(db_session: AsyncSession) -> MusicJobModel | None:
+    """Захват следующей задачи, одну задачу не возьмут два воркера, даже если они работают в разных процессах"""
+    return await music_job_queue.claim(settings.music_job_lease_seconds, db_session)
+
+
+async def process_music_job(job: MusicJobModel, db_session: AsyncSession) -> None:
+    """Анализ музыки по захваченной задаче. При ошибке задача откладывается для повтора
+    или, если попытки кончились, помечается неудачной вместе с музыкой"""
+    music = await db_session.get(MusicModel, job.music_id)
+    if music is None:
+        # музыку удалили, пока задача ждала в очереди
+        await db_session.delete(job)
+        await db_session.commit()
+        return
+
+    try:
+        analysis = await get_cached_analysis(music.content_hash, db_session) if music.content_hash else None
+        if analysis is None:
+            with NamedTemporaryFile(suffix=PurePath(music.url).suffix) as temp_file:
+                await download_file(music.url, temp_file.name)
+                analysis = await analyze_music(temp_file.name)
+            if music.content_hash:
+                await save_analysis(music.content_hash, analysis, db_session)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        logger.exception("Ошибка обработки музыки %s в задаче %s", music.music_id, job.job_id)
+        if isinstance(exc, AnalysisQueueFullError):
+            # пул анализа занят синхронными загрузками, попытка не засчитывается
+            job.attempts -= 1
+        job.error = str(exc) or type(exc).__name__
+        if job.attempts >= settings.music_job_max_attempts:
+            job.status = MusicJobStatus.FAILED
+            job.locked_until = None
+            music.status = MusicStatus.FAILED
+        else:
+            job.status = MusicJobStatus.PENDING
+            job.locked_until = utcnow() + datetime.timedelta(
+                seconds=settings.music_job_poll_interval_seconds * max(job.attempts, 1)
+            )
+        await db_session.commit()
+        if music.status is MusicStatus.FAILED and music.project_id is not None:
+            await publish_change(db_session, ChangeEntity.MUSIC, ChangeAction.UPDATED, music.project_id)
+        return
+
+    apply_analysis(music, analysis)
+    music.status = MusicStatus.READY
+    job.status = MusicJobStatus.DONE
+    job.locked_until = None
+    job.error = None
+    await db_session.commit()
+    if music.project_id is not None:
+        await publish_change(db_session, ChangeEntity.MUSIC, ChangeAction.UPDATED, music.project_id)
+
+
+async def run_next_music_job(db_session: AsyncSession) -> bool:
+    """Захват и обработка одной задачи
+
+    :return: была ли задача для обработки
+    """
+    job = await claim_music_job(db_session)
+    if job is None:
+        return False
+    await process_music_job(job, db_session)
+    return True
+
+
+class MusicJobWorkers(LeaseQueueWorkers):
+    """Asyncio-воркеры фоновой обработки музыки. Состояние очереди хранится в БД,
+    поэтому задачи, прерванные перезапуском, подхватываются после истечения срока захвата"""
+
+    name = "music-job-worker"
+
+    async def run_next(self, db_session: AsyncSession) -> bool:
+        """Захват и обработка одной задачи"""
+        return await run_next_music_job(db_session)
+
+
+music_job_workers = MusicJobWorkers(
+    workers=settings.music_job_workers,
+    poll_interval_seconds=settings.music_job_poll_interval_seconds,
+)
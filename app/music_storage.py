@@ -0,0 +1,145 @@
+"""Хранение музыки: кэш результатов анализа по хэшу содержимого и объекты на s3 с подсчетом ссылок"""
+import uuid
+from pathlib import PurePath
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import MusicAnalysisModel, MusicModel
+from app.music_utils import AudioAnalysis, BeatGrid, WaveformPeaks, decode_beat_times, encode_beat_times
+from app.s3_helpers import delete, delete_many
+
+
+def get_music_key(project_id: uuid.UUID, filename: str, content_hash: str) -> str:
+    """Ключ объекта музыки на s3. При дедупликации одинаковые файлы разных проектов хранятся в одном объекте"""
+    if settings.music_deduplicate_objects:
+        return f"music/{content_hash}{PurePath(filename).suffix.lower()}"
+    return f"{project_id}/music/{filename}"
+
+
+async def get_cached_analysis(content_hash: str, db_session: AsyncSession) -> AudioAnalysis | None:
+    """Результат анализа файла с таким содержимым, если он уже выполнялся текущим алгоритмом определения BPM
+    и содержит все нужные данные
+    """
+    cached = await db_session.get(MusicAnalysisModel, content_hash)
+    if cached is None or cached.tempo_engine != settings.music_tempo_engine or not _is_complete(cached):
+        return None
+    return AudioAnalysis(
+        duration_seconds=cached.duration_seconds,
+        bpm=cached.bpm,
+        codec=cached.codec,
+        bitrate=cached.bitrate,
+        sample_rate=cached.sample_rate,
+        channels=cached.channels,
+        peaks=_get_peaks(cached),
+        beats=get_beat_grid(cached.beats, cached.downbeats),
+    )
+
+
+def _is_complete(analysis: MusicAnalysisModel) -> bool:
+    """Есть ли в сохраненном результате все данные, которые сейчас вычисляет анализ.
+    Результаты, сохраненные до появления пиков и сетки долей или с выключенными пиками, анализируются заново
+    """
+    if settings.music_waveform_peaks and analysis.peaks is None:
+        return False
+    # доли не находятся только вместе с BPM
+    return analysis.bpm is None or analysis.beats is not None
+
+
+def _get_peaks(analysis: MusicAnalysisModel) -> WaveformPeaks | None:
+    """Пики формы волны из сохраненного результата анализа"""
+    if analysis.peaks is None or analysis.peaks_count is None or analysis.peaks_sample_rate is None:
+        return None
+    return WaveformPeaks(data=analysis.peaks, count=analysis.peaks_count, sample_rate=analysis.peaks_sample_rate)
+
+
+def get_beat_grid(beats: bytes | None, downbeats: bytes | None) -> BeatGrid | None:
+    """Сетка долей из упакованных моментов долей и сильных долей"""
+    if beats is None or downbeats is None:
+        return None
+    return BeatGrid(beats=decode_beat_times(beats), downbeats=decode_beat_times(downbeats))
+
+
+async def get_waveform_peaks(content_hash: str, db_session: AsyncSession) -> WaveformPeaks | None:
+    """Пики формы волны файла с таким содержимым, если они были вычислены"""
+    analysis = await db_session.get(MusicAnalysisModel, content_hash)
+    return _get_peaks(analysis) if analysis is not None else None
+
+
+async def save_analysis(content_hash: str, analysis: AudioAnalysis, db_session: AsyncSession) -> None:
+    """Сохранение результата анализа одним INSERT ... ON CONFLICT DO UPDATE, поэтому одновременная загрузка
+    одинаковых файлов не падает на первичном ключе. Пустой результат (ничего не определено) не сохраняется
+    """
+    if analysis == AudioAnalysis():
+        return
+    values = {
+        "tempo_engine": settings.music_tempo_engine,
+        "peaks": analysis.peaks.data if analysis.peaks is not None else None,
+        "peaks_count": analysis.peaks.count if analysis.peaks is not None else None,
+        "peaks_sample_rate": analysis.peaks.sample_rate if analysis.peaks is not None else None,
+        "beats": encode_beat_times(analysis.beats.beats) if analysis.beats is not None else None,
+        "downbeats": encode_beat_times(analysis.beats.downbeats) if analysis.beats is not None else None,
+        **analysis.model_dump(exclude={"peaks", "beats"}),
+    }
+    dialect = postgresql if db_session.get_bind().dialect.name == "postgresql" else sqlite
+    await db_session.execute(
+        dialect.insert(MusicAnalysisModel)
+        .values(content_hash=content_hash, **values)
+        .on_conflict_do_update(index_elements=[MusicAnalysisModel.content_hash], set_=values)
+    )
+
+
+def apply_analysis(music: MusicModel, analysis: AudioAnalysis) -> None:
+    """Перенос результата анализа в музыку, неизвестные длительность и BPM обозначаются -1"""
+    music.duration_seconds = analysis.duration_seconds or -1
+    music.bpm = int(analysis.bpm or -1)
+    music.codec = analysis.codec
+    music.bitrate = analysis.bitrate
+    music.sample_rate = analysis.sample_rate
+    music.channels = analysis.channels
+    music.beats = encode_beat_times(analysis.beats.beats) if analysis.beats is not None else None
+    music.downbeats = encode_beat_times(analysis.beats.downbeats) if analysis.beats is not None else None
+
+
+async def lock_music_objects(keys: Iterable[str], db_session: AsyncSession) -> None:
+    """Блокировка объектов s3 до конца транзакции: проверка ссылок на объект и добавление или удаление
+    ссылающейся музыки не пересекаются с такими же операциями других запросов. Без блокировки удаление музыки
+    могло удалить общий объект между проверкой и добавлением новой музыки, которая его переиспользует.
+    В SQLite запись и так выполняется одной транзакцией за раз
+    """
+    if db_session.get_bind().dialect.name != "postgresql":
+        return
+    for key in sorted(set(keys)):
+        await db_session.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(key, 0))))
+
+
+async def is_music_object_referenced(key: str, db_session: AsyncSession) -> bool:
+    """Ссылается ли какая-либо музыка на объект s3"""
+    # pylint: disable=not-callable
+    references = await db_session.scalar(select(func.count()).where(MusicModel.url == key))
+    # pylint: enable=not-callable
+    return bool(references)
+
+
+async def release_music(music: MusicModel, db_session: AsyncSession) -> None:
+    """Удаление музыки. Объект на s3 удаляется, только если на него больше не ссылается другая музыка"""
+    await lock_music_objects([music.url], db_session)
+    await db_session.delete(music)
+    await db_session.flush()
+    if not await is_music_object_referenced(music.url, db_session):
+        await delete(music.url)
+
+
+async def delete_unreferenced_objects(keys: Iterable[str], db_session: AsyncSession) -> list[str]:
+    """Удаление с s3 объектов, на которые больше не ссылается никакая музыка, одним запросом на 1000 объектов.
+    Объекты заблокированы до конца транзакции вызывающего
+
+    :return: ключи, которые не удалось удалить
+    """
+    keys = set(keys)
+    await lock_music_objects(keys, db_session)
+    referenced = set(await db_session.scalars(select(MusicModel.url).where(MusicModel.url.in_(keys))))
+    return await delete_many(sorted(keys - referenced))
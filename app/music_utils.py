@@ -1,66 +1,629 @@
 """Модуль для работы с музыкальными файлами"""
 import asyncio
-import json
-from asyncio import subprocess
-from tempfile import NamedTemporaryFile
-
-from aubio import source, tempo  # pylint: disable=no-name-in-module
-from ffmpeg.asyncio import FFmpeg
-from numpy import median, diff
-
-
-# pylint: disable=too-many-locals
-async def get_file_bpm(path) -> int | None:
-    """Определение BPM для музыкального файла"""
-    win_s = 512  # fft size
-    hop_s = win_s // 2  # hop size
-    samplerate = 44100
-
-    with NamedTemporaryFile(suffix=".wav") as temporary_file:
-        temporary_file_path = temporary_file.name
-        ffmpeg_process = FFmpeg().option("y").input(path).output(temporary_file_path)
-        await ffmpeg_process.execute()
-
-        audio_source = source(temporary_file_path, hop_size=hop_s)
-        samplerate = audio_source.samplerate
-        tempo_detector = tempo("specdiff", win_s, hop_s, samplerate)
-
-        beat_times = []
-        total_audio_frames = 0
-
-        while True:
-            audio_samples, frames_read = audio_source()
-            beat_detected = tempo_detector(audio_samples)
-            if beat_detected:
-                current_beat_time = tempo_detector.get_last_s()
-                beat_times.append(current_beat_time)
-                if total_audio_frames == 0 or beat_detected[0] == 1:
-                    print(current_beat_time)
-            total_audio_frames += frames_read
-            if frames_read < hop_s:
-                break
-
-        if len(beat_times) > 1:
-            beats_per_minute = 60.0 / diff(beat_times)
-            return int(median(beats_per_minute))
-        return None
+import logging
+import math
+import multiprocessing
+import re
+import subprocess
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterable, Iterator, TypeVar
+
+from aubio import tempo  # pylint: disable=no-name-in-module
+from fastapi import UploadFile
+from numpy import (
+    absolute,
+    arange,
+    argmax,
+    array,
+    asarray,
+    clip,
+    concatenate,
+    convolve,
+    cumsum,
+    diff,
+    dot,
+    dtype,
+    float32,
+    float64,
+    frombuffer,
+    hanning,
+    hstack,
+    int8,
+    log1p,
+    maximum,
+    median,
+    minimum,
+    ndarray,
+    pad,
+    rint,
+    stack,
+    vstack,
+    zeros,
+)
+from numpy.fft import irfft, rfft
+from pydantic import BaseModel
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    import hashlib
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UploadTooLargeError(Exception):
+    """Размер загружаемого файла превышает допустимый"""
+
+
+async def spool_upload(
+    upload_file: UploadFile,
+    destination: IO[bytes],
+    chunk_size: int = settings.music_upload_chunk_size,
+    max_size: int = settings.music_max_upload_size,
+    content_hash: "hashlib._Hash | None" = None,
+) -> int:
+    """Копирование загружаемого файла на диск частями фиксированного размера.
+    Файл целиком в память не читается. Если передан content_hash, он обновляется каждой частью.
+
+    :return: количество записанных байт
+    :raises UploadTooLargeError: если файл больше max_size байт
+    """
+    total_size = 0
+    while chunk := await upload_file.read(chunk_size):
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise UploadTooLargeError(f"Файл больше {max_size} байт")
+        destination.write(chunk)
+        if content_hash is not None:
+            content_hash.update(chunk)
+    destination.flush()
+    return total_size
+
+
+class AnalysisQueueFullError(Exception):
+    """Очередь анализа музыки переполнена"""
+
+
+class MusicAnalysisPool:
+    """Ограниченный пул процессов для анализа музыки.
+
+    Анализ выполняется в отдельных процессах и не блокирует event loop.
+    Одновременно принимается не больше max_workers + max_queue задач, остальные отклоняются.
+    По таймауту или при отмене ожидающая в очереди задача снимается, а результат уже запущенной отбрасывается.
+    Место запущенной задачи освобождается только после того, как процесс действительно закончит работу.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, timeout_seconds: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Количество выполняющихся и ожидающих задач"""
+        return self._in_flight
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Пул создается при первом обращении"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Выполнить функцию в пуле процессов
+
+        :raises AnalysisQueueFullError: если очередь переполнена
+        :raises TimeoutError: если задача не выполнилась за timeout_seconds
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                raise AnalysisQueueFullError("Очередь анализа музыки переполнена")
+            self._in_flight += 1
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+        finally:
+            future.cancel()
+
+    def _release(self, _future: Future[Any] | None = None) -> None:
+        """Освобождение места в пуле. Вызывается из потока пула, когда задача завершена или снята из очереди"""
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Остановка пула, ожидающие задачи отменяются"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+analysis_pool = MusicAnalysisPool(
+    max_workers=settings.music_analysis_workers,
+    max_queue=settings.music_analysis_max_queue,
+    timeout_seconds=settings.music_analysis_timeout_seconds,
+)
+
+
+def get_analysis_window_size(samplerate: int) -> int:
+    """Размер окна FFT для определения BPM: степень двойки, соответствующая окну 512 сэмплов при 44100 Гц"""
+    return 1 << round(math.log2(512 * samplerate / 44100))
+
+
+class AudioMetadata(BaseModel):
+    """Информация о музыкальном файле"""
+
+    duration_seconds: float | None = None
+    codec: str | None = None
+    bitrate: int | None = None
+    sample_rate: int | None = None
+    channels: int | None = None
+
+
+PEAKS_SAMPLES_PER_PEAK = 256
+PEAKS_LEVELS = 6
+PEAKS_BLOCK_SIZE = 4096
+
+
+class WaveformPeaks(BaseModel):
+    """Пики формы волны: пары (min, max) в int8 для нескольких уровней детализации.
+    Уровень 0 - PEAKS_SAMPLES_PER_PEAK сэмплов на пик, каждый следующий в 2 раза грубее,
+    уровни записаны в data подряд от подробного к грубому"""
+
+    data: bytes
+    count: int
+    sample_rate: int
+
+    @staticmethod
+    def level_count(count: int, level: int) -> int:
+        """Количество пиков на уровне level"""
+        return -(-count // (1 << level))
+
+    @staticmethod
+    def samples_per_peak(level: int) -> int:
+        """Количество сэмплов на один пик на уровне level"""
+        return PEAKS_SAMPLES_PER_PEAK << level
+
+    def level(self, level: int) -> bytes:
+        """Пики уровня level: пары (min, max) подряд"""
+        offset = sum(2 * self.level_count(self.count, previous) for previous in range(level))
+        return self.data[offset : offset + 2 * self.level_count(self.count, level)]
+
+
+class PeaksBuilder:
+    """Вычисление пиков формы волны по кадрам PCM. Кадры накапливаются и обрабатываются
+    векторно блоками по PEAKS_BLOCK_SIZE пиков, весь трек в памяти не хранится"""
+
+    def __init__(self) -> None:
+        self._pending: list[ndarray] = []
+        self._pending_samples = 0
+        self._minimums: list[ndarray] = []
+        self._maximums: list[ndarray] = []
+
+    def add(self, frame: ndarray) -> None:
+        """Добавление кадра"""
+        self._pending.append(frame)
+        self._pending_samples += len(frame)
+        if self._pending_samples >= PEAKS_BLOCK_SIZE * PEAKS_SAMPLES_PER_PEAK:
+            self._reduce_pending(final=False)
+
+    def _reduce_pending(self, final: bool) -> None:
+        """Пики накопленных сэмплов; неполный последний пик ждет следующих кадров, если final=False"""
+        samples = concatenate(self._pending) if self._pending else zeros(0, dtype=float32)
+        peaks_count = len(samples) // PEAKS_SAMPLES_PER_PEAK
+        if final and len(samples) % PEAKS_SAMPLES_PER_PEAK:
+            peaks_count += 1
+            samples = pad(samples, (0, peaks_count * PEAKS_SAMPLES_PER_PEAK - len(samples)), mode="edge")
+        used = peaks_count * PEAKS_SAMPLES_PER_PEAK
+        if peaks_count:
+            buckets = samples[:used].reshape(peaks_count, PEAKS_SAMPLES_PER_PEAK)
+            self._minimums.append(buckets.min(axis=1))
+            self._maximums.append(buckets.max(axis=1))
+        self._pending = [samples[used:]]
+        self._pending_samples = len(samples) - used
+
+    def build(self, sample_rate: int) -> WaveformPeaks:
+        """Пики всех уровней детализации"""
+        self._reduce_pending(final=True)
+        minimums = concatenate(self._minimums) if self._minimums else zeros(0, dtype=float32)
+        maximums = concatenate(self._maximums) if self._maximums else zeros(0, dtype=float32)
+        count = len(minimums)
+        levels = []
+        for _ in range(PEAKS_LEVELS):
+            quantized = clip(rint(stack((minimums, maximums), axis=1) * 127), -127, 127).astype(int8)
+            levels.append(quantized.ravel())
+            if len(minimums) % 2:
+                minimums, maximums = pad(minimums, (0, 1), mode="edge"), pad(maximums, (0, 1), mode="edge")
+            minimums, maximums = minimums.reshape(-1, 2).min(axis=1), maximums.reshape(-1, 2).max(axis=1)
+        return WaveformPeaks(data=concatenate(levels).tobytes(), count=count, sample_rate=sample_rate)
+
+
+def encode_beat_times(times: Iterable[float]) -> bytes:
+    """Упаковка возрастающих моментов времени в секундах: разности соседних значений в float32"""
+    return diff(asarray(list(times), dtype=float64), prepend=0).astype(float32).tobytes()
+
+
+def decode_beat_times(data: bytes) -> list[float]:
+    """Распаковка моментов времени, упакованных encode_beat_times, с точностью до 0.1 мс"""
+    times: list[float] = cumsum(frombuffer(data, dtype=float32), dtype=float64).round(4).tolist()
+    return times
+
 
+class BeatGrid(BaseModel):
+    """Сетка долей: моменты долей и сильных долей (начал тактов) в секундах от начала трека"""
 
-# pylint: enable=too-many-locals
+    beats: list[float]
+    downbeats: list[float]
 
 
-async def get_song_duration(file_path) -> float | None:
-    """Определение длительности музыкального файла"""
-    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", file_path]
+class AudioAnalysis(AudioMetadata):
+    """Результат анализа музыкального файла"""
 
-    process = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    bpm: int | None = None
+    peaks: WaveformPeaks | None = None
+    beats: BeatGrid | None = None
 
-    stdout, stderr = await process.communicate()
-    print(stderr.decode())
 
-    if process.returncode != 0:
+CHANNEL_LAYOUTS = {
+    "mono": 1,
+    "stereo": 2,
+    "2.1": 3,
+    "3.0": 3,
+    "quad": 4,
+    "4.0": 4,
+    "4.1": 5,
+    "5.0": 5,
+    "5.1": 6,
+    "6.0": 6,
+    "6.1": 7,
+    "7.0": 7,
+    "7.1": 8,
+}
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+FORMAT_BITRATE_RE = re.compile(r"Duration: .*bitrate: (\d+) kb/s")
+AUDIO_STREAM_RE = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+).*?, (\d+) Hz, ([^,]+)(?:, [^,]+, (\d+) kb/s)?")
+CHANNELS_RE = re.compile(r"(\d+) channels")
+
+
+def parse_ffmpeg_input_info(ffmpeg_log: str) -> AudioMetadata:
+    """Разбор информации о входном файле, которую ffmpeg печатает в stderr перед декодированием"""
+    input_info = re.split(r"^(?:Stream mapping:|Output #0)", ffmpeg_log, maxsplit=1, flags=re.MULTILINE)[0]
+    metadata = AudioMetadata()
+
+    if duration_match := DURATION_RE.search(input_info):
+        hours, minutes, seconds = duration_match.groups()
+        metadata.duration_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    if bitrate_match := FORMAT_BITRATE_RE.search(input_info):
+        metadata.bitrate = int(bitrate_match.group(1)) * 1000
+
+    if stream_match := AUDIO_STREAM_RE.search(input_info):
+        codec, sample_rate, channel_layout, stream_bitrate = stream_match.groups()
+        metadata.codec = codec
+        metadata.sample_rate = int(sample_rate)
+        channel_layout = channel_layout.split("(")[0].strip()
+        if channels_match := CHANNELS_RE.fullmatch(channel_layout):
+            metadata.channels = int(channels_match.group(1))
+        else:
+            metadata.channels = CHANNEL_LAYOUTS.get(channel_layout)
+        if metadata.bitrate is None and stream_bitrate is not None:
+            metadata.bitrate = int(stream_bitrate) * 1000
+
+    return metadata
+
+
+def get_middle_window(duration_seconds: float, window_seconds: float) -> tuple[float, float]:
+    """Начало и конец фрагмента длительностью window_seconds из середины трека в секундах"""
+    if duration_seconds <= window_seconds:
+        return 0.0, duration_seconds
+    start_seconds = (duration_seconds - window_seconds) / 2
+    return start_seconds, start_seconds + window_seconds
+
+
+class PcmDecoder:
+    """Декодирование аудио в моно float32 PCM с заданной частотой дискретизации одним запуском ffmpeg.
+    Сэмплы читаются из stdout (промежуточный файл не создается),
+    информация о входном файле - из stderr того же процесса."""
+
+    def __init__(self, path: str, samplerate: int):
+        self.path = path
+        self.samplerate = samplerate
+        self.samples_decoded = 0
+        self.start_seconds = 0.0
+        self._log: list[bytes] = []
+        self._input_info_ready = threading.Event()
+
+    def frames(
+        self,
+        frame_size: int,
+        window_seconds: float | None = None,
+        on_frame: Callable[[ndarray], None] | None = None,
+    ) -> Iterator[ndarray]:
+        """Кадры по frame_size сэмплов, последний кадр дополняется нулями.
+        Если задан window_seconds, возвращаются только кадры фрагмента из середины трека, начиная со start_seconds.
+        Если задан on_frame, он получает каждый декодированный кадр без дополнения, и трек декодируется целиком"""
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-nostats",
+            "-nostdin",
+            "-i",
+            self.path,
+            "-f",
+            "f32le",
+            "-ac",
+            "1",
+            "-ar",
+            str(self.samplerate),
+            "-",
+        ]
+        frame_bytes = frame_size * dtype(float32).itemsize
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+            assert process.stdout is not None and process.stderr is not None
+            # stderr читается параллельно, чтобы ffmpeg не заблокировался на заполненном буфере
+            log_reader = threading.Thread(target=self._read_log, args=(process.stderr,), daemon=True)
+            log_reader.start()
+            first_frame, stop_frame = 0, math.inf
+            frame_index = 0
+            while data := process.stdout.read(frame_bytes):
+                if frame_index == 0 and window_seconds is not None:
+                    first_frame, stop_frame = self._get_window_frames(frame_size, window_seconds)
+                    self.start_seconds = first_frame * frame_size / self.samplerate
+                if frame_index >= stop_frame and on_frame is None:
+                    # остаток трека не нужен, ffmpeg останавливается, не декодируя его
+                    process.kill()
+                    break
+                frame = frombuffer(data, dtype=float32)
+                self.samples_decoded += len(frame)
+                if on_frame is not None:
+                    on_frame(frame)
+                if first_frame <= frame_index < stop_frame:
+                    if len(frame) < frame_size:
+                        frame = pad(frame, (0, frame_size - len(frame)))
+                    yield frame
+                frame_index += 1
+            log_reader.join()
+
+    def _read_log(self, stream: IO[bytes]) -> None:
+        """Чтение stderr ffmpeg до конца, описание входного файла готово, когда ffmpeg переходит к выходу"""
+        for line in stream:
+            self._log.append(line)
+            if line.startswith((b"Stream mapping:", b"Output #0")):
+                self._input_info_ready.set()
+        self._input_info_ready.set()
+
+    def _get_window_frames(self, frame_size: int, window_seconds: float) -> tuple[int, float]:
+        """Номер первого кадра фрагмента из середины трека и номер кадра, на котором декодирование можно прервать.
+        Если длительность из заголовка неизвестна, фрагментом считается весь трек"""
+        self._input_info_ready.wait()
+        duration_seconds = parse_ffmpeg_input_info(b"".join(self._log).decode(errors="replace")).duration_seconds
+        if duration_seconds is None or duration_seconds <= window_seconds:
+            return 0, math.inf
+        start_seconds, end_seconds = get_middle_window(duration_seconds, window_seconds)
+        return int(start_seconds * self.samplerate) // frame_size, math.ceil(end_seconds * self.samplerate / frame_size)
+
+    def metadata(self) -> AudioMetadata:
+        """Информация о файле, доступна после чтения всех кадров"""
+        metadata = parse_ffmpeg_input_info(b"".join(self._log).decode(errors="replace"))
+        if metadata.duration_seconds is None and self.samples_decoded:
+            metadata.duration_seconds = self.samples_decoded / self.samplerate
+        return metadata
+
+
+def detect_beats(frames: Iterable[ndarray], samplerate: int, win_s: int) -> tuple[int | None, ndarray]:
+    """Определение BPM и моментов долей в секундах по кадрам PCM размером win_s // 2 сэмплов"""
+    hop_s = win_s // 2
+    tempo_detector = tempo("specdiff", win_s, hop_s, samplerate)
+
+    beat_times = []
+    for audio_samples in frames:
+        if tempo_detector(audio_samples):
+            beat_times.append(tempo_detector.get_last_s())
+
+    if len(beat_times) > 1:
+        beats_per_minute = 60.0 / diff(beat_times)
+        return int(median(beats_per_minute)), array(beat_times)
+    return None, array(beat_times)
+
+
+def detect_bpm(frames: Iterable[ndarray], samplerate: int, win_s: int) -> int | None:
+    """Определение BPM по кадрам PCM размером win_s // 2 сэмплов"""
+    return detect_beats(frames, samplerate, win_s)[0]
+
+
+ONSET_BLOCK_FRAMES = 2048
+ONSET_LOG_COMPRESSION = 1000
+MIN_BPM = 40
+MAX_BPM = 240
+# Пик автокорреляции на кратной доле лага считается сопоставимым с максимумом, если он не ниже этой доли
+OCTAVE_PEAK_RATIO = 0.8
+MAX_LAG_MULTIPLE = 8
+# Крайние доли сетки, сила онсета на которых ниже этой доли от медианной, считаются тишиной
+ACTIVE_BEAT_RATIO = 0.1
+
+
+def get_onset_envelope(frames: Iterable[ndarray], win_s: int) -> ndarray:
+    """Огибающая силы онсетов (положительный спектральный поток) по кадрам PCM размером win_s // 2 сэмплов.
+    FFT считается векторно для блоков по ONSET_BLOCK_FRAMES кадров, в памяти хранится только огибающая"""
+    hop_s = win_s // 2
+    fft_window = hanning(win_s).astype(float32)
+    previous_hop = zeros(hop_s, dtype=float32)
+    previous_spectrum = zeros(win_s // 2 + 1, dtype=float32)
+    envelope_blocks = []
+    frames_iterator = iter(frames)
+    while block := list(islice(frames_iterator, ONSET_BLOCK_FRAMES)):
+        hops = vstack((previous_hop, *block))
+        windows = hstack((hops[:-1], hops[1:])) * fft_window
+        spectrum = log1p(ONSET_LOG_COMPRESSION * absolute(rfft(windows, axis=1))).astype(float32)
+        flux = maximum(diff(vstack((previous_spectrum, spectrum)), axis=0), 0).sum(axis=1)
+        envelope_blocks.append(flux)
+        previous_hop, previous_spectrum = hops[-1], spectrum[-1]
+    return concatenate(envelope_blocks) if envelope_blocks else zeros(0, dtype=float32)
+
+
+def get_peak_lag(autocorrelation: ndarray, lag: int, radius: int) -> float:
+    """Положение пика автокорреляции рядом с lag с точностью до долей кадра (параболическая интерполяция)"""
+    start = max(lag - radius, 1)
+    peak = start + int(argmax(autocorrelation[start : lag + radius + 1]))
+    left, center, right = autocorrelation[peak - 1 : peak + 2]
+    curvature = left - 2 * center + right
+    return peak + (float(0.5 * (left - right) / curvature) if curvature < 0 else 0.0)
+
+
+def get_beat_phase(envelope: ndarray, period: float) -> int:
+    """Кадр огибающей онсетов, с которого начинается сетка долей с периодом period кадров:
+    из сдвигов в пределах периода выбирается тот, на доли которого приходится наибольшая средняя сила онсетов"""
+    phases = arange(math.ceil(period))
+    positions = rint(phases[:, None] + arange(int(len(envelope) / period) + 1)[None, :] * period).astype(int)
+    valid = positions < len(envelope)
+    strength = (envelope[minimum(positions, len(envelope) - 1)] * valid).sum(axis=1) / valid.sum(axis=1)
+    return int(argmax(strength))
+
+
+def trim_silent_beats(beat_frames: ndarray, onset_strength: ndarray) -> ndarray:
+    """Удаление крайних долей сетки, чтобы она не продолжалась в тишину до начала и после конца музыки"""
+    beat_positions = minimum(rint(beat_frames).astype(int), len(onset_strength) - 2)
+    beat_strength = maximum(onset_strength[beat_positions], onset_strength[beat_positions + 1])
+    active = (beat_strength >= ACTIVE_BEAT_RATIO * median(beat_strength)).nonzero()[0]
+    trimmed: ndarray = beat_frames[active[0] : active[-1] + 1]
+    return trimmed
+
+
+def get_beat_period(envelope: ndarray, min_lag: int, max_lag: int) -> float | None:
+    """Период долей в кадрах огибающей онсетов по пику автокорреляции между min_lag и max_lag"""
+    envelope = envelope - envelope.mean()
+    fft_size = 1 << (2 * len(envelope) - 1).bit_length()
+    autocorrelation = irfft(absolute(rfft(envelope, fft_size)) ** 2, fft_size)[: len(envelope) // 2]
+    peak_lag = min_lag + int(argmax(autocorrelation[min_lag : max_lag + 1]))
+    if autocorrelation[peak_lag] <= 0:
         return None
 
-    result = json.loads(stdout.decode())
-    duration = float(result["format"]["duration"])
-    return duration
+    # Максимум мог прийтись на кратный период (октавная ошибка): берется самый короткий сопоставимый пик
+    for divisor in range(peak_lag // min_lag, 1, -1):
+        lag = round(peak_lag / divisor)
+        if lag >= min_lag and autocorrelation[lag - 1 : lag + 2].max() >= OCTAVE_PEAK_RATIO * autocorrelation[peak_lag]:
+            peak_lag = lag
+            break
+
+    # Период уточняется по самому дальнему кратному пику, чтобы ошибка дискретизации делилась на кратность
+    multiple = max(1, min(MAX_LAG_MULTIPLE, (len(autocorrelation) - 2) // peak_lag - 1))
+    return get_peak_lag(autocorrelation, peak_lag * multiple, radius=multiple) / multiple
+
+
+def estimate_beats(frames: Iterable[ndarray], samplerate: int, win_s: int) -> tuple[int | None, ndarray]:
+    """Определение BPM и моментов долей в секундах по кадрам PCM размером win_s // 2 сэмплов
+    через автокорреляцию огибающей онсетов. Доли расставляются равномерной сеткой с найденным периодом"""
+    envelope_rate = samplerate / (win_s // 2)
+    min_lag = int(envelope_rate * 60 / MAX_BPM)
+    max_lag = math.ceil(envelope_rate * 60 / MIN_BPM)
+
+    envelope = get_onset_envelope(frames, win_s).astype(float)
+    if len(envelope) < 2 * max_lag or not envelope.any():
+        return None, zeros(0)
+    envelope = convolve(envelope, hanning(5), mode="same")
+
+    period = get_beat_period(envelope, min_lag, max_lag)
+    if period is None:
+        return None, zeros(0)
+    beat_frames = trim_silent_beats(arange(get_beat_phase(envelope, period), len(envelope), period), envelope)
+    return round(60 * envelope_rate / period), beat_frames / envelope_rate
+
+
+def estimate_bpm(frames: Iterable[ndarray], samplerate: int, win_s: int) -> int | None:
+    """Определение BPM по кадрам PCM размером win_s // 2 сэмплов через автокорреляцию огибающей онсетов"""
+    return estimate_beats(frames, samplerate, win_s)[0]
+
+
+TEMPO_ENGINES: dict[str, Callable[[Iterable[ndarray], int, int], tuple[int | None, ndarray]]] = {
+    "aubio": detect_beats,
+    "numpy": estimate_beats,
+}
+BEATS_PER_BAR = 4
+
+
+def get_downbeats(beat_times: ndarray, frame_energy: ndarray, frame_rate: float) -> ndarray:
+    """Сильные доли в размере BEATS_PER_BAR/4: из BEATS_PER_BAR вариантов начала такта
+    выбирается тот, на доли которого приходится наибольшая средняя энергия сигнала.
+    Пропущенные детектором доли учитываются по медианному интервалу между долями"""
+    if len(beat_times) < 2 or len(frame_energy) < 2:
+        return beat_times[:1]
+    intervals = diff(beat_times)
+    beat_numbers = concatenate(([0], cumsum(rint(intervals / median(intervals))))).astype(int) % BEATS_PER_BAR
+    beat_frames = minimum((beat_times * frame_rate).astype(int), len(frame_energy) - 2).clip(0)
+    beat_energy = frame_energy[beat_frames] + frame_energy[beat_frames + 1]
+    bar_phase = argmax(
+        [
+            beat_energy[beat_numbers == phase].mean() if (beat_numbers == phase).any() else 0
+            for phase in range(BEATS_PER_BAR)
+        ]
+    )
+    downbeat_times: ndarray = beat_times[beat_numbers == bar_phase]
+    return downbeat_times
+
+
+def measure_frames(frames: Iterable[ndarray], frame_energy: list[float]) -> Iterator[ndarray]:
+    """Передача кадров дальше с записью энергии каждого кадра в frame_energy"""
+    for frame in frames:
+        frame_energy.append(float(dot(frame, frame)))
+        yield frame
+
+
+def analyze_file(
+    path: str,
+    samplerate: int = settings.music_analysis_samplerate,
+    engine: str = settings.music_tempo_engine,
+    window_seconds: float | None = settings.music_tempo_window_seconds,
+    waveform_peaks: bool = settings.music_waveform_peaks,
+) -> AudioAnalysis:
+    """Анализ музыкального файла: BPM, длительность, кодек, битрейт, частота дискретизации, число каналов
+    сетка долей и пики формы волны (если waveform_peaks). BPM и доли определяются алгоритмом engine по фрагменту
+    длительностью window_seconds из середины трека (None - весь трек). Блокирующая функция, выполняется в пуле процессов
+    """
+    win_s = get_analysis_window_size(samplerate)
+    decoder = PcmDecoder(path, samplerate)
+    peaks_builder = PeaksBuilder() if waveform_peaks else None
+    frames = decoder.frames(
+        frame_size=win_s // 2,
+        window_seconds=window_seconds,
+        on_frame=peaks_builder.add if peaks_builder is not None else None,
+    )
+    frame_energy: list[float] = []
+    bpm, beat_times = TEMPO_ENGINES[engine](measure_frames(frames, frame_energy), samplerate, win_s)
+    downbeat_times = get_downbeats(beat_times, array(frame_energy), samplerate / (win_s // 2))
+    beats = (
+        BeatGrid(
+            beats=(beat_times + decoder.start_seconds).tolist(),
+            downbeats=(downbeat_times + decoder.start_seconds).tolist(),
+        )
+        if len(beat_times)
+        else None
+    )
+    peaks = peaks_builder.build(samplerate) if peaks_builder is not None and decoder.samples_decoded else None
+    return AudioAnalysis(bpm=bpm, peaks=peaks, beats=beats, **decoder.metadata().model_dump())
+
+
+async def analyze_music(path: str) -> AudioAnalysis:
+    """Анализ музыкального файла в пуле процессов
+
+    :return: результат анализа, поля которого None, если определить их не удалось
+    :raises AnalysisQueueFullError: если очередь анализа переполнена
+    :raises TimeoutError: если анализ не уложился в таймаут
+    """
+    try:
+        return await analysis_pool.run(analyze_file, path)
+    except TimeoutError as exc:
+        logger.warning("Анализ %s не уложился в %s с", path, analysis_pool.timeout_seconds)
+        raise TimeoutError(f"Анализ не уложился в {analysis_pool.timeout_seconds} с") from exc
@@ -0,0 +1,108 @@
+"""Канал LISTEN/NOTIFY Postgres на отдельном соединении вне пула SQLAlchemy с переподключением после обрыва"""
+import asyncio
+import logging
+from typing import Any, Callable
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PayloadHandler = Callable[[str], None]
+
+
+class PostgresNotifyChannel:
+    """Канал LISTEN/NOTIFY Postgres: payload, отправленный любым процессом приложения, доходит до обработчиков
+    всех процессов. Если соединение оборвалось (например, Postgres перезапущен), канал подключается заново,
+    пока не получится, и вызывает on_reconnect: сообщения, отправленные за время обрыва, не доставлены"""
+
+    def __init__(
+        self,
+        database_url: str,
+        channel: str,
+        reconnect_delay_seconds: float | None = None,
+    ):
+        self._dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        if reconnect_delay_seconds is None:
+            reconnect_delay_seconds = settings.postgres_notify_reconnect_seconds
+        self.reconnect_delay_seconds = reconnect_delay_seconds
+        self._connection: asyncpg.Connection | None = None
+        self._on_payload: PayloadHandler | None = None
+        self._on_reconnect: Callable[[], None] | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        # asyncpg не выполняет запросы одного соединения параллельно
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        """Подключен ли канал"""
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self, on_payload: PayloadHandler, on_reconnect: Callable[[], None] | None = None) -> None:
+        """Подключиться и подписаться на канал"""
+        self._on_payload = on_payload
+        self._on_reconnect = on_reconnect
+        await self._connect()
+
+    async def notify(self, payload: str) -> None:
+        """Отправить payload в канал, NOTIFY ограничен 8000 байтами
+
+        :raises RuntimeError: если канал не подключен
+        """
+        if self._connection is None or not self.is_connected:
+            raise RuntimeError(f"Канал {self.channel} не подключен")
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def close(self) -> None:
+        """Отписаться от канала и закрыть соединение, переподключение прекращается"""
+        self._on_payload = None
+        self._on_reconnect = None
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    async def _connect(self) -> None:
+        """Открыть соединение, подписаться на канал и на обрыв соединения"""
+        connection = await asyncpg.connect(self._dsn)
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+        except BaseException:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._on_termination)
+        self._connection = connection
+
+    def _on_termination(self, connection: asyncpg.Connection) -> None:
+        """Соединение закрылось не через close: переподключиться в фоне"""
+        if connection is not self._connection:
+            return
+        logger.warning("Соединение канала %s оборвалось, переподключение", self.channel)
+        self._connection = None
+        self._reconnect_task = asyncio.create_task(self._reconnect(), name=f"pg-notify-reconnect-{self.channel}")
+
+    async def _reconnect(self) -> None:
+        """Подключаться заново с паузой reconnect_delay_seconds, пока не получится"""
+        while True:
+            await asyncio.sleep(self.reconnect_delay_seconds)
+            try:
+                await self._connect()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.warning("Не удалось переподключить канал %s", self.channel, exc_info=True)
+                continue
+            logger.info("Канал %s переподключен", self.channel)
+            if self._on_reconnect is not None:
+                self._on_reconnect()
+            return
+
+    def _on_notification(self, _connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        """Передать payload из канала обработчику"""
+        if self._on_payload is not None:
+            self._on_payload(payload)
@@ -0,0 +1,104 @@
+"""Утилиты для работы с проектами: удаление вместе со связанными данными, курсор списка проектов,
+подписанные ссылки на музыку"""
+import asyncio
+import base64
+import binascii
+import datetime
+import logging
+import uuid
+from typing import Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    MusicJobModel,
+    MusicModel,
+    ProjectGrantCodeModel,
+    ProjectGrantModel,
+    ProjectModel,
+    TextModel,
+)
+from app.music_storage import delete_unreferenced_objects
+from app.s3_helpers import generate_presigned_url, list_keys
+from app.tiptap_utils import TipTapClient
+
+logger = logging.getLogger(__name__)
+
+
+def encode_project_cursor(project: ProjectModel) -> str:
+    """Непрозрачный курсор страницы списка проектов: ключ сортировки последнего проекта страницы"""
+    return base64.urlsafe_b64encode(f"{project.updated_at.isoformat()}|{project.project_id}".encode()).decode()
+
+
+def decode_project_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    """Ключ сортировки (updated_at, project_id) из курсора, ValueError для некорректного курсора"""
+    try:
+        updated_at, project_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    except (binascii.Error, UnicodeDecodeError) as error:
+        raise ValueError("Некорректный курсор") from error
+    return datetime.datetime.fromisoformat(updated_at), uuid.UUID(project_id)
+
+
+async def sign_music_urls(projects: Iterable[ProjectModel]) -> dict[uuid.UUID, str]:
+    """Подписанные ссылки на музыку проектов, у которых она есть, по ID проекта. Ссылки подписываются параллельно"""
+    music_keys = {project.project_id: project.music.url for project in projects if project.music}
+    urls = await asyncio.gather(*(generate_presigned_url(key) for key in music_keys.values()))
+    return dict(zip(music_keys, urls))
+
+
+async def delete_projects(
+    project_ids: Iterable[uuid.UUID], db_session: AsyncSession, tiptap_client: TipTapClient
+) -> None:
+    """Удаление проектов с текстами, музыкой, кодами доступа и правами.
+    Строки удаляются множественными DELETE в одной транзакции, после ее фиксации с s3 удаляются файлы музыки
+    и остатки с префиксом проекта, а из TipTap - документы текстов. Ошибки очистки s3 и TipTap
+    логируются и не отменяют удаление проектов"""
+    project_ids = list(project_ids)
+    text_ids = list(await db_session.scalars(select(TextModel.text_id).where(TextModel.project_id.in_(project_ids))))
+    music_ids = select(MusicModel.music_id).where(MusicModel.project_id.in_(project_ids))
+    music_keys = list(await db_session.scalars(select(MusicModel.url).where(MusicModel.project_id.in_(project_ids))))
+
+    for statement in (
+        delete(MusicJobModel).where(MusicJobModel.music_id.in_(music_ids)),
+        delete(MusicModel).where(MusicModel.project_id.in_(project_ids)),
+        delete(TextModel).where(TextModel.project_id.in_(project_ids)),
+        delete(ProjectGrantModel).where(ProjectGrantModel.project_id.in_(project_ids)),
+        delete(ProjectGrantCodeModel).where(ProjectGrantCodeModel.project_id.in_(project_ids)),
+        delete(ProjectModel).where(ProjectModel.project_id.in_(project_ids)),
+    ):
+        await db_session.execute(statement.execution_options(synchronize_session=False))
+    await db_session.commit()
+
+    await asyncio.gather(
+        _delete_project_objects(project_ids, music_keys, db_session),
+        _delete_tiptap_documents(text_ids, tiptap_client),
+    )
+
+
+async def _delete_project_objects(
+    project_ids: list[uuid.UUID], music_keys: list[str], db_session: AsyncSession
+) -> None:
+    """Удаление с s3 файлов музыки удаленных проектов и всех файлов с префиксами проектов"""
+    try:
+        prefixed_keys = await asyncio.gather(*(list_keys(f"{project_id}/") for project_id in project_ids))
+        failed = await delete_unreferenced_objects(
+            [*music_keys, *(key for keys in prefixed_keys for key in keys)], db_session
+        )
+        await db_session.commit()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Ошибка удаления файлов проектов %s с s3", project_ids)
+        return
+    if failed:
+        logger.error("Не удалось удалить с s3 файлы %s", failed)
+
+
+async def _delete_tiptap_documents(text_ids: list[uuid.UUID], tiptap_client: TipTapClient) -> None:
+    """Удаление документов текстов из TipTap"""
+    try:
+        failed = await tiptap_client.delete_documents([str(text_id) for text_id in text_ids])
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Ошибка удаления текстов %s из TipTap", text_ids)
+        return
+    if failed:
+        logger.error("Не удалось удалить из TipTap тексты %s", failed)
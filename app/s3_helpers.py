@@ -1,7 +1,67 @@
 """Вспомогательные функции для работы с объектным хранилищем"""
+import contextlib
+import os
+from typing import Any, AsyncIterator, BinaryIO, Iterable
+
 import aioboto3
+from botocore.config import Config
 
+from app.cache import TTLCache
 from app.config import settings
+from app.s3_presigner import presign_get_object
+
+S3_ENDPOINT_URL = "https://storage.yandexcloud.net"
+S3_REGION = "ru-central1"
+# Максимальное количество ключей в одном запросе DeleteObjects
+S3_DELETE_BATCH_SIZE = 1000
+
+
+class S3ClientManager:
+    """Менеджер клиента s3: один клиент с пулом соединений на все время работы приложения,
+    чтобы не загружать модель сервиса, учетные данные и не открывать TLS-соединения на каждый вызов"""
+
+    def __init__(self, max_pool_connections: int):
+        self._config = Config(max_pool_connections=max_pool_connections)
+        self._exit_stack: contextlib.AsyncExitStack | None = None
+        self._client: Any = None
+
+    def _create_client(self) -> Any:
+        """Контекстный менеджер нового клиента s3"""
+        session = aioboto3.Session(
+            aws_access_key_id=settings.s3_access_key,
+            aws_secret_access_key=settings.s3_secret_key,
+            region_name=S3_REGION,
+        )
+        return session.client("s3", endpoint_url=S3_ENDPOINT_URL, config=self._config)
+
+    async def start(self) -> None:
+        """Создание общего клиента"""
+        exit_stack = contextlib.AsyncExitStack()
+        self._client = await exit_stack.enter_async_context(self._create_client())
+        self._exit_stack = exit_stack
+
+    async def close(self) -> None:
+        """Закрытие общего клиента и его соединений"""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._client = None
+
+    @contextlib.asynccontextmanager
+    async def client(self) -> AsyncIterator[Any]:
+        """Клиент s3. До start (скрипты, тесты без lifespan) клиент создается на время вызова"""
+        if self._client is not None:
+            yield self._client
+            return
+        async with self._create_client() as s3_client:
+            yield s3_client
+
+
+s3_client_manager = S3ClientManager(max_pool_connections=settings.s3_max_pool_connections)
+# (bucket, key) -> (срок действия ссылки, pre-signed URL), время жизни задается для каждой ссылки
+presigned_url_cache: TTLCache[tuple[str, str], tuple[int, str]] = TTLCache(
+    max_size=settings.s3_presigned_url_cache_size, ttl_seconds=0
+)
 
 
 async def upload(
@@ -10,12 +70,8 @@ async def upload(
     bucket: str = settings.s3_bucket,
 ) -> str:
     """Загрузка файла на s3"""
-    session = aioboto3.Session(
-        aws_access_key_id=settings.s3_access_key,
-        aws_secret_access_key=settings.s3_secret_key,
-        region_name="ru-central1",
-    )
-    async with session.client("s3", endpoint_url="https://storage.yandexcloud.net") as s3_client:
+    presigned_url_cache.pop((bucket, key))
+    async with s3_client_manager.client() as s3_client:
         print(f"Uploading {key} to s3")
         await s3_client.put_object(Bucket=bucket, Key=key, Body=bytes_data)
         print(f"Finished Uploading {key} to s3")
@@ -23,18 +79,90 @@ async def upload(
     return f"s3://{key}"
 
 
-async def generate_presigned_url(key: str, bucket: str = settings.s3_bucket, expiration: int = 3600):
-    """Генерация ссылки на скачивание файла"""
-    session = aioboto3.Session(
-        aws_access_key_id=settings.s3_access_key,
-        aws_secret_access_key=settings.s3_secret_key,
-        region_name="ru-central1",
+async def upload_file(
+    key: str,
+    file_path: str,
+    bucket: str = settings.s3_bucket,
+) -> str:
+    """Потоковая загрузка файла с диска на s3.
+    Файлы больше settings.s3_multipart_threshold загружаются через multipart upload,
+    поэтому в памяти одновременно находится не больше одной части файла."""
+    file_size = os.path.getsize(file_path)
+    presigned_url_cache.pop((bucket, key))
+    async with s3_client_manager.client() as s3_client:
+        with open(file_path, "rb") as file:
+            if file_size <= settings.s3_multipart_threshold:
+                await s3_client.put_object(Bucket=bucket, Key=key, Body=file.read())
+            else:
+                await _multipart_upload(s3_client, bucket=bucket, key=key, file=file)
+
+    return f"s3://{key}"
+
+
+async def _multipart_upload(s3_client: Any, bucket: str, key: str, file: BinaryIO) -> None:
+    """Загрузка файла на s3 частями по settings.s3_multipart_chunk_size байт"""
+    multipart_upload = await s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+    upload_id = multipart_upload["UploadId"]
+    parts = []
+    try:
+        part_number = 1
+        while chunk := file.read(settings.s3_multipart_chunk_size):
+            part = await s3_client.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=chunk
+            )
+            # освобождаем часть до чтения следующей, чтобы в памяти не оказалось двух частей сразу
+            del chunk
+            parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+            part_number += 1
+        await s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        await s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+async def download_file(
+    key: str,
+    file_path: str,
+    bucket: str = settings.s3_bucket,
+) -> int:
+    """Потоковое скачивание файла с s3 на диск частями по settings.music_upload_chunk_size байт
+
+    :return: количество записанных байт
+    """
+    total_size = 0
+    async with s3_client_manager.client() as s3_client:
+        response = await s3_client.get_object(Bucket=bucket, Key=key)
+        with open(file_path, "wb") as file:
+            async with response["Body"] as stream:
+                while chunk := await stream.read(settings.music_upload_chunk_size):
+                    file.write(chunk)
+                    total_size += len(chunk)
+    return total_size
+
+
+async def generate_presigned_url(key: str, bucket: str = settings.s3_bucket, expiration: int = 3600) -> str:
+    """Генерация ссылки на скачивание файла. Ссылка переиспользуется, пока до истечения ее срока действия
+    остается не меньше settings.s3_presigned_url_min_ttl_seconds, так что браузер может взять файл из своего кэша"""
+    cached = presigned_url_cache.get((bucket, key))
+    if cached is not None and cached[0] == expiration:
+        return cached[1]
+    # подпись - локальное вычисление HMAC, клиент s3 для нее не нужен
+    url = presign_get_object(
+        bucket,
+        key,
+        expiration,
+        endpoint_url=S3_ENDPOINT_URL,
+        region=S3_REGION,
+        access_key=settings.s3_access_key,
+        secret_key=settings.s3_secret_key,
     )
-    async with session.client("s3", endpoint_url="https://storage.yandexcloud.net") as s3_client:
-        response = await s3_client.generate_presigned_url(
-            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expiration
+    if expiration > settings.s3_presigned_url_min_ttl_seconds:
+        presigned_url_cache.set(
+            (bucket, key), (expiration, url), ttl_seconds=expiration - settings.s3_presigned_url_min_ttl_seconds
         )
-        return response
+    return url
 
 
 async def delete(
@@ -42,10 +170,41 @@ async def delete(
     bucket: str = settings.s3_bucket,
 ):
     """Удаление файла из s3"""
-    session = aioboto3.Session(
-        aws_access_key_id=settings.s3_access_key,
-        aws_secret_access_key=settings.s3_secret_key,
-        region_name="ru-central1",
-    )
-    async with session.client("s3", endpoint_url="https://storage.yandexcloud.net") as s3_client:
+    presigned_url_cache.pop((bucket, key))
+    async with s3_client_manager.client() as s3_client:
         await s3_client.delete_object(Bucket=bucket, Key=key)
+
+
+async def delete_many(
+    keys: Iterable[str],
+    bucket: str = settings.s3_bucket,
+) -> list[str]:
+    """Удаление файлов из s3 запросами DeleteObjects по S3_DELETE_BATCH_SIZE ключей
+
+    :return: ключи, которые не удалось удалить
+    """
+    keys = list(dict.fromkeys(keys))
+    failed: list[str] = []
+    async with s3_client_manager.client() as s3_client:
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start : start + S3_DELETE_BATCH_SIZE]
+            for key in batch:
+                presigned_url_cache.pop((bucket, key))
+            response = await s3_client.delete_objects(
+                Bucket=bucket, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+    return failed
+
+
+async def list_keys(
+    prefix: str,
+    bucket: str = settings.s3_bucket,
+) -> list[str]:
+    """Ключи всех файлов s3 с заданным префиксом"""
+    keys: list[str] = []
+    async with s3_client_manager.client() as s3_client:
+        paginator = s3_client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+    return keys
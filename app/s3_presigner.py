@@ -0,0 +1,55 @@
+"""Локальная подпись ссылок на скачивание из s3 (AWS Signature Version 4, query string) без клиента s3"""
+import datetime
+import functools
+import hashlib
+import hmac
+from urllib.parse import quote, urlsplit
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+SERVICE = "s3"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+@functools.lru_cache(maxsize=16)
+def get_signing_key(secret_key: str, date: str, region: str, service: str = SERVICE) -> bytes:
+    """Ключ подписи, производный от секретного ключа, действует в течение суток date (YYYYMMDD)"""
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def get_presign_query(access_key: str, scope: str, amz_date: str, expiration: int) -> str:
+    """Канонические параметры запроса pre-signed URL без подписи, в порядке сортировки имен"""
+    return "&".join(
+        f"{name}={quote(value, safe='-_.~')}"
+        for name, value in (
+            ("X-Amz-Algorithm", ALGORITHM),
+            ("X-Amz-Credential", f"{access_key}/{scope}"),
+            ("X-Amz-Date", amz_date),
+            ("X-Amz-Expires", str(expiration)),
+            ("X-Amz-SignedHeaders", "host"),
+        )
+    )
+
+
+def presign_get_object(
+    bucket: str,
+    key: str,
+    expiration: int,
+    *,
+    endpoint_url: str,
+    region: str,
+    access_key: str,
+    secret_key: str,
+    now: datetime.datetime | None = None,
+) -> str:
+    """Pre-signed URL на скачивание объекта (path-style), совпадает с generate_presigned_url("get_object") botocore"""
+    amz_date = (now or datetime.datetime.now(datetime.UTC)).strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{amz_date[:8]}/{region}/{SERVICE}/aws4_request"
+    path = quote(f"/{bucket}/{key}", safe="/~")
+    query = get_presign_query(access_key, scope, amz_date, expiration)
+    canonical_request = f"GET\n{path}\n{query}\nhost:{urlsplit(endpoint_url).netloc}\n\nhost\n{UNSIGNED_PAYLOAD}"
+    string_to_sign = f"{ALGORITHM}\n{amz_date}\n{scope}\n{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+    signature = hmac.new(get_signing_key(secret_key, amz_date[:8], region), string_to_sign.encode(), hashlib.sha256)
+    return f"{endpoint_url}{path}?{query}&X-Amz-Signature={signature.hexdigest()}"
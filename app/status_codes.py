@@ -12,7 +12,25 @@ PROJECT_NOT_OWNER: dict[int | str, dict[str, Any]] = {
 PROJECT_NO_PERMISSIONS: dict[int | str, dict[str, Any]] = {
     status.HTTP_403_FORBIDDEN: {"description": "Вы не имеете доступа к проекту"}
 }
+PROJECT_CURSOR_INVALID: dict[int | str, dict[str, Any]] = {
+    status.HTTP_400_BAD_REQUEST: {"description": "Некорректный курсор страницы списка проектов"}
+}
 MUSIC_NOT_FOUND: dict[int | str, dict[str, Any]] = {status.HTTP_400_BAD_REQUEST: {"description": "Музыка не найдена"}}
+MUSIC_TOO_LARGE: dict[int | str, dict[str, Any]] = {
+    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {"description": "Файл музыки превышает допустимый размер"}
+}
+MUSIC_ANALYSIS_BUSY: dict[int | str, dict[str, Any]] = {
+    status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Очередь анализа музыки переполнена, повторите попытку позже"}
+}
+MUSIC_JOB_NOT_FOUND: dict[int | str, dict[str, Any]] = {
+    status.HTTP_404_NOT_FOUND: {"description": "Задача обработки музыки не найдена"}
+}
+MUSIC_PEAKS_NOT_FOUND: dict[int | str, dict[str, Any]] = {
+    status.HTTP_404_NOT_FOUND: {"description": "Пики формы волны еще не вычислены или не вычислялись для этой музыки"}
+}
+MUSIC_BEATS_NOT_FOUND: dict[int | str, dict[str, Any]] = {
+    status.HTTP_404_NOT_FOUND: {"description": "Сетка долей еще не вычислена или доли в музыке не найдены"}
+}
 TEXT_NOT_FOUND: dict[int | str, dict[str, Any]] = {
     status.HTTP_404_NOT_FOUND: {"description": "Текста с заданным id не существует"}
 }
@@ -34,3 +52,9 @@ USER_NOT_FOUND: dict[int | str, dict[str, Any]] = {
 NO_ACCESS_TO_USER_INFO: dict[int | str, dict[str, Any]] = {
     status.HTTP_403_FORBIDDEN: {"description": "У вас нет доступа к информации о пользователе"}
 }
+NOT_MODIFIED: dict[int | str, dict[str, Any]] = {
+    status.HTTP_304_NOT_MODIFIED: {"description": "Версия ресурса у клиента актуальна"}
+}
+LLM_TIMEOUT: dict[int | str, dict[str, Any]] = {
+    status.HTTP_504_GATEWAY_TIMEOUT: {"description": "LLM не ответила вовремя, повторите попытку позже"}
+}
@@ -1,18 +1,153 @@
 """Клиент TipTap"""
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Iterable
+
 import httpx
 
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых запрос повторяется
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
 
 class TipTapClient:
-    """Клиент TipTap"""
+    """Клиент REST API TipTap Cloud: один HTTP-клиент с пулом keep-alive соединений HTTP/2 на все время работы
+    приложения, чтобы не открывать TLS-соединение на каждый документ. Пакетные операции выполняются параллельно,
+    не больше concurrency запросов сразу, запросы повторяются при сетевых ошибках и ответах RETRY_STATUS_CODES"""
 
-    def __init__(self, app_id: str, api_secret: str):
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        app_id: str,
+        api_secret: str,
+        max_connections: int = 20,
+        concurrency: int = 10,
+        retries: int = 2,
+        retry_delay_seconds: float = 0.5,
+        timeout_seconds: float = 10,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
         self.app_id = app_id
         self.api_secret = api_secret
         self.base_url = f"https://{app_id}.collab.tiptap.cloud"
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_delay_seconds = retry_delay_seconds
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(timeout_seconds)
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Новый HTTP-клиент"""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": self.api_secret},
+            http2=True,
+            limits=self._limits,
+            timeout=self._timeout,
+            transport=self._transport,
+        )
+
+    async def start(self) -> None:
+        """Создание общего HTTP-клиента"""
+        self._client = self._create_client()
+
+    async def close(self) -> None:
+        """Закрытие общего HTTP-клиента и его соединений"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    @contextlib.asynccontextmanager
+    async def client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """HTTP-клиент. До start (скрипты, тесты без lifespan) клиент создается на время вызова"""
+        if self._client is not None:
+            yield self._client
+            return
+        async with self._create_client() as client:
+            yield client
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> tuple[httpx.Response, int]:
+        """Запрос к API с повторами, последняя сетевая ошибка пробрасывается
+
+        :return: ответ и номер попытки, на которую он получен, 0 - первая попытка
+        """
+        async with self.client() as client:
+            attempt = 0
+            while True:
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                        return response, attempt
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                await asyncio.sleep(self.retry_delay_seconds * 2**attempt)
+                attempt += 1
 
     async def delete_document(self, document_id: str) -> bool:
-        """Удаление документа"""
-        url = f"{self.base_url}/api/documents/{document_id}"
-        async with httpx.AsyncClient(headers={"Authorization": self.api_secret}) as client:
-            response = await client.delete(url)
-            return response.status_code == 204
+        """Удаление документа. 404 на повторный запрос - успех: документ удалила предыдущая попытка,
+        ответ на которую потерян"""
+        response, attempt = await self._request("DELETE", f"/api/documents/{document_id}")
+        return response.status_code == 204 or (response.status_code == 404 and attempt > 0)
+
+    async def delete_documents(self, document_ids: Iterable[str]) -> list[str]:
+        """Удаление нескольких документов
+
+        :return: документы, которые не удалось удалить, ошибки логируются
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def delete(document_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self.delete_document(document_id)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.exception("Ошибка удаления документа %s из TipTap", document_id)
+                    return False
+
+        document_ids = list(document_ids)
+        deleted = await asyncio.gather(*(delete(document_id) for document_id in document_ids))
+        return [document_id for document_id, is_deleted in zip(document_ids, deleted) if not is_deleted]
+
+    async def get_document(self, document_id: str) -> dict | None:
+        """Содержимое документа в формате JSON, None - документа нет"""
+        response, _ = await self._request("GET", f"/api/documents/{document_id}", params={"format": "json"})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        document: dict = response.json()
+        return document
+
+    async def get_documents(self, document_ids: Iterable[str]) -> dict[str, dict | None]:
+        """Содержимое нескольких документов, None - документа нет"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def get(document_id: str) -> dict | None:
+            async with semaphore:
+                return await self.get_document(document_id)
+
+        document_ids = list(document_ids)
+        documents = await asyncio.gather(*(get(document_id) for document_id in document_ids))
+        return dict(zip(document_ids, documents))
+
+    async def list_documents(self, take: int = 100, skip: int = 0) -> list[dict]:
+        """Страница списка документов приложения"""
+        response, _ = await self._request("GET", "/api/documents", params={"take": take, "skip": skip})
+        response.raise_for_status()
+        documents: list[dict] = response.json()
+        return documents
+
+
+tiptap_client = TipTapClient(
+    app_id=settings.tiptap_app_id,
+    api_secret=settings.tiptap_api_secret,
+    max_connections=settings.tiptap_max_connections,
+    concurrency=settings.tiptap_concurrency,
+    retries=settings.tiptap_retries,
+)
@@ -0,0 +1,118 @@
+"""Обработка webhook TipTap: коалесцирующий буфер обновлений документов"""
+import asyncio
+import datetime
+import logging
+import uuid
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Iterable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.change_feed import ChangeAction, publish_text_changes
+from app.config import settings
+from app.database import sessionmanager
+from app.models import ProjectModel, TextModel
+
+logger = logging.getLogger(__name__)
+
+
+async def touch_texts(text_ids: Iterable[uuid.UUID], db_session: AsyncSession) -> list[tuple[uuid.UUID, uuid.UUID]]:
+    """Отметить тексты и их проекты измененными двумя UPDATE в одной транзакции независимо от числа текстов
+    и сообщить об изменении в ленту изменений, получатели всех текстов определяются одним запросом
+
+    :return: обновленные тексты, (text_id, project_id), несуществующие тексты пропускаются
+    """
+    text_ids = set(text_ids)
+    if not text_ids:
+        return []
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    result = await db_session.execute(
+        update(TextModel)
+        .where(TextModel.text_id.in_(text_ids))
+        .values(updated_at=now)
+        .returning(TextModel.text_id, TextModel.project_id)
+    )
+    touched = [(text_id, project_id) for text_id, project_id in result.tuples() if project_id is not None]
+    if touched:
+        await db_session.execute(
+            update(ProjectModel)
+            .where(ProjectModel.project_id.in_({project_id for _, project_id in touched}))
+            .values(updated_at=now)
+        )
+    await db_session.commit()
+
+    await publish_text_changes(db_session, ChangeAction.UPDATED, touched)
+    return touched
+
+
+class DocumentUpdateBuffer:
+    """Буфер обновлений документов из webhook TipTap. Во время редактирования TipTap присылает webhook
+    на каждое сохранение, буфер объединяет их по документу и раз в flush_interval_seconds записывает все
+    накопленные документы одной пачкой.
+
+    Гарантии: webhook получает ответ до записи в БД. При штатной остановке буфер записывается в stop,
+    при аварийном завершении процесса теряются только отметки времени изменения за последний интервал -
+    содержимое документов хранится в TipTap. До start (скрипты, тесты без lifespan) каждое обновление
+    записывается сразу в сессии запроса"""
+
+    def __init__(
+        self,
+        flush_interval_seconds: float,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = sessionmanager.session,
+    ):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._session_factory = session_factory
+        self._pending: set[uuid.UUID] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запуск периодической записи в текущем event loop"""
+        self._task = asyncio.create_task(self._run(), name="tiptap-document-updates")
+
+    async def stop(self) -> None:
+        """Остановка периодической записи с записью накопленных обновлений"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Ошибка записи обновлений документов TipTap при остановке")
+
+    async def submit(self, text_id: uuid.UUID, db_session: AsyncSession) -> None:
+        """Принять обновление документа"""
+        if self._task is None:
+            await touch_texts([text_id], db_session)
+            return
+        self._pending.add(text_id)
+
+    async def flush(self) -> int:
+        """Записать накопленные обновления
+
+        :return: количество записанных документов
+        """
+        if not self._pending:
+            return 0
+        text_ids, self._pending = self._pending, set()
+        async with self._session_factory() as db_session:
+            touched = await touch_texts(text_ids, db_session)
+        return len(touched)
+
+    async def _run(self) -> None:
+        """Цикл записи накопленных обновлений. Если запись не удалась, обновления возвращаются в буфер"""
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            text_ids = set(self._pending)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                self._pending |= text_ids
+                raise
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Ошибка записи обновлений %d документов TipTap", len(text_ids))
+                self._pending |= text_ids
+
+
+document_updates = DocumentUpdateBuffer(flush_interval_seconds=settings.tiptap_webhook_flush_interval_seconds)
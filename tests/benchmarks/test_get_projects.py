@@ -0,0 +1,116 @@
+"""Бенчмарк запросов списка проектов: уровень доступа отдельным запросом на каждый проект (N+1)
+против одного запроса с уровнем доступа на SQLite с PROJECTS проектами.
+
+Бенчмарки не входят в CI, запуск:
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+import itertools
+import time
+import uuid
+
+import pytest
+from sqlalchemy import StaticPool, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.grant_utils import get_grant_level_by_user_and_project, get_projects_with_grant_level
+from app.models import Base, MusicModel, ProjectGrantCodeModel, ProjectGrantModel, ProjectModel, TextModel
+from app.models.grant import GrantLevel
+
+PROJECTS = 1000
+
+
+async def get_projects_n_plus_one(
+    user_id: uuid.UUID, db_session: AsyncSession
+) -> list[tuple[ProjectModel, GrantLevel | None]]:
+    """Проекты и уровни доступа, как до объединения запросов"""
+    query_grants = await db_session.execute(
+        select(ProjectModel)
+        .options(selectinload(ProjectModel.music), selectinload(ProjectModel.texts))
+        .join(ProjectGrantModel)
+        .where(ProjectGrantModel.user_id == user_id)
+        .where(ProjectGrantModel.is_active.is_(True))
+    )
+    query_ownership = await db_session.execute(
+        select(ProjectModel)
+        .options(selectinload(ProjectModel.music), selectinload(ProjectModel.texts))
+        .where(ProjectModel.owner_user_id == user_id)
+    )
+    return [
+        (project, await get_grant_level_by_user_and_project(user_id, project.project_id, db_session))
+        for project in itertools.chain(query_grants.scalars().all(), query_ownership.scalars().all())
+    ]
+
+
+async def fill_database(db_session: AsyncSession, user_id: uuid.UUID) -> None:
+    """PROJECTS проектов с текстом и музыкой, половина принадлежит пользователю, к остальным у него есть доступ"""
+    owner_id = uuid.uuid4()
+    for number in range(PROJECTS):
+        project = ProjectModel(owner_user_id=user_id if number % 2 else owner_id, name=f"Project {number}")
+        db_session.add(project)
+        await db_session.flush()
+        db_session.add_all(
+            [
+                TextModel(project_id=project.project_id),
+                MusicModel(project_id=project.project_id, url=f"{number}.mp3", duration_seconds=41.6),
+            ]
+        )
+        if number % 2 == 0:
+            grant_code = ProjectGrantCodeModel(
+                project_id=project.project_id, issuer_user_id=owner_id, level=GrantLevel.READ_WRITE, max_activations=1
+            )
+            db_session.add(grant_code)
+            await db_session.flush()
+            db_session.add(
+                ProjectGrantModel(
+                    project_id=project.project_id,
+                    user_id=user_id,
+                    grant_code_id=grant_code.grant_code_id,
+                    level=GrantLevel.READ_WRITE,
+                )
+            )
+    await db_session.commit()
+
+
+async def time_get_projects(
+    get_projects, user_id: uuid.UUID, session_maker: async_sessionmaker, statements: list[str]
+) -> tuple[float, int, set[tuple[uuid.UUID, GrantLevel | None]]]:
+    """Время получения списка проектов в секундах, количество SQL-запросов и проекты с уровнями доступа"""
+    async with session_maker() as db_session:
+        statements.clear()
+        start = time.perf_counter()
+        projects = await get_projects(user_id, db_session)
+        elapsed = time.perf_counter() - start
+    return elapsed, len(statements), {(project.project_id, level) for project, level in projects}
+
+
+@pytest.mark.asyncio
+async def test_single_query_is_faster():
+    """Один запрос с уровнем доступа выполняет постоянное число запросов и быстрее N+1"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    user_id = uuid.uuid4()
+    async with session_maker() as db_session:
+        await fill_database(db_session, user_id)
+
+    old_time, old_statements, old_projects = await time_get_projects(
+        get_projects_n_plus_one, user_id, session_maker, statements
+    )
+    new_time, new_statements, new_projects = await time_get_projects(
+        get_projects_with_grant_level, user_id, session_maker, statements
+    )
+    await engine.dispose()
+
+    print(f"\nN+1: {old_time * 1000:.1f} мс, {old_statements} SQL-запросов")
+    print(f"Один запрос: {new_time * 1000:.1f} мс, {new_statements} SQL-запросов")
+    print(f"Ускорение: x{old_time / new_time:.1f}")
+    assert new_projects == old_projects and len(new_projects) == PROJECTS
+    # selectinload загружает музыку и тексты пачками по 500 проектов
+    assert new_statements == 1 + 2 * 2
+    assert old_statements > PROJECTS
+    assert new_time < old_time
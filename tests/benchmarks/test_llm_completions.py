@@ -0,0 +1,98 @@
+"""Нагрузочный бенчмарк автодополнения: REQUESTS одновременных запросов к поддельному серверу OpenAI
+с задержкой LATENCY_SECONDS через синхронный клиент OpenAI в async-обработчике (как до перехода на AsyncOpenAI)
+и через общий LLMClient. Измеряется общее время и наибольшая задержка event loop.
+
+Бенчмарки не входят в CI, запуск:
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator
+
+import httpx
+import pytest
+from openai import OpenAI
+
+from tests.fake_llm import FakeLLMServer
+
+REQUESTS = 20
+LATENCY_SECONDS = 0.1
+CONCURRENCY = 10
+
+
+@contextlib.asynccontextmanager
+async def measure_loop_lag() -> AsyncIterator[list[float]]:
+    """Наибольшее опоздание периодической задачи event loop за время контекста"""
+    lag = [0.0]
+
+    async def tick() -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag[0] = max(lag[0], time.perf_counter() - started - 0.01)
+
+    task = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    try:
+        yield lag
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_completions(fake_llm: FakeLLMServer):
+    """Запросы через LLMClient выполняются параллельно и не останавливают event loop"""
+    fake_llm.latency_seconds = LATENCY_SECONDS
+
+    def handle_sync(request: httpx.Request) -> httpx.Response:
+        time.sleep(LATENCY_SECONDS)
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-sync",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "test",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "и танцевать!"},
+                        "finish_reason": "stop",
+                        "logprobs": None,
+                    }
+                ],
+            },
+        )
+
+    sync_client = OpenAI(api_key="test", http_client=httpx.Client(transport=httpx.MockTransport(handle_sync)))
+
+    async def complete_sync() -> None:
+        sync_client.chat.completions.create(model="test", messages=[])
+
+    async with measure_loop_lag() as sync_lag:
+        started = time.perf_counter()
+        await asyncio.gather(*(complete_sync() for _ in range(REQUESTS)))
+        sync_seconds = time.perf_counter() - started
+
+    client = fake_llm.client(concurrency=CONCURRENCY, user_concurrency=CONCURRENCY)
+    await client.start()
+    try:
+        async with measure_loop_lag() as async_lag:
+            started = time.perf_counter()
+            await asyncio.gather(*(client.complete(model="test", messages=[]) for _ in range(REQUESTS)))
+            async_seconds = time.perf_counter() - started
+    finally:
+        await client.close()
+
+    print(
+        f"\n{REQUESTS} запросов по {LATENCY_SECONDS * 1000:.0f} мс:"
+        f"\n  синхронный OpenAI: {sync_seconds:.2f} с, задержка event loop {sync_lag[0] * 1000:.0f} мс"
+        f"\n  LLMClient ({CONCURRENCY} одновременно): {async_seconds:.2f} с,"
+        f" задержка event loop {async_lag[0] * 1000:.0f} мс"
+    )
+    assert fake_llm.max_in_flight == CONCURRENCY
+    assert async_seconds < sync_seconds
+    assert async_lag[0] < LATENCY_SECONDS
@@ -0,0 +1,68 @@
+"""Бенчмарк декодирования музыки для определения BPM: временный WAV-файл против PCM из stdout ffmpeg.
+
+Бенчмарки не входят в CI, запуск (нужен ffmpeg):
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+import os
+import subprocess
+import time
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from aubio import source  # pylint: disable=no-name-in-module
+
+from app.music_utils import analyze_file, detect_bpm
+
+FIXTURE = str(Path(__file__).parent.parent / "integration_tests" / "test_data" / "metro_200bpm_5min.mp3")
+ROUNDS = 3
+WAV_SIZES: list[int] = []
+
+
+def detect_file_bpm_via_wav(path: str) -> int | None:
+    """Прежний способ: транскодирование во временный WAV и чтение его через aubio.source"""
+    win_s = 512
+    hop_s = win_s // 2
+    with NamedTemporaryFile(suffix=".wav") as temporary_file:
+        subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", path, temporary_file.name], check=True)
+        WAV_SIZES.append(os.path.getsize(temporary_file.name))
+        audio_source = source(temporary_file.name, hop_size=hop_s)
+
+        def frames():
+            while True:
+                audio_samples, frames_read = audio_source()
+                yield audio_samples
+                if frames_read < hop_s:
+                    break
+
+        return detect_bpm(frames(), audio_source.samplerate, win_s)
+
+
+def detect_file_bpm_via_pipe(path: str) -> int | None:
+    """Текущий способ: PCM из stdout ffmpeg, метаданные из того же запуска"""
+    return analyze_file(path).bpm
+
+
+def best_time(func, *args) -> tuple[float, int | None]:
+    """Лучшее время из ROUNDS запусков и результат"""
+    timings = []
+    result = None
+    for _ in range(ROUNDS):
+        started_at = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings), result
+
+
+def test_pcm_pipe_is_not_slower_than_wav_file():
+    """Декодирование в PCM через pipe не пишет на диск, не медленнее временного WAV и дает тот же BPM.
+    На одном ядре выигрыш только в дисковом вводе-выводе, на нескольких ffmpeg и анализ работают параллельно."""
+    wav_time, wav_bpm = best_time(detect_file_bpm_via_wav, FIXTURE)
+    pipe_time, pipe_bpm = best_time(detect_file_bpm_via_pipe, FIXTURE)
+
+    print(f"\nWAV-файл: {wav_time:.3f} с, BPM {wav_bpm}")
+    print(f"PCM pipe: {pipe_time:.3f} с, BPM {pipe_bpm}")
+    print(f"Ускорение: x{wav_time / pipe_time:.2f}, не записано на диск: {WAV_SIZES[-1] / 1024 / 1024:.1f} МиБ")
+
+    assert pipe_bpm == wav_bpm
+    assert pipe_time < wav_time * 1.1
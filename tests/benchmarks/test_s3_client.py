@@ -0,0 +1,86 @@
+"""Бенчмарк накладных расходов на вызов s3: новая сессия и клиент на каждый вызов против общего клиента,
+подпись ссылок botocore против локальной подписи и кэша ссылок.
+
+Генерация pre-signed URL не обращается к сети, поэтому измеряется только создание сессии и клиента
+(учетные данные, модель сервиса botocore, пул соединений) и сама подпись. Бенчмарки не входят в CI, запуск:
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+import time
+
+import pytest
+
+from app import s3_helpers
+from app.s3_helpers import S3ClientManager, generate_presigned_url, presigned_url_cache
+
+CALLS = 50
+PROJECTS = 500
+
+
+async def botocore_presigned_url(key: str) -> str:
+    """Подпись ссылки клиентом s3, как до локальной подписи"""
+    async with s3_helpers.s3_client_manager.client() as s3_client:
+        url: str = await s3_client.generate_presigned_url(
+            "get_object", Params={"Bucket": "bucket", "Key": key}, ExpiresIn=3600
+        )
+        return url
+
+
+async def time_botocore_presigned_urls(calls: int) -> float:
+    """Среднее время подписи ссылки клиентом s3 в секундах"""
+    start = time.perf_counter()
+    for number in range(calls):
+        await botocore_presigned_url(f"project/music/{number}.mp3")
+    return (time.perf_counter() - start) / calls
+
+
+async def time_presigned_urls(calls: int, cached: bool = False) -> float:
+    """Среднее время generate_presigned_url в секундах, cached - ссылки уже есть в кэше"""
+    if not cached:
+        presigned_url_cache.clear()
+    start = time.perf_counter()
+    for number in range(calls):
+        await generate_presigned_url(f"project/music/{number}.mp3", bucket="bucket")
+    return (time.perf_counter() - start) / calls
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_faster(monkeypatch):
+    """Общий клиент убирает создание сессии и клиента из каждого вызова"""
+    await botocore_presigned_url("warmup.mp3")
+    per_call_time = await time_botocore_presigned_urls(CALLS)
+
+    manager = S3ClientManager(max_pool_connections=10)
+    monkeypatch.setattr("app.s3_helpers.s3_client_manager", manager)
+    await manager.start()
+    try:
+        shared_time = await time_botocore_presigned_urls(CALLS)
+    finally:
+        await manager.close()
+
+    print(f"\nКлиент на каждый вызов: {per_call_time * 1000:.2f} мс/вызов")
+    print(f"Общий клиент: {shared_time * 1000:.2f} мс/вызов")
+    print(f"Ускорение: x{per_call_time / shared_time:.1f}")
+    assert shared_time * 5 < per_call_time
+
+
+@pytest.mark.asyncio
+async def test_local_presigner_is_faster(monkeypatch):
+    """Список из PROJECTS проектов: локальная подпись и кэш ссылок против подписи общим клиентом botocore"""
+    manager = S3ClientManager(max_pool_connections=10)
+    monkeypatch.setattr("app.s3_helpers.s3_client_manager", manager)
+    await manager.start()
+    try:
+        botocore_time = await time_botocore_presigned_urls(PROJECTS)
+    finally:
+        await manager.close()
+    local_time = await time_presigned_urls(PROJECTS)
+    cached_time = await time_presigned_urls(PROJECTS, cached=True)
+
+    print(
+        f"\nПодпись botocore: {botocore_time * 1e6:.0f} мкс/вызов, {botocore_time * PROJECTS * 1000:.1f} мс на список"
+    )
+    print(f"Локальная подпись: {local_time * 1e6:.1f} мкс/вызов, {local_time * PROJECTS * 1000:.1f} мс на список")
+    print(f"Кэш: {cached_time * 1e6:.1f} мкс/вызов, {cached_time * PROJECTS * 1000:.2f} мс на список")
+    assert local_time * 10 < botocore_time
+    assert cached_time < local_time
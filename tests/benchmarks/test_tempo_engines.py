@@ -0,0 +1,46 @@
+"""Бенчмарк алгоритмов определения BPM: покадровый aubio против автокорреляции на numpy, весь трек и фрагмент.
+
+Бенчмарки не входят в CI, запуск (нужен ffmpeg):
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+from pathlib import Path
+
+import pytest
+
+from app.music_utils import analyze_file
+from tests.benchmarks.test_music_decoding import best_time
+
+FIXTURE = str(Path(__file__).parent.parent / "integration_tests" / "test_data" / "metro_200bpm_5min.mp3")
+FIXTURE_BPM = 200
+
+
+def detect_file_bpm(path: str, engine: str, window_seconds: float | None) -> int | None:
+    """BPM файла выбранным алгоритмом"""
+    return analyze_file(path, engine=engine, window_seconds=window_seconds).bpm
+
+
+@pytest.mark.parametrize("window_seconds", [None, 60])
+def test_numpy_engine_is_not_slower_than_aubio(window_seconds: float | None):
+    """Автокорреляция на numpy не медленнее aubio и не ошибается в октаве на метрономе 200 BPM"""
+    aubio_time, aubio_bpm = best_time(detect_file_bpm, FIXTURE, "aubio", window_seconds)
+    numpy_time, numpy_bpm = best_time(detect_file_bpm, FIXTURE, "numpy", window_seconds)
+
+    print(f"\nФрагмент: {window_seconds or 'весь трек'}")
+    print(f"aubio: {aubio_time:.3f} с, BPM {aubio_bpm}")
+    print(f"numpy: {numpy_time:.3f} с, BPM {numpy_bpm}")
+    print(f"Ускорение: x{aubio_time / numpy_time:.2f}")
+
+    assert numpy_bpm is not None and abs(numpy_bpm - FIXTURE_BPM) <= 1
+    assert numpy_time < aubio_time * 1.1
+
+
+def test_window_is_faster_than_whole_track():
+    """Анализ фрагмента из середины прерывает декодирование и быстрее анализа всего трека"""
+    whole_time, whole_bpm = best_time(detect_file_bpm, FIXTURE, "numpy", None)
+    window_time, window_bpm = best_time(detect_file_bpm, FIXTURE, "numpy", 60)
+
+    print(f"\nВесь трек: {whole_time:.3f} с, фрагмент 60 с: {window_time:.3f} с")
+
+    assert window_bpm == whole_bpm
+    assert window_time < whole_time
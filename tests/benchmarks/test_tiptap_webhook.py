@@ -0,0 +1,91 @@
+"""Бенчмарк записи в БД по webhook TipTap: чтение текста с проектом и commit на каждый webhook
+против коалесцирующего буфера на SQLite, WEBHOOKS webhook по DOCUMENTS документам за интервал записи.
+
+Бенчмарки не входят в CI, запуск:
+cd tests/benchmarks && PYTHONPATH="../../:$PYTHONPATH" pytest -s .
+"""
+
+import contextlib
+import datetime
+import itertools
+import time
+import uuid
+
+import pytest
+from sqlalchemy import StaticPool, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.models import Base, ProjectModel, TextModel
+from app.tiptap_webhooks import DocumentUpdateBuffer
+
+DOCUMENTS = 10
+WEBHOOKS = 1000
+
+
+async def update_document_per_webhook(text_id: uuid.UUID, db_session: AsyncSession) -> None:
+    """Обработка webhook, как до буфера"""
+    text_model = await db_session.get(TextModel, text_id, options=[selectinload(TextModel.project)])
+    if text_model is None:
+        return
+    new_updated_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    text_model.updated_at = new_updated_at
+    text_model.project.updated_at = new_updated_at
+    await db_session.commit()
+
+
+async def create_documents(engine: AsyncEngine, session_maker: async_sessionmaker[AsyncSession]) -> list[uuid.UUID]:
+    """Схема БД и проект с DOCUMENTS текстами"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with session_maker() as db_session:
+        project = ProjectModel(owner_user_id=uuid.uuid4())
+        db_session.add(project)
+        await db_session.flush()
+        texts = [TextModel(project_id=project.project_id) for _ in range(DOCUMENTS)]
+        db_session.add_all(texts)
+        await db_session.commit()
+    return [text.text_id for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_buffer_reduces_writes():
+    """Буфер записывает каждую пачку постоянным числом запросов вместо нескольких запросов на webhook"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    statements: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    text_ids = await create_documents(engine, session_maker)
+    webhooks = list(itertools.islice(itertools.cycle(text_ids), WEBHOOKS))
+
+    async with session_maker() as db_session:
+        statements.clear()
+        start = time.perf_counter()
+        for text_id in webhooks:
+            await update_document_per_webhook(text_id, db_session)
+        old_time, old_statements = time.perf_counter() - start, len(statements)
+
+    @contextlib.asynccontextmanager
+    async def session_factory():
+        async with session_maker() as session:
+            yield session
+
+    buffer = DocumentUpdateBuffer(flush_interval_seconds=3600, session_factory=session_factory)
+    buffer.start()
+    async with session_maker() as db_session:
+        statements.clear()
+        start = time.perf_counter()
+        for text_id in webhooks:
+            await buffer.submit(text_id, db_session)
+        assert await buffer.flush() == DOCUMENTS
+        new_time, new_statements = time.perf_counter() - start, len(statements)
+    await buffer.stop()
+    await engine.dispose()
+
+    print(f"\nЗапись на каждый webhook: {old_time * 1000:.1f} мс, {old_statements} SQL-запросов")
+    print(f"Буфер: {new_time * 1000:.1f} мс, {new_statements} SQL-запросов")
+    print(f"Запросов на webhook: {old_statements / WEBHOOKS:.2f} против {new_statements / WEBHOOKS:.3f}")
+    assert old_statements >= 2 * WEBHOOKS
+    # UPDATE текстов, UPDATE проектов, запрос получателей ленты изменений на каждый документ
+    assert new_statements <= 2 + DOCUMENTS + 2
+    assert new_time < old_time
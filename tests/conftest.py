@@ -1,12 +1,13 @@
 """Фикстуры для тестов"""
+
 import uuid
-from typing import AsyncIterator, AsyncGenerator
+from typing import AsyncIterator, AsyncGenerator, Iterator
 
 import pytest
 
 from httpx import AsyncClient
 from jose import jwt
-from sqlalchemy import StaticPool
+from sqlalchemy import StaticPool, event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.auth import get_new_email_auth_code
@@ -14,7 +15,10 @@ from app.main import app as main_app
 from app.database import get_db_session
 from app.models import Base, EmailAuthCodeModel
 
+from tests.fake_llm import FakeLLMServer
+from tests.fake_postgres import FakePostgres
 from tests.integration_tests.test_client.lyrics import LyricsClient
+from tests.smtp_server import LocalSMTPServer
 
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 engine = create_async_engine(
@@ -48,6 +52,19 @@ async def db_session_fixture() -> AsyncIterator[AsyncSession]:
             await connection.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(name="sql_statements", scope="function")
+def sql_statements_fixture() -> Iterator[list[str]]:
+    """Список SQL-запросов, выполненных тестовой базой данных во время теста"""
+    statements: list[str] = []
+
+    def before_cursor_execute(_connection, _cursor, statement, _parameters, _context, _executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture(name="unauthorized_client", scope="function")
 async def client_fixture() -> AsyncGenerator[AsyncClient, None]:
     """Клиент для тестов"""
@@ -116,3 +133,26 @@ async def new_project_fixture(lyrics_client: LyricsClient):
     """Создает новый проект для тестов"""
     project = await lyrics_client.create_project(name="Test project", description="Test description")
     return project
+
+
+@pytest.fixture(name="smtp_server", scope="function")
+async def smtp_server_fixture() -> AsyncIterator[LocalSMTPServer]:
+    """Локальный SMTP-сервер"""
+    server = LocalSMTPServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(name="fake_llm", scope="function")
+def fake_llm_fixture() -> FakeLLMServer:
+    """Поддельный сервер OpenAI"""
+    return FakeLLMServer()
+
+
+@pytest.fixture(name="fake_postgres", scope="function")
+def fake_postgres_fixture(monkeypatch) -> FakePostgres:
+    """Поддельный Postgres вместо asyncpg.connect для каналов LISTEN/NOTIFY"""
+    server = FakePostgres()
+    monkeypatch.setattr("app.pg_notify.asyncpg.connect", server.connect)
+    return server
@@ -0,0 +1,63 @@
+"""Поддельный сервер OpenAI chat completions для тестов и бенчмарков LLM"""
+import asyncio
+import json
+
+import httpx
+
+from app.llm import LLMClient
+
+
+class FakeLLMServer:
+    """Отвечает на запросы chat completions вариантами contents через latency_seconds, считает
+    одновременные и отмененные запросы. Подключается к клиенту через httpx.MockTransport, без сети"""
+
+    def __init__(self, latency_seconds: float = 0.0, contents: tuple[str | None, ...] = ("и танцевать!",)):
+        self.latency_seconds = latency_seconds
+        self.contents = contents
+        self.requests: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        """Транспорт HTTP-клиента, который отвечает от имени сервера"""
+        return httpx.MockTransport(self.handle)
+
+    def client(self, **kwargs) -> LLMClient:
+        """Клиент LLM, подключенный к серверу"""
+        return LLMClient(api_key="test", transport=self.transport, **kwargs)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """Ответ на запрос chat completions"""
+        body = json.loads(request.content)
+        self.requests.append(body)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        choices = [
+            {
+                "index": index,
+                "message": {"role": "assistant", "content": self.contents[index % len(self.contents)]},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }
+            for index in range(body.get("n") or 1)
+        ]
+        return httpx.Response(
+            200,
+            json={
+                "id": f"chatcmpl-{len(self.requests)}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": choices,
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            },
+        )
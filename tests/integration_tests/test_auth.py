@@ -1,9 +1,11 @@
 """Интеграционные тесты аутентификации"""
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
 
 from app.auth import get_new_email_auth_code
-from app.models import EmailAuthCodeModel
+from app.models import EmailAuthCodeModel, EmailOutboxModel
+from app.models.email_outbox import EmailOutboxStatus
 from tests.conftest import DBSession, EMAIL
 
 
@@ -24,3 +26,16 @@ async def test_login_for_access_token(db_session: DBSession, unauthorized_client
     assert "token_type" in response.json()
     assert response.json()["token_type"] == "bearer"
     assert response.json()["access_token"]
+
+
+@pytest.mark.asyncio
+async def test_send_email_auth_code(db_session: DBSession, unauthorized_client: AsyncClient):
+    """Код сохраняется вместе с письмом в очереди, эндпоинт не ждет SMTP-сервер"""
+    response = await unauthorized_client.post("/auth/email", json={"email": EMAIL})
+    assert response.status_code == 200
+
+    code = await db_session.scalar(select(EmailAuthCodeModel).where(EmailAuthCodeModel.email == EMAIL))
+    email = await db_session.scalar(select(EmailOutboxModel).where(EmailOutboxModel.to_email == EMAIL))
+    assert code is not None and email is not None
+    assert email.status == EmailOutboxStatus.PENDING
+    assert code.auth_code in email.body
@@ -23,3 +23,11 @@ class UnAuthorizedError(Exception):
 
 class MusicNotFoundError(NotFoundError):
     """Музыка не найдена"""
+
+
+class MusicJobNotFoundError(NotFoundError):
+    """Задача обработки музыки не найдена"""
+
+
+class BadRequestError(Exception):
+    """Некорректный запрос"""
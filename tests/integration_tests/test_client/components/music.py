@@ -1,15 +1,18 @@
 """Модуль для работы с музыкой"""
 import uuid
 
-from httpx import AsyncClient
+from httpx import AsyncClient, Response
 
 from tests.integration_tests.test_client.components.exceptions import (
+    MusicJobNotFoundError,
     MusicNotFoundError,
+    NotFoundError,
     ProjectNotFoundError,
     PermissionDeniedError,
 )
 
 
+# pylint: disable=too-many-arguments
 class Music:
     """Музыка"""
 
@@ -19,11 +22,65 @@ class Music:
         duration_seconds: float,
         bpm: int | None,
         custom_bpm: int | None,
+        codec: str | None = None,
+        bitrate: int | None = None,
+        sample_rate: int | None = None,
+        channels: int | None = None,
+        status: str = "READY",
+        job_id: uuid.UUID | None = None,
+        content_hash: str | None = None,
     ):
         self.url = url
         self.duration_seconds = duration_seconds
         self.bpm = bpm
         self.custom_bpm = custom_bpm
+        self.codec = codec
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.status = status
+        self.job_id = job_id
+        self.content_hash = content_hash
+
+
+class MusicJob:
+    """Задача фоновой обработки музыки"""
+
+    def __init__(
+        self, job_id: uuid.UUID, status: str, attempts: int, error: str | None, created_at: str, updated_at: str
+    ):
+        self.job_id = job_id
+        self.status = status
+        self.attempts = attempts
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class MusicPeaks:
+    """Пики формы волны музыки"""
+
+    def __init__(self, response: Response):
+        self.status_code = response.status_code
+        self.data = response.content
+        self.etag = response.headers["ETag"]
+        self.cache_control = response.headers["Cache-Control"]
+        self.sample_rate = int(response.headers["X-Peaks-Sample-Rate"])
+        self.samples_per_peak = int(response.headers["X-Samples-Per-Peak"])
+        self.count = int(response.headers["X-Peaks-Count"])
+
+
+class MusicBeats:
+    """Сетка долей музыки"""
+
+    def __init__(self, response: Response):
+        self.status_code = response.status_code
+        self.etag = response.headers["ETag"]
+        self.cache_control = response.headers["Cache-Control"]
+        data = response.json() if response.status_code == 200 else {}
+        self.bpm: int | None = data.get("bpm")
+        self.beats: list[float] = data.get("beats", [])
+        self.downbeats: list[float] = data.get("downbeats", [])
 
 
 class MusicMixin:
@@ -32,12 +89,13 @@ class MusicMixin:
     def __init__(self, client: AsyncClient):
         self.client = client
 
-    async def upload_music(self, file_path: str, project_id: uuid.UUID) -> Music:
+    async def upload_music(self, file_path: str, project_id: uuid.UUID, background: bool = False) -> Music:
         """Загрузить музыку"""
         with open(file_path, "rb") as file:
             response = await self.client.post(
                 f"/music/{project_id}",
                 files={"music": file},
+                params={"background": background},
             )
         if response.status_code == 404:
             raise ProjectNotFoundError("Проект не найден")
@@ -64,3 +122,44 @@ class MusicMixin:
         if response.status_code == 404:
             raise ProjectNotFoundError("Проект не найден")
         return Music(**response.json())
+
+    async def get_music_job(self, project_id: uuid.UUID, job_id: uuid.UUID) -> MusicJob:
+        """Получить задачу фоновой обработки музыки"""
+        response = await self.client.get(f"/music/{project_id}/jobs/{job_id}")
+        if response.status_code == 404:
+            raise MusicJobNotFoundError("Задача не найдена")
+        if response.status_code == 403:
+            raise PermissionDeniedError("Недостаточно прав")
+        return MusicJob(**response.json())
+
+    async def get_music_peaks(
+        self, project_id: uuid.UUID, level: int = 0, content_hash: str | None = None, etag: str | None = None
+    ) -> MusicPeaks:
+        """Получить пики формы волны музыки"""
+        params: dict[str, str | int] = {"level": level}
+        if content_hash is not None:
+            params["hash"] = content_hash
+        headers = {"If-None-Match": etag} if etag is not None else {}
+        response = await self.client.get(f"/music/{project_id}/peaks", params=params, headers=headers)
+        if response.status_code == 400:
+            raise MusicNotFoundError("Музыка не найдена")
+        if response.status_code == 404:
+            raise NotFoundError("Проект или пики не найдены")
+        if response.status_code == 403:
+            raise PermissionDeniedError("Недостаточно прав")
+        return MusicPeaks(response)
+
+    async def get_music_beats(
+        self, project_id: uuid.UUID, content_hash: str | None = None, etag: str | None = None
+    ) -> MusicBeats:
+        """Получить сетку долей музыки"""
+        params = {"hash": content_hash} if content_hash is not None else {}
+        headers = {"If-None-Match": etag} if etag is not None else {}
+        response = await self.client.get(f"/music/{project_id}/beats", params=params, headers=headers)
+        if response.status_code == 400:
+            raise MusicNotFoundError("Музыка не найдена")
+        if response.status_code == 404:
+            raise NotFoundError("Проект или сетка долей не найдены")
+        if response.status_code == 403:
+            raise PermissionDeniedError("Недостаточно прав")
+        return MusicBeats(response)
@@ -5,6 +5,7 @@ import uuid
 from httpx import AsyncClient
 
 from tests.integration_tests.test_client.components.exceptions import (
+    BadRequestError,
     PermissionDeniedError,
     UnAuthorizedError,
     ProjectNotFoundError,
@@ -16,8 +17,8 @@ from tests.integration_tests.test_client.components.text import Text
 
 
 # pylint: disable=too-many-arguments
-class Project:
-    """Проект"""
+class ProjectSummary:
+    """Проект в кратком представлении (fields=summary): варианты текста и музыка есть, только если запрошены в expand"""
 
     def __init__(
         self,
@@ -29,7 +30,7 @@ class Project:
         grant_level: GrantLevel | None,
         created_at: datetime.datetime,
         updated_at: datetime.datetime,
-        texts: list[dict],
+        texts: list[dict] | None,
         music: dict | None,
     ):
         self.project_id = uuid.UUID(project_id, version=4)
@@ -40,22 +41,32 @@ class Project:
         self.grant_level = grant_level
         self.created_at = created_at
         self.updated_at = updated_at
-        self.texts = [
-            Text(
-                text_id=text["text_id"],
-                project_id=project_id,
-                name=text["name"],
-                created_at=text["created_at"],
-                updated_at=text["updated_at"],
-            )
-            for text in texts
-        ]
+        self.texts = (
+            [
+                Text(
+                    text_id=text["text_id"],
+                    project_id=project_id,
+                    name=text["name"],
+                    created_at=text["created_at"],
+                    updated_at=text["updated_at"],
+                )
+                for text in texts
+            ]
+            if texts is not None
+            else None
+        )
         self.music = (
             Music(
                 url=music["url"],
                 duration_seconds=music["duration_seconds"],
                 bpm=music["bpm"],
                 custom_bpm=music["custom_bpm"],
+                codec=music["codec"],
+                bitrate=music["bitrate"],
+                sample_rate=music["sample_rate"],
+                channels=music["channels"],
+                status=music["status"],
+                content_hash=music["content_hash"],
             )
             if music
             else None
@@ -76,13 +87,19 @@ class Project:
         )
 
 
+class Project(ProjectSummary):
+    """Проект в полном представлении, варианты текста есть всегда"""
+
+    texts: list[Text]
+
+
 class ProjectsMixin:
     """Миксин для проектов"""
 
     def __init__(self, client: AsyncClient):
         self.client = client
 
-    async def create_project(self, name: str, description: str) -> Project:
+    async def create_project(self, name: str, description: str | None) -> Project:
         """Создать проект"""
         response = await self.client.post(
             "/projects/",
@@ -90,9 +107,9 @@ class ProjectsMixin:
         )
         return Project(**response.json())
 
-    async def get_project(self, project_id: uuid.UUID) -> Project:
+    async def get_project(self, project_id: uuid.UUID, **params) -> Project:
         """Получить проект по идентификатору"""
-        response = await self.client.get(f"/projects/{project_id}")
+        response = await self.client.get(f"/projects/{project_id}", params=params)
         if response.status_code == 404:
             raise ProjectNotFoundError("Проект не найден")
         return Project(**response.json())
@@ -107,10 +124,41 @@ class ProjectsMixin:
         if response.status_code == 403:
             raise PermissionDeniedError("Permission denied")
 
-    async def get_projects(self) -> list[Project]:
+    async def delete_projects(self, project_ids: list[uuid.UUID]) -> None:
+        """Удалить несколько проектов"""
+        response = await self.client.delete("/projects/", params={"project_id": [str(id_) for id_ in project_ids]})
+        if response.status_code == 404:
+            raise ProjectNotFoundError("Проект не найден")
+        if response.status_code == 401:
+            raise UnAuthorizedError("Unauthorized")
+        if response.status_code == 403:
+            raise PermissionDeniedError("Permission denied")
+
+    async def get_project_summary(self, project_id: uuid.UUID, **params) -> ProjectSummary:
+        """Получить краткое содержимое проекта (fields=summary)"""
+        response = await self.client.get(f"/projects/{project_id}", params={"fields": "summary", **params})
+        if response.status_code == 404:
+            raise ProjectNotFoundError("Проект не найден")
+        return ProjectSummary(**response.json())
+
+    async def get_projects(self, **params) -> list[Project]:
         """Получить список проектов"""
-        response = await self.client.get("/projects/")
-        return [Project(**project) for project in response.json()]
+        projects, _ = await self.get_projects_page(**params)
+        return projects
+
+    async def get_projects_summary(self, **params) -> list[ProjectSummary]:
+        """Получить краткий список проектов (fields=summary)"""
+        response = await self.client.get("/projects/", params={"fields": "summary", **params})
+        if response.status_code == 400:
+            raise BadRequestError(response.json()["detail"])
+        return [ProjectSummary(**project) for project in response.json()]
+
+    async def get_projects_page(self, **params) -> tuple[list[Project], str | None]:
+        """Получить страницу списка проектов и курсор следующей страницы"""
+        response = await self.client.get("/projects/", params=params)
+        if response.status_code == 400:
+            raise BadRequestError(response.json()["detail"])
+        return [Project(**project) for project in response.json()], response.headers.get("X-Next-Cursor")
 
     async def update_project(self, project_id: uuid.UUID, name: str | None, description: str | None) -> Project:
         """Обновить проект"""
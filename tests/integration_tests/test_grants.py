@@ -2,9 +2,12 @@
 import uuid
 
 import pytest
+from sqlalchemy.exc import IntegrityError
 
+from tests.conftest import DBSession
 from tests.integration_tests.test_client import LyricsClient
 from tests.integration_tests.test_client.components.exceptions import (
+    MusicNotFoundError,
     PermissionDeniedError,
     NotFoundError,
     ProjectNotFoundError,
@@ -247,3 +250,56 @@ async def test_deactivate_project_grant_code_not_owner(
     grant_code = await lyrics_client.get_project_share_code(new_project.project_id, "READ_WRITE", 1)
     with pytest.raises(PermissionDeniedError):
         await lyrics_client_b.deactivate_project_grant_code(grant_code.grant_code_id)
+
+
+@pytest.mark.asyncio
+async def test_project_access_cache(
+    lyrics_client: LyricsClient, lyrics_client_b: LyricsClient, new_project: Project, sql_statements: list[str]
+):
+    """Повторная проверка доступа к проекту не обращается к таблице доступов, отзыв доступа действует сразу"""
+    grant_code = await lyrics_client.get_project_share_code(new_project.project_id, "READ_WRITE", 1)
+    await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+
+    sql_statements.clear()
+    with pytest.raises(MusicNotFoundError):
+        await lyrics_client_b.get_music(new_project.project_id)
+    first_request_statements = len(sql_statements)
+    sql_statements.clear()
+    with pytest.raises(MusicNotFoundError):
+        await lyrics_client_b.get_music(new_project.project_id)
+    assert len(sql_statements) < first_request_statements
+
+    assert lyrics_client_b.user_id is not None
+    await lyrics_client.revoke_project_access(new_project.project_id, lyrics_client_b.user_id)
+    with pytest.raises(PermissionDeniedError):
+        await lyrics_client_b.get_music(new_project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_project_access_cache_failed_activation(
+    lyrics_client: LyricsClient, lyrics_client_b: LyricsClient, new_project: Project, db_session: DBSession, mocker
+):
+    """Активация нового кода удаляет старый доступ отдельным commit: если сохранить новый доступ не удалось,
+    старый доступ из кэша все равно сброшен"""
+    old_grant_code = await lyrics_client.get_project_share_code(new_project.project_id, "READ_WRITE", 1)
+    await lyrics_client_b.activate_project_share_code(old_grant_code.grant_code_id)
+    with pytest.raises(MusicNotFoundError):
+        await lyrics_client_b.get_music(new_project.project_id)
+    grant_code = await lyrics_client.get_project_share_code(new_project.project_id, "READ_WRITE", 1)
+
+    commit = db_session.commit
+
+    async def fail_second_commit():
+        if commit_mock.await_count == 1:
+            await commit()
+            return
+        await db_session.rollback()
+        raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+
+    commit_mock = mocker.patch.object(db_session, "commit", side_effect=fail_second_commit)
+    with pytest.raises(PermissionDeniedError):
+        await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+    mocker.stop(commit_mock)
+
+    with pytest.raises(PermissionDeniedError):
+        await lyrics_client_b.get_music(new_project.project_id)
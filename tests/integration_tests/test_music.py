@@ -2,9 +2,14 @@
 import uuid
 
 import pytest
+from httpx import AsyncClient
 
+from app.api.routers import music as music_router
+from app.config import settings
+from app.music_jobs import run_next_music_job
 from tests.integration_tests.test_client import LyricsClient
 from tests.integration_tests.test_client.components.exceptions import (
+    MusicJobNotFoundError,
     MusicNotFoundError,
     ProjectNotFoundError,
     PermissionDeniedError,
@@ -43,6 +48,146 @@ async def test_replace_music(new_project: Project, lyrics_client: LyricsClient):
         await lyrics_client.delete_music(project.project_id)
 
 
+@pytest.mark.asyncio
+async def test_upload_music_background(new_project: Project, lyrics_client: LyricsClient, db_session):
+    """Тест фоновой обработки музыки: ответ возвращается до анализа, результат появляется после работы воркера"""
+    try:
+        project = new_project
+        music = await lyrics_client.upload_music("test_data/metronome.mp3", project.project_id, background=True)
+
+        assert music.status == "PENDING"
+        assert music.duration_seconds == -1
+        assert music.bpm is None
+        assert music.job_id is not None
+        job = await lyrics_client.get_music_job(project.project_id, music.job_id)
+        assert job.status == "PENDING"
+
+        assert await run_next_music_job(db_session)
+
+        job = await lyrics_client.get_music_job(project.project_id, music.job_id)
+        assert job.status == "DONE"
+        assert job.attempts == 1
+        music = await lyrics_client.get_music(project.project_id)
+        assert music.status == "READY"
+        assert abs(music.duration_seconds - 41.616) < 0.1
+        assert music.bpm == 61
+    finally:
+        await lyrics_client.delete_music(project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_get_music_job_not_found(new_project: Project, lyrics_client: LyricsClient):
+    """Тест получения несуществующей задачи обработки музыки"""
+    with pytest.raises(MusicJobNotFoundError):
+        await lyrics_client.get_music_job(new_project.project_id, uuid.uuid4())
+
+
+@pytest.mark.asyncio
+async def test_get_music_peaks(new_project: Project, lyrics_client: LyricsClient):
+    """Тест получения пиков формы волны: уровни детализации, кэширование и условный запрос"""
+    try:
+        project = new_project
+        music = await lyrics_client.upload_music("test_data/metronome.mp3", project.project_id)
+
+        peaks = await lyrics_client.get_music_peaks(project.project_id)
+        assert peaks.sample_rate == 22050
+        assert peaks.samples_per_peak == 256
+        assert abs(peaks.count - music.duration_seconds * 22050 / 256) < 2
+        assert len(peaks.data) == 2 * peaks.count
+        assert peaks.cache_control == "private, no-cache"
+
+        coarse_peaks = await lyrics_client.get_music_peaks(project.project_id, level=3)
+        assert coarse_peaks.samples_per_peak == 2048
+        assert coarse_peaks.count == -(-peaks.count // 8)
+
+        versioned_peaks = await lyrics_client.get_music_peaks(project.project_id, content_hash=music.content_hash)
+        assert versioned_peaks.cache_control == "private, max-age=31536000, immutable"
+        assert versioned_peaks.data == peaks.data
+
+        not_modified = await lyrics_client.get_music_peaks(project.project_id, etag=peaks.etag)
+        assert not_modified.status_code == 304
+        assert not_modified.data == b""
+    finally:
+        await lyrics_client.delete_music(project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_get_music_peaks_no_music(new_project: Project, lyrics_client: LyricsClient):
+    """Тест получения пиков формы волны, если музыки нет"""
+    with pytest.raises(MusicNotFoundError):
+        await lyrics_client.get_music_peaks(new_project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_get_music_beats(new_project: Project, lyrics_client: LyricsClient):
+    """Тест получения сетки долей музыки"""
+    try:
+        project = new_project
+        music = await lyrics_client.upload_music("test_data/metronome.mp3", project.project_id)
+
+        beats = await lyrics_client.get_music_beats(project.project_id)
+        assert beats.bpm == music.bpm
+        assert len(beats.beats) > 1
+        assert all(0 <= beat <= music.duration_seconds for beat in beats.beats)
+        assert beats.beats == sorted(beats.beats)
+        assert set(beats.downbeats) <= set(beats.beats)
+        assert beats.cache_control == "private, no-cache"
+
+        versioned_beats = await lyrics_client.get_music_beats(project.project_id, content_hash=music.content_hash)
+        assert versioned_beats.cache_control == "private, max-age=31536000, immutable"
+
+        not_modified = await lyrics_client.get_music_beats(project.project_id, etag=beats.etag)
+        assert not_modified.status_code == 304
+    finally:
+        await lyrics_client.delete_music(project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_get_music_beats_no_music(new_project: Project, lyrics_client: LyricsClient):
+    """Тест получения сетки долей, если музыки нет"""
+    with pytest.raises(MusicNotFoundError):
+        await lyrics_client.get_music_beats(new_project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_upload_music_analysis_timeout(new_project: Project, lyrics_client: LyricsClient, mocker):
+    """Тест загрузки музыки, анализ которой не уложился в таймаут: музыка дообрабатывается в фоне"""
+    mocker.patch.object(music_router, "analyze_music", side_effect=TimeoutError)
+    try:
+        music = await lyrics_client.upload_music("test_data/metronome.mp3", new_project.project_id)
+
+        assert music.status == "PENDING"
+        assert music.job_id is not None
+        assert music.bpm is None
+    finally:
+        await lyrics_client.delete_music(new_project.project_id)
+
+
+@pytest.mark.asyncio
+async def test_upload_same_music_to_two_projects(new_project: Project, lyrics_client: LyricsClient, mocker):
+    """Тест повторной загрузки того же файла: анализ берется из кэша, объект на s3 общий"""
+    mocker.patch.object(settings, "music_deduplicate_objects", True)
+    analyze_music = mocker.spy(music_router, "analyze_music")
+    first_project = new_project
+    second_project = await lyrics_client.create_project(name="Второй проект", description="Описание")
+    try:
+        first_music = await lyrics_client.upload_music("test_data/metronome.mp3", first_project.project_id)
+        second_music = await lyrics_client.upload_music("test_data/metronome.mp3", second_project.project_id)
+
+        assert analyze_music.call_count == 1
+        assert second_music.bpm == first_music.bpm == 61
+        assert second_music.duration_seconds == first_music.duration_seconds
+        assert second_music.url.split("?")[0] == first_music.url.split("?")[0]
+
+        await lyrics_client.delete_music(first_project.project_id)
+        music = await lyrics_client.get_music(second_project.project_id)
+        async with AsyncClient() as client:
+            response = await client.get(music.url)
+        assert response.status_code == 200
+    finally:
+        await lyrics_client.delete_project(second_project.project_id)
+
+
 @pytest.mark.asyncio
 async def test_upload_music_project_not_found(lyrics_client: LyricsClient):
     """Тест загрузки музыки, если проекта нет"""
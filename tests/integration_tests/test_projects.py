@@ -1,10 +1,19 @@
 """Тесты для проектов"""
+import datetime
 import uuid
 
 import pytest
+from sqlalchemy import update
+
+from app.models import MusicModel, ProjectModel
+from tests.conftest import DBSession
 
 from tests.integration_tests.test_client import LyricsClient
-from tests.integration_tests.test_client.components.exceptions import PermissionDeniedError, ProjectNotFoundError
+from tests.integration_tests.test_client.components.exceptions import (
+    BadRequestError,
+    PermissionDeniedError,
+    ProjectNotFoundError,
+)
 from tests.integration_tests.test_client.components.projects import Project
 
 
@@ -92,6 +101,40 @@ async def test_delete_project_not_owner(lyrics_client: LyricsClient, lyrics_clie
         await lyrics_client_b.delete_project(project.project_id)
 
 
+@pytest.mark.asyncio
+async def test_delete_projects(lyrics_client: LyricsClient, lyrics_client_b: LyricsClient):
+    """Тест удаления нескольких проектов"""
+    projects = [await lyrics_client.create_project(f"Test project {number}", "Test description") for number in range(3)]
+    grant_code = await lyrics_client.get_project_share_code(projects[0].project_id, "READ_WRITE", 1)
+    await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+
+    await lyrics_client.delete_projects([project.project_id for project in projects[:2]])
+
+    for project in projects[:2]:
+        with pytest.raises(ProjectNotFoundError):
+            await lyrics_client.get_project(project.project_id)
+    assert (await lyrics_client.get_project(projects[2].project_id)).name == "Test project 2"
+
+
+@pytest.mark.asyncio
+async def test_delete_projects_not_owner(lyrics_client: LyricsClient, lyrics_client_b: LyricsClient):
+    """Тест удаления нескольких проектов, если один из них принадлежит другому пользователю"""
+    project = await lyrics_client.create_project("Test project", "Test description")
+    other_project = await lyrics_client_b.create_project("Test project", "Test description")
+    with pytest.raises(PermissionDeniedError):
+        await lyrics_client.delete_projects([project.project_id, other_project.project_id])
+    assert (await lyrics_client.get_project(project.project_id)).project_id == project.project_id
+
+
+@pytest.mark.asyncio
+async def test_delete_projects_not_found(lyrics_client: LyricsClient):
+    """Тест удаления нескольких проектов, если один из них не существует"""
+    project = await lyrics_client.create_project("Test project", "Test description")
+    with pytest.raises(ProjectNotFoundError):
+        await lyrics_client.delete_projects([project.project_id, uuid.uuid4()])
+    assert (await lyrics_client.get_project(project.project_id)).project_id == project.project_id
+
+
 @pytest.mark.asyncio
 async def test_get_project(lyrics_client: LyricsClient):
     """Тест получения проекта"""
@@ -131,3 +174,212 @@ async def test_get_projects(lyrics_client: LyricsClient):
     assert len(projects) == 2
     assert project1 in projects
     assert project2 in projects
+
+
+@pytest.mark.asyncio
+async def test_get_projects_with_grants(lyrics_client: LyricsClient, lyrics_client_b: LyricsClient):
+    """Список содержит свои проекты и проекты с активным доступом вместе с уровнем доступа, без повторов"""
+    own_project = await lyrics_client_b.create_project("Own project", "Own description")
+    shared_project = await lyrics_client.create_project("Shared project", "Shared description")
+    revoked_project = await lyrics_client.create_project("Revoked project", "Revoked description")
+    for project, level in (
+        (shared_project, "READ_ONLY"),
+        (shared_project, "READ_WRITE"),
+        (revoked_project, "READ_ONLY"),
+    ):
+        grant_code = await lyrics_client.get_project_share_code(project.project_id, level, 1)
+        await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+    assert lyrics_client_b.user_id is not None
+    await lyrics_client.revoke_project_access(revoked_project.project_id, lyrics_client_b.user_id)
+
+    projects = await lyrics_client_b.get_projects()
+
+    assert {(project.project_id, project.is_owner, project.grant_level) for project in projects} == {
+        (shared_project.project_id, False, "READ_WRITE"),
+        (own_project.project_id, True, None),
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_projects_pages(lyrics_client: LyricsClient, db_session: DBSession):
+    """Страницы списка проектов идут от недавно измененных проектов без пропусков и повторов"""
+    projects = [await lyrics_client.create_project(f"Test project {number}", None) for number in range(5)]
+    # у двух проектов одинаковое время изменения, их порядок определяет project_id
+    updated_at = datetime.datetime(2026, 10, 18, 12, 0, 0)
+    for number, project in enumerate(projects):
+        await db_session.execute(
+            update(ProjectModel)
+            .where(ProjectModel.project_id == project.project_id)
+            .values(updated_at=updated_at + datetime.timedelta(minutes=min(number, 3)))
+        )
+    await db_session.commit()
+
+    pages = []
+    cursor = None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        page, cursor = await lyrics_client.get_projects_page(**params)
+        pages.append([project.name for project in page])
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    names = [name for page in pages for name in page]
+    assert sorted(names[:2]) == ["Test project 3", "Test project 4"]
+    assert names[2:] == ["Test project 2", "Test project 1", "Test project 0"]
+
+
+@pytest.mark.asyncio
+async def test_get_projects_filters(lyrics_client: LyricsClient, lyrics_client_b: LyricsClient):
+    """Фильтры списка проектов по владению и началу названия"""
+    own_project = await lyrics_client_b.create_project("Demo song", None)
+    await lyrics_client_b.create_project("Ballad", None)
+    shared_project = await lyrics_client.create_project("demo_100%", None)
+    grant_code = await lyrics_client.get_project_share_code(shared_project.project_id, "READ_ONLY", 1)
+    await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+
+    owned = await lyrics_client_b.get_projects(ownership="owned")
+    assert {project.name for project in owned} == {"Demo song", "Ballad"}
+    shared = await lyrics_client_b.get_projects(ownership="shared")
+    assert [project.project_id for project in shared] == [shared_project.project_id]
+    demo = await lyrics_client_b.get_projects(name_prefix="DEMO")
+    assert {project.project_id for project in demo} == {own_project.project_id, shared_project.project_id}
+    assert [project.name for project in await lyrics_client_b.get_projects(name_prefix="demo_1")] == ["demo_100%"]
+    assert not await lyrics_client_b.get_projects(name_prefix="demo%")
+    assert len(await lyrics_client_b.get_projects(has_music=False)) == 3
+    assert not await lyrics_client_b.get_projects(has_music=True)
+
+
+@pytest.mark.asyncio
+async def test_get_projects_invalid_cursor(lyrics_client: LyricsClient):
+    """Некорректный курсор страницы"""
+    with pytest.raises(BadRequestError):
+        await lyrics_client.get_projects(cursor="not a cursor")
+
+
+@pytest.mark.asyncio
+async def test_get_projects_summary(lyrics_client: LyricsClient):
+    """Краткий список проектов без вариантов текста и музыки, пока они не запрошены в expand"""
+    project = await lyrics_client.create_project("Test project", "Test description")
+
+    [summary] = await lyrics_client.get_projects_summary()
+    assert (summary.project_id, summary.name, summary.description) == (
+        project.project_id,
+        "Test project",
+        "Test description",
+    )
+    assert summary.texts is None
+    assert summary.music is None
+
+    [with_texts] = await lyrics_client.get_projects_summary(expand=["texts"])
+    assert with_texts.texts == project.texts
+
+    [full] = await lyrics_client.get_projects(expand=[])
+    assert full.texts == project.texts
+
+
+@pytest.mark.asyncio
+async def test_get_project_not_modified(lyrics_client: LyricsClient, lyrics_client_b: LyricsClient):
+    """Повторное получение неизмененного проекта с ETag возвращает 304, изменение текста меняет ETag"""
+    project = await lyrics_client.create_project("Test project", None)
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}")
+    etag = response.headers["ETag"]
+
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not response.content
+    response = await lyrics_client.client.get(
+        f"/projects/{project.project_id}", params={"fields": "summary"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    response = await lyrics_client_b.client.get(f"/projects/{project.project_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 403
+
+    await lyrics_client.create_text(project.project_id, "Second text")
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["texts"]) == 2
+
+    # время изменения есть не у всех данных проекта, поэтому If-Modified-Since не учитывается
+    response = await lyrics_client.client.get(
+        f"/projects/{project.project_id}", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_project_not_modified_music_url(lyrics_client: LyricsClient, db_session: DBSession, mocker):
+    """Новая подпись ссылки на музыку меняет ETag, клиент не остается с просроченной ссылкой"""
+    project = await lyrics_client.create_project("Test project", None)
+    db_session.add(
+        MusicModel(project_id=project.project_id, url=f"{project.project_id}/music/track.mp3", duration_seconds=41.6)
+    )
+    await db_session.commit()
+    presign = mocker.patch(
+        "app.api.routers.project.generate_presigned_url", return_value="https://s3.test/track.mp3?signature=1"
+    )
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}")
+    etag = response.headers["ETag"]
+    assert response.json()["music"]["url"] == "https://s3.test/track.mp3?signature=1"
+
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    presign.return_value = "https://s3.test/track.mp3?signature=2"
+    response = await lyrics_client.client.get(f"/projects/{project.project_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["music"]["url"] == "https://s3.test/track.mp3?signature=2"
+
+    presign.reset_mock()
+    await lyrics_client.get_project_summary(project.project_id)
+    presign.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_project_summary(lyrics_client: LyricsClient):
+    """Краткое содержимое проекта"""
+    project = await lyrics_client.create_project("Test project", None)
+
+    summary = await lyrics_client.get_project_summary(project.project_id)
+    assert summary.texts is None
+    assert summary.updated_at == project.updated_at
+    with_texts = await lyrics_client.get_project_summary(project.project_id, expand="texts")
+    assert with_texts == project
+
+
+@pytest.mark.asyncio
+async def test_get_project_summary_query_count(lyrics_client: LyricsClient, sql_statements: list[str]):
+    """Краткое содержимое проекта не загружает варианты текста и музыку, которых нет в expand"""
+    project = await lyrics_client.create_project("Test project", None)
+    await lyrics_client.get_project(project.project_id)  # заполнение кэша доступа
+    sql_statements.clear()
+    await lyrics_client.get_project(project.project_id)
+    full_statements = len(sql_statements)
+
+    sql_statements.clear()
+    await lyrics_client.get_project_summary(project.project_id)
+    assert len(sql_statements) == full_statements - 2
+
+    sql_statements.clear()
+    await lyrics_client.get_project_summary(project.project_id, expand="texts")
+    assert len(sql_statements) == full_statements - 1
+
+
+@pytest.mark.asyncio
+async def test_get_projects_query_count(lyrics_client: LyricsClient, sql_statements: list[str]):
+    """Количество запросов к базе данных не зависит от количества проектов"""
+    await lyrics_client.create_project("Test project 1", "Test description 1")
+    sql_statements.clear()
+    await lyrics_client.get_projects()
+    single_project_statements = len(sql_statements)
+
+    for number in range(2, 6):
+        await lyrics_client.create_project(f"Test project {number}", f"Test description {number}")
+    sql_statements.clear()
+    projects = await lyrics_client.get_projects()
+
+    assert len(projects) == 5
+    assert len(sql_statements) == single_project_statements
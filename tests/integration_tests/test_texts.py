@@ -28,6 +28,26 @@ async def test_get_text(lyrics_client: LyricsClient, new_project: Project):
     assert got_text == text
 
 
+@pytest.mark.asyncio
+async def test_get_text_not_modified(lyrics_client: LyricsClient, new_project: Project):
+    """Повторное получение неизмененного текста с ETag или Last-Modified возвращает 304"""
+    text = await lyrics_client.create_text(new_project.project_id, "Test text")
+    response = await lyrics_client.client.get(f"/texts/{text.text_id}")
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    assert etag.startswith('W/"')
+
+    response = await lyrics_client.client.get(f"/texts/{text.text_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    response = await lyrics_client.client.get(f"/texts/{text.text_id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    await lyrics_client.update_text(text.text_id, "New name")
+    response = await lyrics_client.client.get(f"/texts/{text.text_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "New name"
+
+
 @pytest.mark.asyncio
 async def test_get_text_not_found(lyrics_client: LyricsClient):
     """Тест получения несуществующего текста"""
@@ -119,3 +139,22 @@ async def test_delete_text_forbidden(new_project: Project, lyrics_client_b: Lyri
     text = new_project.texts[0]
     with pytest.raises(PermissionDeniedError):
         await lyrics_client_b.delete_text(text.text_id)
+
+
+@pytest.mark.asyncio
+async def test_text_endpoints_query_count(
+    lyrics_client: LyricsClient, lyrics_client_b: LyricsClient, new_project: Project, sql_statements: list[str]
+):
+    """Текст, его проект и доступ пользователя загружаются одним запросом на все зависимости эндпоинта"""
+    text = new_project.texts[0]
+    grant_code = await lyrics_client.get_project_share_code(new_project.project_id, "READ_ONLY", 1)
+    await lyrics_client_b.activate_project_share_code(grant_code.grant_code_id)
+
+    for client in (lyrics_client, lyrics_client_b):
+        sql_statements.clear()
+        await client.get_text(text.text_id)
+        assert len(sql_statements) == 1
+
+        sql_statements.clear()
+        await client.get_tiptap_token(text.text_id)
+        assert len(sql_statements) == 1
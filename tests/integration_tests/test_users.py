@@ -1,4 +1,5 @@
 """Интеграционные тесты работы с пользователями"""
+import re
 import uuid
 
 import pytest
@@ -21,3 +22,34 @@ async def test_get_user_other(lyrics_client: LyricsClient):
     """Тест получения данных другого пользователя"""
     with pytest.raises(PermissionDeniedError):
         await lyrics_client.get_user(uuid.uuid4())
+
+
+def user_statements(sql_statements: list[str]) -> list[str]:
+    """Запросы к таблице пользователей"""
+    return [statement for statement in sql_statements if re.search(r'FROM "?user"?\s', statement)]
+
+
+@pytest.mark.asyncio
+async def test_get_user_query_count(lyrics_client: LyricsClient, sql_statements: list[str]):
+    """Данные о себе берутся из токена без запросов к базе данных"""
+    assert lyrics_client.user_id is not None
+    sql_statements.clear()
+    await lyrics_client.get_user(lyrics_client.user_id)
+    assert not sql_statements
+
+
+@pytest.mark.asyncio
+async def test_endpoints_do_not_load_user(lyrics_client: LyricsClient, sql_statements: list[str]):
+    """Эндпоинты, которым достаточно ID пользователя из токена, не загружают пользователя и его доступы"""
+    project = await lyrics_client.create_project("Test project", "Test description")
+    assert project.texts
+    sql_statements.clear()
+
+    await lyrics_client.get_projects()
+    await lyrics_client.get_project(project.project_id)
+    await lyrics_client.get_text(project.texts[0].text_id)
+    await lyrics_client.create_text(project.project_id, "Test text")
+    await lyrics_client.update_project(project.project_id, "New name", None)
+
+    assert sql_statements
+    assert not user_statements(sql_statements)
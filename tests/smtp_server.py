@@ -0,0 +1,79 @@
+"""Локальный SMTP-сервер для тестов отправки писем"""
+import asyncio
+import base64
+from email import message_from_bytes, policy
+from email.message import Message
+
+
+class LocalSMTPServer:
+    """SMTP-сервер без шифрования на 127.0.0.1, который принимает любую авторизацию AUTH PLAIN
+    и сохраняет полученные письма. Реализует только команды, которые использует smtplib"""
+
+    def __init__(self) -> None:
+        self.messages: list[Message] = []
+        self.logins: list[str] = []
+        self.connections = 0
+        # Сколько следующих писем отклонить временной ошибкой 451
+        self.fail_messages = 0
+        self.port = 0
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Запуск на свободном порту"""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Остановка сервера"""
+        self.disconnect_clients()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def disconnect_clients(self) -> None:
+        """Закрыть открытые соединения, как это делает сервер с простаивающими клиентами"""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Сессия SMTP одного клиента"""
+        self.connections += 1
+        self._writers.add(writer)
+
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        try:
+            await reply("220 localhost ESMTP")
+            while line := await reader.readline():
+                command = line.decode().strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await reply("250-localhost")
+                    await reply("250 AUTH PLAIN")
+                elif verb == "AUTH":
+                    _, user, _ = base64.b64decode(command.split(" ")[2]).split(b"\0")
+                    self.logins.append(user.decode())
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL" and self.fail_messages:
+                    self.fail_messages -= 1
+                    await reply("451 Try again later")
+                elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    self.messages.append(message_from_bytes(data[: -len(b".\r\n")], policy=policy.default))
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,126 @@
+"""Юнит-тесты access_cache.py"""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.access_cache import InMemoryInvalidationChannel, PostgresInvalidationChannel, ProjectAccessCache
+from app.config import settings
+from app.models import ProjectGrantCodeModel, ProjectGrantModel, ProjectModel
+from app.models.grant import GrantLevel
+
+from tests.fake_postgres import POSTGRES_URL, FakePostgres
+
+
+async def create_project_with_grant(db_session: AsyncSession, user_id: uuid.UUID) -> ProjectModel:
+    """Проект другого пользователя с активным доступом READ_ONLY для user_id"""
+    owner_id = uuid.uuid4()
+    project = ProjectModel(owner_user_id=owner_id)
+    db_session.add(project)
+    await db_session.flush()
+    grant_code = ProjectGrantCodeModel(
+        project_id=project.project_id, issuer_user_id=owner_id, level=GrantLevel.READ_ONLY, max_activations=1
+    )
+    db_session.add(grant_code)
+    await db_session.flush()
+    db_session.add(
+        ProjectGrantModel(
+            project_id=project.project_id,
+            user_id=user_id,
+            grant_code_id=grant_code.grant_code_id,
+            level=GrantLevel.READ_ONLY,
+        )
+    )
+    await db_session.commit()
+    return project
+
+
+@pytest.mark.asyncio
+async def test_project_access_cache(db_session: AsyncSession, sql_statements: list[str]):
+    """Доступ загружается из базы данных один раз и перечитывается после инвалидации"""
+    cache = ProjectAccessCache(max_size=10, ttl_seconds=60)
+    user_id = uuid.uuid4()
+    project = await create_project_with_grant(db_session, user_id)
+
+    sql_statements.clear()
+    access = await cache.get(user_id, project.project_id, db_session)
+    assert access is not None
+    assert (access.is_owner, access.level) == (False, GrantLevel.READ_ONLY)
+    owner_access = await cache.get(project.owner_user_id, project.project_id, db_session)
+    assert owner_access is not None and owner_access.level is GrantLevel.READ_WRITE
+    statements = len(sql_statements)
+    assert await cache.get(user_id, project.project_id, db_session) == access
+    assert len(sql_statements) == statements
+
+    await db_session.execute(
+        update(ProjectGrantModel).where(ProjectGrantModel.project_id == project.project_id).values(is_active=False)
+    )
+    await db_session.commit()
+    await cache.invalidate(project.project_id, user_id)
+
+    access = await cache.get(user_id, project.project_id, db_session)
+    assert access is not None
+    assert (access.level, access.grant_level) == (None, GrantLevel.READ_ONLY)
+    assert await cache.get(user_id, uuid.uuid4(), db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_project_access_cache_channel(db_session: AsyncSession, sql_statements: list[str]):
+    """Инвалидация в одном процессе сбрасывает кэш других процессов, подключенных к тому же каналу"""
+    handlers: set = set()
+    caches = [ProjectAccessCache(max_size=10, ttl_seconds=60) for _ in range(2)]
+    for cache in caches:
+        await cache.start(InMemoryInvalidationChannel(handlers))
+    user_id = uuid.uuid4()
+    project = await create_project_with_grant(db_session, user_id)
+    for cache in caches:
+        await cache.get(user_id, project.project_id, db_session)
+        await cache.get(project.owner_user_id, project.project_id, db_session)
+
+    sql_statements.clear()
+    await caches[0].invalidate(project.project_id)
+    await caches[1].get(project.owner_user_id, project.project_id, db_session)
+    await caches[1].get(user_id, project.project_id, db_session)
+    assert len(sql_statements) == 2
+
+    for cache in caches:
+        await cache.close()
+    assert not handlers
+
+
+@pytest.mark.asyncio
+async def test_postgres_channel_reconnect_clears_cache(
+    db_session: AsyncSession, sql_statements: list[str], fake_postgres: FakePostgres, monkeypatch
+):
+    """Инвалидация доходит до других процессов через Postgres, после обрыва соединения кэш сбрасывается целиком:
+    сообщения за время обрыва потеряны"""
+    monkeypatch.setattr(settings, "postgres_notify_reconnect_seconds", 0)
+    caches = [ProjectAccessCache(max_size=10, ttl_seconds=60) for _ in range(2)]
+    channels = [PostgresInvalidationChannel(POSTGRES_URL) for _ in caches]
+    for cache, channel in zip(caches, channels):
+        await cache.start(channel)
+    user_id = uuid.uuid4()
+    projects = [await create_project_with_grant(db_session, user_id) for _ in range(2)]
+    try:
+        for project in projects:
+            await caches[1].get(user_id, project.project_id, db_session)
+
+        sql_statements.clear()
+        await caches[0].invalidate(projects[0].project_id, user_id)
+        await caches[1].get(user_id, projects[0].project_id, db_session)
+        await caches[1].get(user_id, projects[1].project_id, db_session)
+        assert len(sql_statements) == 1
+
+        fake_postgres.restart()
+        async with asyncio.timeout(1):
+            while len(fake_postgres.connections) < 4:
+                await asyncio.sleep(0.01)
+        sql_statements.clear()
+        for project in projects:
+            await caches[1].get(user_id, project.project_id, db_session)
+        assert len(sql_statements) == 2
+    finally:
+        for cache in caches:
+            await cache.close()
@@ -0,0 +1,41 @@
+"""Юнит-тесты auth.py"""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import create_access_token, decode_access_token, get_auth_context
+from app.models import UserModel
+
+
+def test_decode_access_token():
+    """Данные токена берутся из его полей, токен с чужой подписью или без user_id отклоняется"""
+    user_id = uuid.uuid4()
+    token_data = decode_access_token(create_access_token({"sub": "user@example.com", "user_id": str(user_id)}))
+    assert (token_data.username, token_data.user_id) == ("user@example.com", user_id)
+
+    for token in (
+        create_access_token({"sub": "user@example.com", "user_id": str(user_id)}, secret_key="other"),
+        create_access_token({"sub": "user@example.com"}),
+        create_access_token({"sub": "user@example.com", "user_id": "not-uuid"}),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_access_token(token)
+        assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_auth_context_uses_token_only(db_session: AsyncSession, sql_statements: list[str]):
+    """Контекст берет пользователя из токена без запросов к базе данных, даже если пользователь удален"""
+    user = UserModel(email="user@example.com")
+    db_session.add(user)
+    await db_session.commit()
+    token_data = decode_access_token(create_access_token({"sub": user.email, "user_id": str(user.user_id)}))
+    await db_session.delete(user)
+    await db_session.commit()
+
+    sql_statements.clear()
+    auth_context = await get_auth_context(token_data)
+    assert (auth_context.user_id, auth_context.email) == (token_data.user_id, "user@example.com")
+    assert not sql_statements
@@ -0,0 +1,62 @@
+"""Юнит-тесты cache.py"""
+from app.cache import TTLCache
+
+
+class FakeTimer:
+    """Управляемые часы"""
+
+    def __init__(self):
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expiry():
+    """Запись устаревает через заданное время жизни"""
+    timer = FakeTimer()
+    cache: TTLCache[str, int] = TTLCache(max_size=10, ttl_seconds=60, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=10)
+
+    timer.now = 9
+    assert cache.get("a") == 1
+    assert cache.get("b") == 2
+
+    timer.now = 10
+    assert cache.get("b") is None
+    assert len(cache) == 1
+
+    timer.now = 60
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_lru():
+    """При переполнении вытесняется давно не использованная запись"""
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    cache.pop("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttl_cache_pop_where():
+    """Удаляются только записи, ключи которых удовлетворяют условию"""
+    cache: TTLCache[tuple[str, str], int] = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set(("a", "x"), 1)
+    cache.set(("b", "x"), 2)
+    cache.set(("a", "y"), 3)
+
+    assert cache.pop_where(lambda key: key[1] == "x") == 2
+    assert cache.get(("a", "x")) is None
+    assert cache.get(("b", "x")) is None
+    assert cache.get(("a", "y")) == 3
@@ -0,0 +1,136 @@
+"""Юнит-тесты change_feed.py"""
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routers.events import stream_change_events
+from app.change_feed import (
+    ChangeAction,
+    ChangeEntity,
+    ChangeEvent,
+    ChangeFeed,
+    PostgresChangeBackend,
+    change_feed,
+    publish_change,
+)
+from app.models import ProjectGrantCodeModel, ProjectGrantModel, ProjectModel
+from app.models.grant import GrantLevel
+
+from tests.fake_postgres import POSTGRES_URL, FakePostgres
+
+
+def make_event(*user_ids: uuid.UUID) -> ChangeEvent:
+    """Событие изменения текста для пользователей"""
+    return ChangeEvent(
+        entity=ChangeEntity.TEXT,
+        action=ChangeAction.UPDATED,
+        project_id=uuid.uuid4(),
+        text_id=uuid.uuid4(),
+        user_ids=list(user_ids),
+    )
+
+
+@pytest.mark.asyncio
+async def test_change_feed_delivers_to_recipients():
+    """Событие получают только подписки пользователей из получателей, переполненная очередь не мешает остальным"""
+    feed = ChangeFeed(queue_size=1)
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    with feed.subscribe(user_id) as queue, feed.subscribe(user_id) as second_queue:
+        with feed.subscribe(other_user_id) as other_queue:
+            event = make_event(user_id)
+            await feed.publish(event)
+            assert queue.get_nowait() == event
+            assert second_queue.get_nowait() == event
+            assert other_queue.empty()
+
+            await feed.publish(make_event(user_id, other_user_id))
+            await feed.publish(make_event(user_id, other_user_id))
+            assert queue.qsize() == 1
+            assert other_queue.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_change_audience(db_session: AsyncSession):
+    """Событие получают владелец, пользователи с активным доступом и явно указанные пользователи"""
+    owner_id, active_user_id, inactive_user_id, left_user_id = (uuid.uuid4() for _ in range(4))
+    project = ProjectModel(owner_user_id=owner_id)
+    db_session.add(project)
+    await db_session.flush()
+    grant_code = ProjectGrantCodeModel(
+        project_id=project.project_id, issuer_user_id=owner_id, level=GrantLevel.READ_ONLY, max_activations=2
+    )
+    db_session.add(grant_code)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            ProjectGrantModel(
+                project_id=project.project_id,
+                user_id=user_id,
+                grant_code_id=grant_code.grant_code_id,
+                level=GrantLevel.READ_ONLY,
+                is_active=is_active,
+            )
+            for user_id, is_active in ((active_user_id, True), (inactive_user_id, False))
+        ]
+    )
+    await db_session.commit()
+
+    with change_feed.subscribe(owner_id) as queue:
+        await publish_change(
+            db_session, ChangeEntity.GRANT, ChangeAction.DELETED, project.project_id, user_ids=[left_user_id]
+        )
+        event = queue.get_nowait()
+
+    assert (event.entity, event.action, event.project_id) == (
+        ChangeEntity.GRANT,
+        ChangeAction.DELETED,
+        project.project_id,
+    )
+    assert set(event.user_ids) == {owner_id, active_user_id, left_user_id}
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_large_audience(fake_postgres: FakePostgres):
+    """Событие проекта с большой аудиторией доходит до подписчиков других процессов один раз,
+    несмотря на ограничение размера NOTIFY"""
+    publisher, listener = ChangeFeed(queue_size=10), ChangeFeed(queue_size=10)
+    await publisher.start(PostgresChangeBackend(POSTGRES_URL))
+    await listener.start(PostgresChangeBackend(POSTGRES_URL))
+    user_ids = sorted(uuid.uuid4() for _ in range(1000))
+    try:
+        with listener.subscribe(user_ids[0]) as first_queue, listener.subscribe(user_ids[-1]) as last_queue:
+            await publisher.publish(make_event(*user_ids))
+            assert first_queue.qsize() == last_queue.qsize() == 1
+            event = last_queue.get_nowait()
+    finally:
+        await publisher.close()
+        await listener.close()
+
+    assert event.entity is ChangeEntity.TEXT
+    assert user_ids[-1] in event.user_ids
+
+
+@pytest.mark.asyncio
+async def test_stream_change_events():
+    """Поток отдает события в формате text/event-stream без получателей и пингует клиента"""
+    user_id = uuid.uuid4()
+    stream = stream_change_events(user_id, heartbeat_seconds=0.05)
+    assert await anext(stream) == ": connected\n\n"
+    assert await anext(stream) == ": heartbeat\n\n"
+
+    event = make_event(user_id)
+    next_chunk = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    await change_feed.publish(event)
+    name, data = (await next_chunk).strip().split("\n")
+    assert name == "event: text"
+    assert json.loads(data.removeprefix("data: ")) == {
+        "entity": "text",
+        "action": "updated",
+        "project_id": str(event.project_id),
+        "text_id": str(event.text_id),
+    }
+    await stream.aclose()
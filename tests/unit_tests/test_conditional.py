@@ -0,0 +1,55 @@
+"""Юнит-тесты api/conditional.py"""
+import datetime
+
+from fastapi import Request
+
+from app.api.conditional import is_not_modified, validator_headers, weak_etag
+
+UPDATED_AT = datetime.datetime(2026, 10, 18, 12, 30, 15, 123456)
+
+
+def make_request(**headers: str) -> Request:
+    """Запрос с заданными заголовками"""
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        }
+    )
+
+
+def test_weak_etag():
+    """ETag слабый и зависит от всех частей версии"""
+    etag = weak_etag("project", UPDATED_AT)
+    assert etag.startswith('W/"')
+    assert etag == weak_etag("project", UPDATED_AT)
+    assert etag != weak_etag("project", UPDATED_AT, "summary")
+
+
+def test_validator_headers():
+    """Last-Modified в формате HTTP-даты в GMT"""
+    assert validator_headers('W/"1"', UPDATED_AT) == {"ETag": 'W/"1"', "Last-Modified": "Sun, 18 Oct 2026 12:30:15 GMT"}
+    assert validator_headers('W/"1"') == {"ETag": 'W/"1"'}
+
+
+def test_is_not_modified_if_none_match():
+    """If-None-Match сравнивается слабым сравнением и важнее If-Modified-Since"""
+    etag = weak_etag("text")
+    assert is_not_modified(make_request(if_none_match=etag), etag)
+    assert is_not_modified(make_request(if_none_match=f'"other", {etag.removeprefix("W/")}'), etag)
+    assert is_not_modified(make_request(if_none_match="*"), etag)
+    assert not is_not_modified(make_request(if_none_match='W/"other"'), etag)
+    assert not is_not_modified(
+        make_request(if_none_match='W/"other"', if_modified_since="Sun, 18 Oct 2026 13:00:00 GMT"), etag, UPDATED_AT
+    )
+
+
+def test_is_not_modified_if_modified_since():
+    """If-Modified-Since учитывается с точностью до секунды"""
+    etag = weak_etag("text")
+    assert is_not_modified(make_request(if_modified_since="Sun, 18 Oct 2026 12:30:15 GMT"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="Sun, 18 Oct 2026 12:30:14 GMT"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="Sun, 18 Oct 2026 12:30:15 GMT"), etag)
+    assert not is_not_modified(make_request(if_modified_since="not a date"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(), etag, UPDATED_AT)
@@ -0,0 +1,35 @@
+"""Юнит-тесты api/disconnect.py"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from app.api.disconnect import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+
+
+def make_request(disconnected: asyncio.Event) -> Request:
+    """Запрос без тела, клиент которого отключается, когда установлено disconnected"""
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect():
+    """Результат возвращается, пока клиент подключен, после отключения клиента работа отменяется"""
+    disconnected = asyncio.Event()
+    request = make_request(disconnected)
+    assert await cancel_on_disconnect(request, asyncio.sleep(0, result="ok")) == "ok"
+
+    work = asyncio.ensure_future(asyncio.sleep(10))
+    asyncio.get_running_loop().call_later(0.05, disconnected.set)
+    with pytest.raises(HTTPException) as exc_info:
+        await cancel_on_disconnect(request, work)
+    assert exc_info.value.status_code == CLIENT_CLOSED_REQUEST
+    assert work.cancelled()
@@ -0,0 +1,141 @@
+"""Юнит-тесты mail.py и email_outbox.py"""
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.email_outbox import EmailOutboxWorker, claim_email, enqueue_email, purge_sent_emails, run_next_email
+from app.lease_queue import utcnow
+from app.mail import SMTPSender
+from app.models import EmailOutboxModel
+from app.models.email_outbox import EmailOutboxStatus
+from tests.smtp_server import LocalSMTPServer
+
+
+def make_sender(smtp_server: LocalSMTPServer) -> SMTPSender:
+    """Отправитель через локальный SMTP-сервер"""
+    return SMTPSender(
+        server="127.0.0.1",
+        port=smtp_server.port,
+        user="lyrics",
+        password="secret",
+        from_email="noreply@lirix.xyz",
+        from_name="Lyrics IDE",
+        use_ssl=False,
+        timeout_seconds=5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_smtp_sender_reuses_connection(smtp_server: LocalSMTPServer):
+    """Письма отправляются через одно авторизованное соединение, закрытое сервером соединение открывается заново"""
+    sender = make_sender(smtp_server)
+    try:
+        await sender.send("user@example.com", "Код для входа", "Ваш код для входа: 123456")
+        await sender.send("other@example.com", "Код для входа", "Ваш код для входа: 654321")
+        assert (smtp_server.connections, smtp_server.logins) == (1, ["lyrics"])
+
+        smtp_server.disconnect_clients()
+        await asyncio.sleep(0.05)
+        await sender.send("user@example.com", "Код для входа", "Ваш код для входа: 111111")
+        assert smtp_server.connections == 2
+    finally:
+        await sender.close()
+
+    assert [message["To"] for message in smtp_server.messages] == [
+        "user@example.com",
+        "other@example.com",
+        "user@example.com",
+    ]
+    assert smtp_server.messages[0]["Subject"] == "Код для входа"
+    assert "123456" in smtp_server.messages[0].get_payload(decode=True).decode()
+
+
+@pytest.mark.asyncio
+async def test_send_queued_email(db_session: AsyncSession, smtp_server: LocalSMTPServer):
+    """Письмо из очереди отправляется один раз и помечается отправленным"""
+    sender = make_sender(smtp_server)
+    email = await enqueue_email("user@example.com", "Код для входа", "Ваш код для входа: 123456", db_session)
+    await db_session.commit()
+    try:
+        assert await run_next_email(sender, db_session)
+        assert not await run_next_email(sender, db_session)
+    finally:
+        await sender.close()
+
+    assert email.status == EmailOutboxStatus.SENT
+    assert email.sent_at is not None
+    assert len(smtp_server.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_send_queued_email_retry(db_session: AsyncSession, smtp_server: LocalSMTPServer, monkeypatch):
+    """После ошибки SMTP письмо откладывается с растущей задержкой, после последней попытки - неудачное"""
+    monkeypatch.setattr(settings, "email_outbox_max_attempts", 2)
+    smtp_server.fail_messages = 2
+    sender = make_sender(smtp_server)
+    email = await enqueue_email("user@example.com", "Код для входа", "Ваш код для входа: 123456", db_session)
+    await db_session.commit()
+    try:
+        assert await run_next_email(sender, db_session)
+        assert email.status == EmailOutboxStatus.PENDING
+        assert email.locked_until is not None and email.locked_until > utcnow()
+        assert await claim_email(db_session) is None
+
+        email.locked_until = None
+        await db_session.commit()
+        assert await run_next_email(sender, db_session)
+    finally:
+        await sender.close()
+
+    assert email.status == EmailOutboxStatus.FAILED
+    assert email.attempts == 2
+    assert email.error is not None
+    assert not smtp_server.messages
+
+
+@pytest.mark.asyncio
+async def test_email_outbox_worker(db_session: AsyncSession, smtp_server: LocalSMTPServer):
+    """Воркер, разбуженный уведомлением, отправляет письмо, не дожидаясь интервала опроса"""
+
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    worker = EmailOutboxWorker(make_sender(smtp_server), poll_interval_seconds=60, session_factory=session_factory)
+    worker.start()
+    try:
+        await asyncio.sleep(0.05)
+        email = await enqueue_email("user@example.com", "Код для входа", "Ваш код для входа: 123456", db_session)
+        await db_session.commit()
+        worker.notify()
+        for _ in range(100):
+            if email.status == EmailOutboxStatus.SENT:
+                break
+            await asyncio.sleep(0.01)
+        assert email.status == EmailOutboxStatus.SENT
+    finally:
+        await worker.stop()
+
+
+@pytest.mark.asyncio
+async def test_purge_sent_emails(db_session: AsyncSession, monkeypatch):
+    """Удаляются только письма, отправленные раньше срока хранения, неотправленные и неудачные остаются"""
+    monkeypatch.setattr(settings, "email_outbox_retention_seconds", 3600)
+    emails = {
+        (status, hours_ago): await enqueue_email("user@example.com", "Код для входа", "123456", db_session)
+        for status in (EmailOutboxStatus.SENT, EmailOutboxStatus.FAILED, EmailOutboxStatus.PENDING)
+        for hours_ago in (2, 0)
+    }
+    for (status, hours_ago), email in emails.items():
+        email.status = status
+        email.sent_at = utcnow() - datetime.timedelta(hours=hours_ago)
+    await db_session.commit()
+
+    assert await purge_sent_emails(db_session) == 1
+    remaining = set(await db_session.scalars(select(EmailOutboxModel.message_id)))
+    assert remaining == {email.message_id for key, email in emails.items() if key != (EmailOutboxStatus.SENT, 2)}
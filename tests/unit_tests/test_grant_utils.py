@@ -0,0 +1,45 @@
+"""Юнит-тесты grant_utils.py"""
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.access_cache import load_project_access
+from app.grant_utils import get_projects_with_grant_level
+from app.models import ProjectGrantCodeModel, ProjectGrantModel, ProjectModel
+from app.models.grant import GrantLevel
+
+
+@pytest.mark.asyncio
+async def test_grant_level_matches_access(db_session: AsyncSession):
+    """При нескольких активных доступах к проекту список проектов и проверка доступа выбирают один доступ -
+    последний активированный"""
+    user_id, owner_id = uuid.uuid4(), uuid.uuid4()
+    project = ProjectModel(owner_user_id=owner_id)
+    db_session.add(project)
+    await db_session.flush()
+    for level, created_at in (
+        (GrantLevel.READ_ONLY, datetime.datetime(2026, 1, 2)),
+        (GrantLevel.READ_WRITE, datetime.datetime(2026, 1, 1)),
+    ):
+        grant_code = ProjectGrantCodeModel(
+            project_id=project.project_id, issuer_user_id=owner_id, level=level, max_activations=1
+        )
+        db_session.add(grant_code)
+        await db_session.flush()
+        db_session.add(
+            ProjectGrantModel(
+                project_id=project.project_id,
+                user_id=user_id,
+                grant_code_id=grant_code.grant_code_id,
+                level=level,
+                created_at=created_at,
+            )
+        )
+    await db_session.commit()
+
+    [(_, grant_level)] = await get_projects_with_grant_level(user_id, db_session)
+    access = await load_project_access(user_id, project.project_id, db_session)
+    assert access is not None
+    assert grant_level is access.level is GrantLevel.READ_ONLY
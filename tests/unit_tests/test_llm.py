@@ -0,0 +1,75 @@
+"""Юнит-тесты llm.py"""
+import asyncio
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.llm import get_llm_lyrics_completions, get_llm_rhymes
+from tests.fake_llm import FakeLLMServer
+
+
+@pytest.mark.asyncio
+async def test_get_llm_lyrics_completions(fake_llm: FakeLLMServer, monkeypatch):
+    """Варианты продолжения текста из ответа LLM"""
+    fake_llm.contents = ("и танцевать!", "с тобой")
+    monkeypatch.setattr("app.llm.llm_client", fake_llm.client())
+
+    assert await get_llm_lyrics_completions("Я хочу петь") == ["и танцевать!", "с тобой"]
+    assert fake_llm.requests[0]["n"] == settings.openai_lyrics_completions_count
+    assert fake_llm.requests[0]["messages"][-1] == {"role": "user", "content": "Я хочу петь"}
+
+
+@pytest.mark.asyncio
+async def test_get_llm_lyrics_completions_without_content(fake_llm: FakeLLMServer, monkeypatch):
+    """Варианты без текста (например, отказ модели) пропускаются"""
+    fake_llm.contents = ("и танцевать!", None)
+    monkeypatch.setattr("app.llm.llm_client", fake_llm.client())
+
+    assert await get_llm_lyrics_completions("Я хочу петь") == ["и танцевать!"]
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        pytest.param('{"rhymes": ["балка", "скалка"]}', ["балка", "скалка"], id="rhymes"),
+        pytest.param("не JSON", [], id="invalid json"),
+        pytest.param(None, [], id="no content"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_llm_rhymes(fake_llm: FakeLLMServer, monkeypatch, content: str | None, expected: list[str]):
+    """Рифмы из JSON-ответа LLM"""
+    fake_llm.contents = (content,)
+    monkeypatch.setattr("app.llm.llm_client", fake_llm.client())
+
+    assert await get_llm_rhymes("палка") == expected
+
+
+@pytest.mark.asyncio
+async def test_llm_client_concurrency(fake_llm: FakeLLMServer):
+    """Одновременно выполняется не больше concurrency запросов и не больше user_concurrency запросов пользователя"""
+    fake_llm.latency_seconds = 0.05
+    client = fake_llm.client(concurrency=3, user_concurrency=1)
+    await client.start()
+    try:
+        await asyncio.gather(*(client.complete(model="test", messages=[]) for _ in range(9)))
+        assert fake_llm.max_in_flight == 3
+
+        fake_llm.max_in_flight = 0
+        user_id = uuid.uuid4()
+        await asyncio.gather(*(client.complete(user_id, model="test", messages=[]) for _ in range(3)))
+        assert fake_llm.max_in_flight == 1
+    finally:
+        await client.close()
+    assert len(fake_llm.requests) == 12
+
+
+@pytest.mark.asyncio
+async def test_llm_client_timeout(fake_llm: FakeLLMServer):
+    """Запрос дольше timeout_seconds прерывается с TimeoutError"""
+    fake_llm.latency_seconds = 10
+    client = fake_llm.client(timeout_seconds=0.05)
+    with pytest.raises(TimeoutError):
+        await client.complete(model="test", messages=[])
+    assert fake_llm.cancelled == 1
@@ -0,0 +1,146 @@
+"""Юнит-тесты music_jobs.py"""
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.lease_queue import utcnow
+from app.models import MusicJobModel, MusicModel
+from app.models.music import MusicStatus
+from app.models.music_job import MusicJobStatus
+from app.music_jobs import MusicJobWorkers, claim_music_job, enqueue_music_job, run_next_music_job
+from app.music_storage import get_cached_analysis
+from tests.unit_tests.test_music_storage import ANALYSIS
+
+CONTENT_HASH = "b" * 64
+
+
+async def create_pending_music(db_session: AsyncSession) -> tuple[MusicModel, MusicJobModel]:
+    """Музыка, ожидающая фоновой обработки, и ее задача"""
+    music = MusicModel(
+        url="project/music/track.mp3", content_hash=CONTENT_HASH, duration_seconds=-1, status=MusicStatus.PENDING
+    )
+    db_session.add(music)
+    await db_session.flush()
+    job = await enqueue_music_job(music, db_session)
+    await db_session.commit()
+    return music, job
+
+
+@pytest.fixture(name="mock_analysis")
+def mock_analysis_fixture():
+    """Мок скачивания файла с s3 и анализа"""
+    with (
+        patch("app.music_jobs.download_file", new_callable=AsyncMock) as mock_download,
+        patch("app.music_jobs.analyze_music", new_callable=AsyncMock, return_value=ANALYSIS) as mock_analyze,
+    ):
+        yield mock_download, mock_analyze
+
+
+@pytest.mark.asyncio
+async def test_claim_music_job_once(db_session: AsyncSession):
+    """Задачу захватывает только один воркер"""
+    _, job = await create_pending_music(db_session)
+
+    claimed = await claim_music_job(db_session)
+    assert claimed is not None and claimed.job_id == job.job_id
+    assert claimed.status == MusicJobStatus.PROCESSING
+    assert claimed.attempts == 1
+    assert await claim_music_job(db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_abandoned_music_job(db_session: AsyncSession):
+    """Задача, воркер которой не уложился в срок захвата (например, перезапуск), захватывается снова"""
+    await create_pending_music(db_session)
+    claimed = await claim_music_job(db_session)
+    assert claimed is not None
+
+    claimed.locked_until = utcnow() - datetime.timedelta(seconds=1)
+    await db_session.commit()
+
+    reclaimed = await claim_music_job(db_session)
+    assert reclaimed is not None and reclaimed.job_id == claimed.job_id
+    assert reclaimed.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_run_next_music_job(db_session: AsyncSession, mock_analysis):
+    """Результат анализа переносится в музыку и кэшируется"""
+    music, job = await create_pending_music(db_session)
+
+    assert await run_next_music_job(db_session)
+    assert not await run_next_music_job(db_session)
+
+    mock_download, _ = mock_analysis
+    assert mock_download.call_args.args[0] == music.url
+    assert music.status == MusicStatus.READY
+    assert music.bpm == 61
+    assert music.duration_seconds == 41.6
+    assert music.codec == "mp3"
+    assert job.status == MusicJobStatus.DONE
+    assert await get_cached_analysis(CONTENT_HASH, db_session) == ANALYSIS
+
+
+@pytest.mark.asyncio
+async def test_run_next_music_job_retries(db_session: AsyncSession, mock_analysis, monkeypatch):
+    """После ошибки задача откладывается, а после последней попытки музыка помечается неудачной"""
+    monkeypatch.setattr(settings, "music_job_max_attempts", 2)
+    _, mock_analyze = mock_analysis
+    mock_analyze.side_effect = RuntimeError("ffmpeg упал")
+    music, job = await create_pending_music(db_session)
+
+    assert await run_next_music_job(db_session)
+    assert job.status == MusicJobStatus.PENDING
+    assert job.error == "ffmpeg упал"
+    assert job.locked_until is not None and job.locked_until > utcnow()
+    assert not await run_next_music_job(db_session)
+
+    job.locked_until = None
+    await db_session.commit()
+    assert await run_next_music_job(db_session)
+    assert job.status == MusicJobStatus.FAILED
+    assert music.status == MusicStatus.FAILED
+    assert not await run_next_music_job(db_session)
+
+
+@pytest.mark.asyncio
+async def test_run_next_music_job_timeout(db_session: AsyncSession, mock_analysis):
+    """Анализ, не уложившийся в таймаут, повторяется и не кэшируется, музыка не помечается готовой"""
+    _, mock_analyze = mock_analysis
+    mock_analyze.side_effect = TimeoutError("Анализ не уложился в 120 с")
+    music, job = await create_pending_music(db_session)
+
+    assert await run_next_music_job(db_session)
+    assert job.status == MusicJobStatus.PENDING
+    assert job.error == "Анализ не уложился в 120 с"
+    assert music.status == MusicStatus.PENDING
+    assert music.bpm is None
+    assert await get_cached_analysis(CONTENT_HASH, db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_music_job_workers(db_session: AsyncSession, mock_analysis):
+    """Воркер, разбуженный уведомлением, обрабатывает задачу, не дожидаясь интервала опроса"""
+
+    @asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    workers = MusicJobWorkers(workers=1, poll_interval_seconds=60, session_factory=session_factory)
+    workers.start()
+    try:
+        await asyncio.sleep(0.05)
+        _, job = await create_pending_music(db_session)
+        workers.notify()
+        for _ in range(100):
+            if job.status == MusicJobStatus.DONE:
+                break
+            await asyncio.sleep(0.01)
+        assert job.status == MusicJobStatus.DONE
+    finally:
+        await workers.stop()
@@ -0,0 +1,169 @@
+"""Юнит-тесты music_storage.py"""
+import uuid
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import MusicModel
+from app.music_storage import (
+    apply_analysis,
+    get_beat_grid,
+    get_cached_analysis,
+    get_music_key,
+    get_waveform_peaks,
+    release_music,
+    save_analysis,
+)
+from app.music_utils import AudioAnalysis, BeatGrid, WaveformPeaks, spool_upload
+from tests.unit_tests.test_music_utils import MIB, make_upload_file
+
+CONTENT_HASH = "a" * 64
+PEAKS = WaveformPeaks(data=bytes([0, 127, 129, 64]), count=2, sample_rate=22050)
+BEATS = BeatGrid(beats=[0.37, 0.87, 1.37, 1.87, 2.37], downbeats=[0.37, 2.37])
+ANALYSIS = AudioAnalysis(
+    duration_seconds=41.6,
+    bpm=61,
+    codec="mp3",
+    bitrate=320000,
+    sample_rate=48000,
+    channels=2,
+    peaks=PEAKS,
+    beats=BEATS,
+)
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_hash():
+    """Хэш содержимого считается во время копирования загружаемого файла"""
+    upload = make_upload_file(2 * MIB + 3)
+    content_hash = sha256()
+    with NamedTemporaryFile() as destination:
+        await spool_upload(upload, destination, chunk_size=MIB, max_size=10 * MIB, content_hash=content_hash)
+    assert content_hash.hexdigest() == sha256(b"\x01" * (2 * MIB + 3)).hexdigest()
+
+
+def test_get_music_key(monkeypatch):
+    """Без дедупликации ключ принадлежит проекту, с дедупликацией определяется содержимым"""
+    project_id = uuid.uuid4()
+    assert get_music_key(project_id, "Track.MP3", CONTENT_HASH) == f"{project_id}/music/Track.MP3"
+    monkeypatch.setattr(settings, "music_deduplicate_objects", True)
+    assert get_music_key(project_id, "Track.MP3", CONTENT_HASH) == f"music/{CONTENT_HASH}.mp3"
+
+
+@pytest.mark.asyncio
+async def test_analysis_cache(db_session: AsyncSession, monkeypatch):
+    """Результат анализа переиспользуется, пока не сменился алгоритм определения BPM"""
+    assert await get_cached_analysis(CONTENT_HASH, db_session) is None
+
+    await save_analysis(CONTENT_HASH, ANALYSIS, db_session)
+    await db_session.commit()
+    assert await get_cached_analysis(CONTENT_HASH, db_session) == ANALYSIS
+
+    monkeypatch.setattr(settings, "music_tempo_engine", "numpy")
+    assert await get_cached_analysis(CONTENT_HASH, db_session) is None
+
+    await save_analysis(CONTENT_HASH, ANALYSIS.model_copy(update={"bpm": 122}), db_session)
+    await db_session.commit()
+    cached = await get_cached_analysis(CONTENT_HASH, db_session)
+    assert cached is not None and cached.bpm == 122
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "update, waveform_peaks, is_cached",
+    [({"peaks": None}, True, False), ({"beats": None}, True, False), ({"peaks": None}, False, True)],
+    ids=["no peaks", "no beats", "peaks disabled"],
+)
+async def test_incomplete_analysis_cache(
+    db_session: AsyncSession, monkeypatch, update: dict, waveform_peaks: bool, is_cached: bool
+):
+    """Результат без нужных сейчас пиков или сетки долей (сохранен до их появления или с выключенными пиками)
+    считается промахом кэша
+    """
+    await save_analysis(CONTENT_HASH, ANALYSIS.model_copy(update=update), db_session)
+    await db_session.commit()
+
+    monkeypatch.setattr(settings, "music_waveform_peaks", waveform_peaks)
+    assert (await get_cached_analysis(CONTENT_HASH, db_session) is not None) == is_cached
+
+
+@pytest.mark.asyncio
+async def test_analysis_cache_without_beats(db_session: AsyncSession):
+    """Без BPM доли не находятся, такой результат берется из кэша"""
+    analysis = ANALYSIS.model_copy(update={"bpm": None, "beats": None})
+    await save_analysis(CONTENT_HASH, analysis, db_session)
+    await db_session.commit()
+    assert await get_cached_analysis(CONTENT_HASH, db_session) == analysis
+
+
+@pytest.mark.asyncio
+async def test_save_analysis_upsert(db_session: AsyncSession, sql_statements: list[str]):
+    """Повторное сохранение результата одного содержимого выполняется одним запросом и не падает на первичном ключе"""
+    await save_analysis(CONTENT_HASH, ANALYSIS, db_session)
+    await save_analysis(CONTENT_HASH, ANALYSIS.model_copy(update={"bpm": 122}), db_session)
+    assert len(sql_statements) == 2
+    assert all("ON CONFLICT" in statement for statement in sql_statements)
+    await db_session.commit()
+
+    cached = await get_cached_analysis(CONTENT_HASH, db_session)
+    assert cached is not None and cached.bpm == 122
+
+
+@pytest.mark.asyncio
+async def test_waveform_peaks(db_session: AsyncSession):
+    """Пики формы волны сохраняются вместе с результатом анализа"""
+    assert await get_waveform_peaks(CONTENT_HASH, db_session) is None
+
+    await save_analysis(CONTENT_HASH, ANALYSIS, db_session)
+    await db_session.commit()
+
+    assert await get_waveform_peaks(CONTENT_HASH, db_session) == PEAKS
+    cached = await get_cached_analysis(CONTENT_HASH, db_session)
+    assert cached is not None and cached.peaks == PEAKS
+
+
+@pytest.mark.asyncio
+async def test_beat_grid(db_session: AsyncSession):
+    """Сетка долей сохраняется в музыке и в кэше результатов анализа"""
+    await save_analysis(CONTENT_HASH, ANALYSIS, db_session)
+    music = MusicModel(url="project/music/track.mp3", content_hash=CONTENT_HASH)
+    apply_analysis(music, ANALYSIS)
+    db_session.add(music)
+    await db_session.commit()
+
+    cached = await get_cached_analysis(CONTENT_HASH, db_session)
+    assert cached is not None and cached.beats == BEATS
+    assert get_beat_grid(music.beats, music.downbeats) == BEATS
+    assert get_beat_grid(None, None) is None
+
+
+@pytest.mark.asyncio
+async def test_empty_analysis_is_not_cached(db_session: AsyncSession):
+    """Пустой результат анализа (ничего не определено) не кэшируется"""
+    await save_analysis(CONTENT_HASH, AudioAnalysis(), db_session)
+    await db_session.commit()
+    assert await get_cached_analysis(CONTENT_HASH, db_session) is None
+
+
+@pytest.mark.asyncio
+async def test_release_music_reference_counting(db_session: AsyncSession):
+    """Общий объект на s3 удаляется вместе с последней ссылающейся на него музыкой"""
+    key = f"music/{CONTENT_HASH}.mp3"
+    first, second = (
+        MusicModel(url=key, content_hash=CONTENT_HASH, duration_seconds=41.6, bpm=61, custom_bpm=None) for _ in range(2)
+    )
+    db_session.add_all([first, second])
+    await db_session.commit()
+
+    with patch("app.music_storage.delete", new_callable=AsyncMock) as mock_delete:
+        await release_music(first, db_session)
+        await db_session.commit()
+        mock_delete.assert_not_called()
+
+        await release_music(second, db_session)
+        await db_session.commit()
+        mock_delete.assert_called_once_with(key)
@@ -0,0 +1,371 @@
+"""Юнит-тесты music_utils.py"""
+import asyncio
+import time
+import tracemalloc
+from tempfile import NamedTemporaryFile, TemporaryFile
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from fastapi import UploadFile
+
+from app.config import settings
+from app.music_utils import (
+    AnalysisQueueFullError,
+    MusicAnalysisPool,
+    BEATS_PER_BAR,
+    PEAKS_LEVELS,
+    PEAKS_SAMPLES_PER_PEAK,
+    AudioMetadata,
+    PeaksBuilder,
+    UploadTooLargeError,
+    WaveformPeaks,
+    decode_beat_times,
+    detect_beats,
+    detect_bpm,
+    encode_beat_times,
+    estimate_beats,
+    estimate_bpm,
+    get_analysis_window_size,
+    get_downbeats,
+    get_middle_window,
+    measure_frames,
+    parse_ffmpeg_input_info,
+    spool_upload,
+)
+from app.s3_helpers import upload_file
+
+MIB = 1024 * 1024
+SAMPLERATE = 22050
+
+
+def get_click_times(bpm: float, seconds: float, offset_seconds: float = 0.0) -> np.ndarray:
+    """Моменты щелчков метронома"""
+    return np.arange(offset_seconds, seconds - 0.05, 60 / bpm)
+
+
+def make_click_track(
+    bpm: float, seconds: float, samplerate: int = SAMPLERATE, offset_seconds: float = 0.0, bar_accent: float = 1.0
+) -> np.ndarray:
+    """Метроном: короткие затухающие синусоидальные щелчки 1 кГц с заданным темпом,
+    каждый BEATS_PER_BAR-й щелчок начиная с первого громче остальных в bar_accent раз"""
+    signal = np.zeros(int(seconds * samplerate), dtype=np.float32)
+    click_time = np.arange(int(0.03 * samplerate)) / samplerate
+    click = (np.sin(2 * np.pi * 1000 * click_time) * np.exp(-click_time / 0.005)).astype(np.float32)
+    for number, beat_time in enumerate(get_click_times(bpm, seconds, offset_seconds)):
+        start = int(beat_time * samplerate)
+        gain = 1.0 if number % BEATS_PER_BAR == 0 else 1 / bar_accent
+        signal[start : start + len(click)] += gain * click
+    return signal
+
+
+def split_frames(signal: np.ndarray, frame_size: int) -> list[np.ndarray]:
+    """Разбиение сигнала на кадры фиксированного размера"""
+    return [signal[start : start + frame_size] for start in range(0, len(signal) - frame_size + 1, frame_size)]
+
+
+def make_upload_file(size: int) -> UploadFile:
+    """Создает UploadFile заданного размера, содержимое которого лежит на диске"""
+    file = TemporaryFile()
+    block = b"\x01" * MIB
+    for _ in range(size // MIB):
+        file.write(block)
+    file.write(b"\x01" * (size % MIB))
+    file.seek(0)
+    return UploadFile(file=file, filename="music.wav")
+
+
+@pytest.mark.asyncio
+async def test_spool_upload():
+    """Тест на копирование загружаемого файла на диск"""
+    upload = make_upload_file(3 * MIB + 17)
+    with NamedTemporaryFile() as destination:
+        written = await spool_upload(upload, destination, chunk_size=MIB, max_size=10 * MIB)
+        assert written == 3 * MIB + 17
+        with open(destination.name, "rb") as spooled:
+            assert spooled.read() == b"\x01" * (3 * MIB + 17)
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_too_large():
+    """Тест на ограничение размера загружаемого файла"""
+    upload = make_upload_file(2 * MIB)
+    with NamedTemporaryFile() as destination:
+        with pytest.raises(UploadTooLargeError):
+            await spool_upload(upload, destination, chunk_size=MIB // 2, max_size=MIB)
+
+
+@pytest.mark.asyncio
+async def test_upload_pipeline_memory_is_flat(monkeypatch):
+    """Пиковое потребление памяти при загрузке не зависит от размера файла"""
+    part_size = 5 * MIB
+    monkeypatch.setattr(settings, "s3_multipart_threshold", part_size)
+    monkeypatch.setattr(settings, "s3_multipart_chunk_size", part_size)
+
+    async def create_multipart_upload(**_):
+        return {"UploadId": "upload_id"}
+
+    async def upload_part(**kwargs):
+        return {"ETag": str(kwargs["PartNumber"])}
+
+    async def complete_multipart_upload(**_):
+        return {}
+
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload = create_multipart_upload
+    s3_client.upload_part = upload_part
+    s3_client.complete_multipart_upload = complete_multipart_upload
+
+    peaks = {}
+    with patch("app.s3_helpers.aioboto3.Session") as mock_session:
+        mock_session.return_value.client.return_value.__aenter__.return_value = s3_client
+        for size in (8 * MIB, 64 * MIB):
+            upload = make_upload_file(size)
+            with NamedTemporaryFile(suffix=".wav") as destination:
+                tracemalloc.start()
+                await spool_upload(upload, destination, chunk_size=MIB // 4, max_size=100 * MIB)
+                await upload_file("test_key", destination.name, "test_bucket")
+                _, peaks[size] = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+    assert peaks[64 * MIB] < part_size + MIB
+    assert abs(peaks[64 * MIB] - peaks[8 * MIB]) < MIB
+
+
+@pytest.mark.parametrize("samplerate, window_size", [(44100, 512), (22050, 256), (16000, 256), (48000, 512)])
+def test_get_analysis_window_size(samplerate: int, window_size: int):
+    """Окно анализа сохраняет длительность ~11.6 мс при разной частоте дискретизации"""
+    assert get_analysis_window_size(samplerate) == window_size
+
+
+@pytest.mark.parametrize("bpm", [80, 100])
+def test_detect_bpm_click_track(bpm: int):
+    """Тест на определение BPM по кадрам PCM"""
+    win_s = get_analysis_window_size(SAMPLERATE)
+    frames = split_frames(make_click_track(bpm=bpm, seconds=60), win_s // 2)
+    detected = detect_bpm(frames, SAMPLERATE, win_s)
+    assert detected is not None
+    assert abs(detected - bpm) <= 1
+
+
+@pytest.mark.parametrize("tempo_engine", [detect_bpm, estimate_bpm])
+def test_detect_bpm_silence(tempo_engine):
+    """Для тишины BPM не определяется"""
+    win_s = get_analysis_window_size(SAMPLERATE)
+    frames = split_frames(np.zeros(SAMPLERATE * 5, dtype=np.float32), win_s // 2)
+    assert tempo_engine(frames, SAMPLERATE, win_s) is None
+
+
+@pytest.mark.parametrize("bpm", [45, 60, 72, 90, 110, 128, 140, 155, 174, 200, 235])
+@pytest.mark.parametrize("samplerate", [16000, 22050, 44100])
+def test_estimate_bpm_accuracy(bpm: int, samplerate: int):
+    """Автокорреляционный алгоритм определяет темп метронома не хуже aubio и без октавных ошибок"""
+    win_s = get_analysis_window_size(samplerate)
+    signal = make_click_track(bpm=bpm, seconds=30, samplerate=samplerate)
+    numpy_bpm = estimate_bpm(split_frames(signal, win_s // 2), samplerate, win_s)
+    aubio_bpm = detect_bpm(split_frames(signal, win_s // 2), samplerate, win_s)
+    assert numpy_bpm is not None
+    assert abs(numpy_bpm - bpm) <= 1
+    if aubio_bpm is not None:
+        assert abs(numpy_bpm - bpm) <= max(abs(aubio_bpm - bpm), 1)
+
+
+@pytest.mark.parametrize("bpm", [60, 97, 128, 174])
+@pytest.mark.parametrize("tempo_engine", [detect_beats, estimate_beats])
+def test_beats_click_track(bpm: int, tempo_engine):
+    """Доли совпадают со щелчками метронома, сильные доли - с акцентированными щелчками"""
+    win_s = get_analysis_window_size(SAMPLERATE)
+    frame_rate = SAMPLERATE / (win_s // 2)
+    signal = make_click_track(bpm=bpm, seconds=30, offset_seconds=0.37, bar_accent=2)
+    click_times = get_click_times(bpm=bpm, seconds=30, offset_seconds=0.37)
+
+    frame_energy: list[float] = []
+    detected_bpm, beat_times = tempo_engine(
+        measure_frames(split_frames(signal, win_s // 2), frame_energy), SAMPLERATE, win_s
+    )
+    assert len(beat_times) > 1
+    assert np.abs(beat_times[:, None] - click_times[None, :]).min(axis=1).max() < 2 / frame_rate
+    if tempo_engine is detect_beats and abs(detected_bpm - bpm) > 1:
+        # aubio ошибается на октаву, сильные доли для половинного темпа не определены
+        return
+    downbeat_times = get_downbeats(beat_times, np.array(frame_energy), frame_rate)
+    assert np.abs(downbeat_times[:, None] - click_times[None, ::BEATS_PER_BAR]).min(axis=1).max() < 2 / frame_rate
+
+
+def test_estimate_beats_full_grid():
+    """Равномерная сетка долей покрывает весь фрагмент без пропусков"""
+    win_s = get_analysis_window_size(SAMPLERATE)
+    signal = make_click_track(bpm=120, seconds=30, offset_seconds=0.2)
+    _, beat_times = estimate_beats(split_frames(signal, win_s // 2), SAMPLERATE, win_s)
+    assert beat_times[0] < 0.5
+    assert np.allclose(np.diff(beat_times), 0.5, atol=1e-3)
+    assert len(beat_times) == 60
+
+
+def test_encode_beat_times():
+    """Упакованные разностями в float32 моменты долей восстанавливаются с точностью 0.1 мс"""
+    beat_times = np.cumsum(np.random.default_rng(0).uniform(0.2, 1.5, 2000))
+    data = encode_beat_times(beat_times)
+    assert len(data) == 4 * len(beat_times)
+    assert np.abs(np.array(decode_beat_times(data)) - beat_times).max() <= 1e-4
+    assert not decode_beat_times(encode_beat_times([]))
+
+
+@pytest.mark.parametrize(
+    "duration_seconds, window_seconds, window",
+    [(300, 60, (120, 180)), (61, 60, (0.5, 60.5)), (41.5, 60, (0, 41.5))],
+)
+def test_get_middle_window(duration_seconds: float, window_seconds: float, window: tuple[float, float]):
+    """Фрагмент для определения BPM берется из середины трека"""
+    assert get_middle_window(duration_seconds, window_seconds) == window
+
+
+@pytest.mark.parametrize("seconds", [0.001, 7.3, 200])
+def test_peaks_builder(seconds: float):
+    """Пики совпадают с min/max по отрезкам сигнала на всех уровнях детализации"""
+    rng = np.random.default_rng(0)
+    signal = (rng.uniform(-1, 1, int(seconds * SAMPLERATE)) * np.linspace(0, 1, int(seconds * SAMPLERATE))).astype(
+        np.float32
+    )
+    peaks_builder = PeaksBuilder()
+    for start in range(0, len(signal), 128):
+        peaks_builder.add(signal[start : start + 128])
+    peaks = peaks_builder.build(SAMPLERATE)
+
+    assert peaks.count == -(-len(signal) // PEAKS_SAMPLES_PER_PEAK)
+    assert sum(len(peaks.level(level)) for level in range(PEAKS_LEVELS)) == len(peaks.data)
+    for level in range(PEAKS_LEVELS):
+        samples_per_peak = WaveformPeaks.samples_per_peak(level)
+        expected = np.array(
+            [
+                (signal[start : start + samples_per_peak].min(), signal[start : start + samples_per_peak].max())
+                for start in range(0, len(signal), samples_per_peak)
+            ]
+        )
+        actual = np.frombuffer(peaks.level(level), dtype=np.int8).reshape(-1, 2)
+        assert len(actual) == WaveformPeaks.level_count(peaks.count, level) == len(expected)
+        assert np.abs(actual - np.rint(expected * 127)).max() <= 1
+
+
+MP3_STEREO_LOG = """Input #0, mp3, from 'metronome.mp3':
+  Metadata:
+    encoder         : Lavf58.76.100
+  Duration: 00:00:41.62, start: 0.025057, bitrate: 320 kb/s
+  Stream #0:0: Audio: mp3, 48000 Hz, stereo, fltp, 320 kb/s
+Stream mapping:
+  Stream #0:0 -> #0:0 (mp3 (mp3float) -> pcm_f32le (native))
+Output #0, f32le, to 'pipe:':
+  Stream #0:0: Audio: pcm_f32le, 22050 Hz, mono, flt, 705 kb/s
+"""
+WAV_SURROUND_LOG = """Input #0, wav, from 'surround.wav':
+  Duration: 01:02:03.50, bitrate: N/A
+  Stream #0:0: Audio: pcm_s24le ([1][0][0][0] / 0x0001), 96000 Hz, 5.1(side), s32 (24 bit), 13824 kb/s
+Stream mapping:
+"""
+MULTICHANNEL_LOG = """Input #0, flac, from 'multichannel.flac':
+  Duration: N/A, start: 0.000000, bitrate: N/A
+  Stream #0:0: Audio: flac, 44100 Hz, 10 channels, s16
+"""
+
+
+@pytest.mark.parametrize(
+    "ffmpeg_log, metadata",
+    [
+        (
+            MP3_STEREO_LOG,
+            AudioMetadata(duration_seconds=41.62, codec="mp3", bitrate=320000, sample_rate=48000, channels=2),
+        ),
+        (
+            WAV_SURROUND_LOG,
+            AudioMetadata(duration_seconds=3723.5, codec="pcm_s24le", bitrate=13824000, sample_rate=96000, channels=6),
+        ),
+        (MULTICHANNEL_LOG, AudioMetadata(codec="flac", sample_rate=44100, channels=10)),
+        ("README.md: Invalid data found when processing input\n", AudioMetadata()),
+    ],
+)
+def test_parse_ffmpeg_input_info(ffmpeg_log: str, metadata: AudioMetadata):
+    """Метаданные берутся только из описания входного файла, а не выходного потока"""
+    assert parse_ffmpeg_input_info(ffmpeg_log) == metadata
+
+
+@pytest.fixture(name="analysis_pool")
+def analysis_pool_fixture():
+    """Пул процессов для анализа с одним процессом и без очереди"""
+    pool = MusicAnalysisPool(max_workers=1, max_queue=0, timeout_seconds=5)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_analysis_pool_run(analysis_pool: MusicAnalysisPool):
+    """Тест на выполнение задачи в пуле процессов"""
+    assert await analysis_pool.run(pow, 2, 10) == 1024
+    assert analysis_pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_analysis_pool_does_not_block_event_loop(analysis_pool: MusicAnalysisPool):
+    """Пока задача выполняется в пуле, event loop продолжает обрабатывать другие корутины"""
+    await analysis_pool.run(pow, 1, 1)  # прогрев пула
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    await analysis_pool.run(time.sleep, 0.5)
+    ticker_task.cancel()
+    assert ticks > 10
+
+
+@pytest.mark.asyncio
+async def test_analysis_pool_queue_full(analysis_pool: MusicAnalysisPool):
+    """Тест на отклонение задачи при переполненной очереди"""
+    running = asyncio.create_task(analysis_pool.run(time.sleep, 0.5))
+    await asyncio.sleep(0)
+    with pytest.raises(AnalysisQueueFullError):
+        await analysis_pool.run(pow, 2, 10)
+    await running
+    assert await analysis_pool.run(pow, 2, 10) == 1024
+
+
+@pytest.mark.asyncio
+async def test_analysis_pool_timeout(analysis_pool: MusicAnalysisPool):
+    """По таймауту место в очереди освобождается только после завершения задачи в процессе"""
+    analysis_pool.timeout_seconds = 0.1
+    with pytest.raises(TimeoutError):
+        await analysis_pool.run(time.sleep, 0.5)
+    assert analysis_pool.in_flight == 1
+    with pytest.raises(AnalysisQueueFullError):
+        await analysis_pool.run(pow, 2, 10)
+
+    async with asyncio.timeout(5):
+        while analysis_pool.in_flight:
+            await asyncio.sleep(0.05)
+    analysis_pool.timeout_seconds = 5
+    assert await analysis_pool.run(pow, 2, 10) == 1024
+
+
+@pytest.mark.asyncio
+async def test_analysis_pool_cancel_queued():
+    """Отмена ожидания снимает задачу из очереди пула и сразу освобождает ее место"""
+    pool = MusicAnalysisPool(max_workers=1, max_queue=2, timeout_seconds=5)
+    try:
+        running = asyncio.create_task(pool.run(time.sleep, 0.5))
+        # пул заранее передает процессу еще одну задачу, снять ее уже нельзя
+        prefetched = asyncio.create_task(pool.run(pow, 2, 10))
+        queued = asyncio.create_task(pool.run(time.sleep, 5))
+        await asyncio.sleep(0.1)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert pool.in_flight == 2
+        await running
+        assert await prefetched == 1024
+        assert pool.in_flight == 0
+    finally:
+        pool.shutdown()
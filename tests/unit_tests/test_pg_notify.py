@@ -0,0 +1,65 @@
+"""Юнит-тесты pg_notify.py"""
+import asyncio
+
+import pytest
+
+from app.pg_notify import PostgresNotifyChannel
+
+from tests.fake_postgres import POSTGRES_URL, FakePostgres
+
+
+@pytest.mark.asyncio
+async def test_notify_delivers_to_all_channels(fake_postgres: FakePostgres):
+    """Payload доходит до обработчиков всех процессов, подписанных на канал"""
+    received: list[tuple[str, str]] = []
+    first = PostgresNotifyChannel(POSTGRES_URL, "changes")
+    second = PostgresNotifyChannel(POSTGRES_URL, "changes")
+    await first.start(lambda payload: received.append(("first", payload)))
+    await second.start(lambda payload: received.append(("second", payload)))
+    try:
+        await first.notify("hello")
+        assert received == [("first", "hello"), ("second", "hello")]
+    finally:
+        await first.close()
+        await second.close()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_after_connection_drop(fake_postgres: FakePostgres):
+    """После обрыва соединения канал переподключается, пока не получится, и сообщает о переподключении"""
+    received: list[str] = []
+    reconnected = asyncio.Event()
+    channel = PostgresNotifyChannel(POSTGRES_URL, "changes", reconnect_delay_seconds=0.01)
+    await channel.start(received.append, reconnected.set)
+    try:
+        fake_postgres.restart(failures=2)
+        assert not channel.is_connected
+        with pytest.raises(RuntimeError):
+            await channel.notify("lost")
+
+        await asyncio.wait_for(reconnected.wait(), 1)
+        assert channel.is_connected
+        assert len(fake_postgres.connections) == 2
+        await channel.notify("after restart")
+        assert received == ["after restart"]
+    finally:
+        await channel.close()
+
+
+@pytest.mark.asyncio
+async def test_close_stops_reconnect(fake_postgres: FakePostgres):
+    """Закрытый канал не переподключается, в том числе если закрыт во время переподключения"""
+    channel = PostgresNotifyChannel(POSTGRES_URL, "changes", reconnect_delay_seconds=0.01)
+    await channel.start(lambda payload: None)
+    await channel.close()
+    await asyncio.sleep(0.05)
+    assert len(fake_postgres.connections) == 1
+
+    await channel.start(lambda payload: None)
+    fake_postgres.restart(failures=100)
+    await asyncio.sleep(0.03)
+    await channel.close()
+    fake_postgres.failures = 0
+    await asyncio.sleep(0.05)
+    assert len(fake_postgres.connections) == 2
+    assert not channel.is_connected
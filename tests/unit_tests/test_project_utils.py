@@ -0,0 +1,108 @@
+"""Юнит-тесты project_utils.py"""
+import datetime
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    MusicJobModel,
+    MusicModel,
+    ProjectGrantCodeModel,
+    ProjectGrantModel,
+    ProjectModel,
+    TextModel,
+)
+from app.models.grant import GrantLevel
+from app.models.music_job import MusicJobStatus
+from app.project_utils import decode_project_cursor, delete_projects, encode_project_cursor
+
+OWNER_ID = uuid.uuid4()
+
+
+async def create_project(db_session: AsyncSession, music_key: str) -> ProjectModel:
+    """Проект с двумя текстами, музыкой, задачей обработки музыки, кодом доступа и правом"""
+    project = ProjectModel(owner_user_id=OWNER_ID)
+    db_session.add(project)
+    await db_session.flush()
+    music = MusicModel(project_id=project.project_id, url=music_key, duration_seconds=41.6)
+    grant_code = ProjectGrantCodeModel(
+        project_id=project.project_id, issuer_user_id=OWNER_ID, level=GrantLevel.READ_ONLY, max_activations=1
+    )
+    db_session.add_all(
+        [music, grant_code, TextModel(project_id=project.project_id), TextModel(project_id=project.project_id)]
+    )
+    await db_session.flush()
+    db_session.add_all(
+        [
+            MusicJobModel(music_id=music.music_id, status=MusicJobStatus.DONE, attempts=1),
+            ProjectGrantModel(
+                project_id=project.project_id,
+                user_id=uuid.uuid4(),
+                grant_code_id=grant_code.grant_code_id,
+                level=GrantLevel.READ_ONLY,
+            ),
+        ]
+    )
+    await db_session.commit()
+    return project
+
+
+async def count_rows(db_session: AsyncSession, model) -> int:
+    """Количество строк в таблице модели"""
+    # pylint: disable=not-callable
+    return (await db_session.scalars(select(func.count()).select_from(model))).one()
+    # pylint: enable=not-callable
+
+
+@pytest.mark.asyncio
+async def test_delete_projects(db_session: AsyncSession):
+    """Строки проектов удаляются целиком, с s3 удаляются только объекты без других ссылок, документы из TipTap"""
+    shared_key = f"music/{'a' * 64}.mp3"
+    deleted = [await create_project(db_session, shared_key), await create_project(db_session, "project/music/own.mp3")]
+    kept = await create_project(db_session, shared_key)
+    deleted_ids = [project.project_id for project in deleted]
+    text_ids = set(await db_session.scalars(select(TextModel.text_id).where(TextModel.project_id.in_(deleted_ids))))
+    tiptap_client = AsyncMock()
+    tiptap_client.delete_documents.return_value = []
+
+    with (
+        patch("app.project_utils.list_keys", new_callable=AsyncMock, side_effect=[[], ["leftover/old.mp3"]]),
+        patch("app.music_storage.delete_many", new_callable=AsyncMock, return_value=[]) as mock_delete_many,
+    ):
+        await delete_projects(deleted_ids, db_session, tiptap_client)
+
+    assert set(await db_session.scalars(select(ProjectModel.project_id))) == {kept.project_id}
+    assert await count_rows(db_session, TextModel) == 2
+    assert await count_rows(db_session, MusicModel) == 1
+    assert await count_rows(db_session, MusicJobModel) == 1
+    assert await count_rows(db_session, ProjectGrantModel) == 1
+    assert await count_rows(db_session, ProjectGrantCodeModel) == 1
+    mock_delete_many.assert_called_once_with(["leftover/old.mp3", "project/music/own.mp3"])
+    tiptap_client.delete_documents.assert_called_once()
+    assert set(tiptap_client.delete_documents.call_args.args[0]) == {str(id_) for id_ in text_ids}
+
+
+@pytest.mark.asyncio
+async def test_delete_projects_cleanup_errors(db_session: AsyncSession):
+    """Ошибки s3 и TipTap не отменяют удаление проекта"""
+    project = await create_project(db_session, "project/music/own.mp3")
+    tiptap_client = AsyncMock()
+    tiptap_client.delete_documents.side_effect = ConnectionError
+
+    with patch("app.project_utils.list_keys", new_callable=AsyncMock, side_effect=ConnectionError):
+        await delete_projects([project.project_id], db_session, tiptap_client)
+
+    assert await count_rows(db_session, ProjectModel) == 0
+    tiptap_client.delete_documents.assert_called_once()
+
+
+def test_project_cursor():
+    """Курсор содержит ключ сортировки последнего проекта страницы"""
+    project = ProjectModel(project_id=uuid.uuid4(), updated_at=datetime.datetime(2026, 10, 18, 12, 30, 15, 123456))
+    assert decode_project_cursor(encode_project_cursor(project)) == (project.updated_at, project.project_id)
+    for cursor in ("not a cursor", "bm90IGEgY3Vyc29y", encode_project_cursor(project)[:-4]):
+        with pytest.raises(ValueError):
+            decode_project_cursor(cursor)
@@ -2,16 +2,30 @@
 from unittest.mock import MagicMock, patch, AsyncMock
 
 import pytest
-from app.s3_helpers import upload, generate_presigned_url, delete
+from app.config import settings
+from app.s3_helpers import (
+    S3ClientManager,
+    S3_DELETE_BATCH_SIZE,
+    delete,
+    delete_many,
+    download_file,
+    generate_presigned_url,
+    list_keys,
+    presigned_url_cache,
+    upload,
+    upload_file,
+)
 
 
 @pytest.fixture(name="mock_aioboto3_session")
 def mock_aioboto3_session_fixture():
     """Фикстура-мок aioboto3 сессии для работы с S3"""
+    presigned_url_cache.clear()
     with patch("app.s3_helpers.aioboto3.Session") as mock_session:
         mock_s3_client = MagicMock()
         mock_session.return_value.client.return_value.__aenter__.return_value = mock_s3_client
         yield mock_s3_client
+    presigned_url_cache.clear()
 
 
 @pytest.mark.asyncio
@@ -25,14 +39,34 @@ async def test_upload_success(mock_aioboto3_session):
 
 @pytest.mark.asyncio
 async def test_generate_presigned_url_success(mock_aioboto3_session):
-    """Тест на генерацию пресайнед URL для объекта в S3"""
-    expected_url = "https://test.url"
-    mock_aioboto3_session.generate_presigned_url = AsyncMock(return_value=expected_url)
+    """Тест на генерацию пресайнед URL для объекта в S3: ссылка подписывается локально, без клиента s3"""
+    mock_aioboto3_session.generate_presigned_url = AsyncMock()
     response = await generate_presigned_url("test_key", "test_bucket")
-    assert response == expected_url
-    mock_aioboto3_session.generate_presigned_url.assert_called_once_with(
-        "get_object", Params={"Bucket": "test_bucket", "Key": "test_key"}, ExpiresIn=3600
-    )
+    assert response.startswith("https://storage.yandexcloud.net/test_bucket/test_key?X-Amz-Algorithm=AWS4-HMAC-SHA256&")
+    assert "X-Amz-Expires=3600&" in response
+    mock_aioboto3_session.generate_presigned_url.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generate_presigned_url_cache(mock_aioboto3_session, monkeypatch):
+    """Ссылка переиспользуется, пока у нее остается достаточный срок действия, и сбрасывается при удалении файла"""
+    now = [0.0]
+    monkeypatch.setattr(presigned_url_cache, "_timer", lambda: now[0])
+    monkeypatch.setattr(settings, "s3_presigned_url_min_ttl_seconds", 900)
+    mock_aioboto3_session.delete_object = AsyncMock()
+
+    with patch(
+        "app.s3_helpers.presign_get_object", side_effect=["https://a", "https://b", "https://c"]
+    ) as mock_presign:
+        assert await generate_presigned_url("test_key", "test_bucket") == "https://a"
+        now[0] = 3600 - 900 - 1
+        assert await generate_presigned_url("test_key", "test_bucket") == "https://a"
+        now[0] = 3600 - 900
+        assert await generate_presigned_url("test_key", "test_bucket") == "https://b"
+
+        await delete("test_key", "test_bucket")
+        assert await generate_presigned_url("test_key", "test_bucket") == "https://c"
+        assert mock_presign.call_count == 3
 
 
 @pytest.mark.asyncio
@@ -41,3 +75,126 @@ async def test_delete_success(mock_aioboto3_session):
     mock_aioboto3_session.delete_object = AsyncMock(return_value="success")
     await delete("test_key", "test_bucket")
     mock_aioboto3_session.delete_object.assert_called_once_with(Bucket="test_bucket", Key="test_key")
+
+
+@pytest.mark.asyncio
+async def test_upload_file_small(mock_aioboto3_session, tmp_path):
+    """Тест на загрузку небольшого файла в S3 одним запросом"""
+    file_path = tmp_path / "music.mp3"
+    file_path.write_bytes(b"test_data")
+    mock_aioboto3_session.put_object = AsyncMock(return_value="success")
+    response = await upload_file("test_key", str(file_path), "test_bucket")
+    assert response == "s3://test_key"
+    mock_aioboto3_session.put_object.assert_called_once_with(Bucket="test_bucket", Key="test_key", Body=b"test_data")
+
+
+@pytest.mark.asyncio
+async def test_upload_file_multipart(mock_aioboto3_session, tmp_path, monkeypatch):
+    """Тест на загрузку большого файла в S3 через multipart upload"""
+    monkeypatch.setattr(settings, "s3_multipart_threshold", 10)
+    monkeypatch.setattr(settings, "s3_multipart_chunk_size", 4)
+    file_path = tmp_path / "music.mp3"
+    file_path.write_bytes(b"0123456789ab")
+    mock_aioboto3_session.create_multipart_upload = AsyncMock(return_value={"UploadId": "upload_id"})
+    mock_aioboto3_session.upload_part = AsyncMock(side_effect=[{"ETag": "a"}, {"ETag": "b"}, {"ETag": "c"}])
+    mock_aioboto3_session.complete_multipart_upload = AsyncMock()
+
+    await upload_file("test_key", str(file_path), "test_bucket")
+
+    bodies = [call.kwargs["Body"] for call in mock_aioboto3_session.upload_part.call_args_list]
+    assert bodies == [b"0123", b"4567", b"89ab"]
+    mock_aioboto3_session.complete_multipart_upload.assert_called_once_with(
+        Bucket="test_bucket",
+        Key="test_key",
+        UploadId="upload_id",
+        MultipartUpload={
+            "Parts": [{"ETag": "a", "PartNumber": 1}, {"ETag": "b", "PartNumber": 2}, {"ETag": "c", "PartNumber": 3}]
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_file_multipart_abort(mock_aioboto3_session, tmp_path, monkeypatch):
+    """Тест на отмену multipart upload при ошибке загрузки части"""
+    monkeypatch.setattr(settings, "s3_multipart_threshold", 1)
+    file_path = tmp_path / "music.mp3"
+    file_path.write_bytes(b"test_data")
+    mock_aioboto3_session.create_multipart_upload = AsyncMock(return_value={"UploadId": "upload_id"})
+    mock_aioboto3_session.upload_part = AsyncMock(side_effect=ConnectionError)
+    mock_aioboto3_session.abort_multipart_upload = AsyncMock()
+
+    with pytest.raises(ConnectionError):
+        await upload_file("test_key", str(file_path), "test_bucket")
+
+    mock_aioboto3_session.abort_multipart_upload.assert_called_once_with(
+        Bucket="test_bucket", Key="test_key", UploadId="upload_id"
+    )
+
+
+@pytest.mark.asyncio
+async def test_download_file(mock_aioboto3_session, tmp_path, monkeypatch):
+    """Тест на потоковое скачивание файла из S3 частями"""
+    monkeypatch.setattr(settings, "music_upload_chunk_size", 4)
+    body = MagicMock()
+    body.__aenter__.return_value.read = AsyncMock(side_effect=[b"0123", b"4567", b"89", b""])
+    mock_aioboto3_session.get_object = AsyncMock(return_value={"Body": body})
+    file_path = tmp_path / "music.mp3"
+
+    written = await download_file("test_key", str(file_path), "test_bucket")
+
+    assert written == 10
+    assert file_path.read_bytes() == b"0123456789"
+    mock_aioboto3_session.get_object.assert_called_once_with(Bucket="test_bucket", Key="test_key")
+    body.__aenter__.return_value.read.assert_called_with(4)
+
+
+@pytest.mark.asyncio
+async def test_shared_client():
+    """Запущенный менеджер переиспользует один клиент, закрытие закрывает его"""
+    with patch("app.s3_helpers.aioboto3.Session") as mock_session:
+        client_context = mock_session.return_value.client.return_value
+        client_context.__aenter__.return_value = MagicMock()
+        manager = S3ClientManager(max_pool_connections=5)
+        await manager.start()
+        clients = []
+        for _ in range(3):
+            async with manager.client() as s3_client:
+                clients.append(s3_client)
+        assert clients == [client_context.__aenter__.return_value] * 3
+        mock_session.assert_called_once()
+        assert mock_session.return_value.client.call_args.kwargs["config"].max_pool_connections == 5
+
+        await manager.close()
+        client_context.__aexit__.assert_called_once()
+        async with manager.client():
+            pass
+        assert mock_session.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_delete_many(mock_aioboto3_session):
+    """Тест на удаление объектов из S3 пачками DeleteObjects"""
+    keys = [f"key_{number}" for number in range(S3_DELETE_BATCH_SIZE + 2)]
+    mock_aioboto3_session.delete_objects = AsyncMock(side_effect=[{}, {"Errors": [{"Key": "key_1001"}]}])
+
+    failed = await delete_many([*keys, "key_0"], "test_bucket")
+
+    assert failed == ["key_1001"]
+    batches = [call.kwargs["Delete"]["Objects"] for call in mock_aioboto3_session.delete_objects.call_args_list]
+    assert [len(batch) for batch in batches] == [S3_DELETE_BATCH_SIZE, 2]
+    assert batches[1] == [{"Key": "key_1000"}, {"Key": "key_1001"}]
+
+
+@pytest.mark.asyncio
+async def test_list_keys(mock_aioboto3_session):
+    """Тест на получение всех ключей с префиксом по страницам"""
+
+    async def paginate(**_):
+        yield {"Contents": [{"Key": "project/a.mp3"}, {"Key": "project/b.mp3"}]}
+        yield {"Contents": [{"Key": "project/c.mp3"}]}
+        yield {}
+
+    mock_aioboto3_session.get_paginator.return_value.paginate = paginate
+
+    assert await list_keys("project/", "test_bucket") == ["project/a.mp3", "project/b.mp3", "project/c.mp3"]
+    mock_aioboto3_session.get_paginator.assert_called_once_with("list_objects_v2")
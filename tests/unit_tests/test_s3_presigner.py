@@ -0,0 +1,73 @@
+"""Юнит-тесты s3_presigner.py"""
+import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import aioboto3
+import pytest
+
+from app.s3_helpers import S3_ENDPOINT_URL, S3_REGION
+from app.s3_presigner import get_signing_key, presign_get_object
+
+ACCESS_KEY = "YCAJEexampleaccesskey"
+SECRET_KEY = "YCexample/secret+key"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "key",
+    [
+        "0b8e9a3c-6f41-4d2b-9c77-1a2b3c4d5e6f/music/Track 1.mp3",
+        "music/3f2a.mp3",
+        "проект/музыка (1)!*'.mp3",
+        "a//b/./c?&=#%+~.mp3",
+    ],
+)
+@pytest.mark.parametrize("expiration", [60, 3600, 604800])
+async def test_presign_get_object_matches_botocore(key: str, expiration: int):
+    """Ссылка совпадает с подписанной botocore побайтно"""
+    session = aioboto3.Session(aws_access_key_id=ACCESS_KEY, aws_secret_access_key=SECRET_KEY, region_name=S3_REGION)
+    async with session.client("s3", endpoint_url=S3_ENDPOINT_URL) as s3_client:
+        expected = await s3_client.generate_presigned_url(
+            "get_object", Params={"Bucket": "lyrics-bucket", "Key": key}, ExpiresIn=expiration
+        )
+    signed_at = datetime.datetime.strptime(parse_qs(urlsplit(expected).query)["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ")
+
+    url = presign_get_object(
+        "lyrics-bucket",
+        key,
+        expiration,
+        endpoint_url=S3_ENDPOINT_URL,
+        region=S3_REGION,
+        access_key=ACCESS_KEY,
+        secret_key=SECRET_KEY,
+        now=signed_at,
+    )
+    assert url == expected
+
+
+def test_signing_key_is_cached_per_day():
+    """Ключ подписи вычисляется один раз в сутки"""
+    get_signing_key.cache_clear()
+    for second in range(3):
+        presign_get_object(
+            "lyrics-bucket",
+            "music/3f2a.mp3",
+            3600,
+            endpoint_url=S3_ENDPOINT_URL,
+            region=S3_REGION,
+            access_key=ACCESS_KEY,
+            secret_key=SECRET_KEY,
+            now=datetime.datetime(2026, 10, 18, 23, 59, 57 + second),
+        )
+    assert get_signing_key.cache_info().misses == 1  # pylint: disable=no-value-for-parameter
+    presign_get_object(
+        "lyrics-bucket",
+        "music/3f2a.mp3",
+        3600,
+        endpoint_url=S3_ENDPOINT_URL,
+        region=S3_REGION,
+        access_key=ACCESS_KEY,
+        secret_key=SECRET_KEY,
+        now=datetime.datetime(2026, 10, 19),
+    )
+    assert get_signing_key.cache_info().misses == 2  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,80 @@
+"""Юнит-тесты tiptap_utils.py"""
+from typing import Iterator
+
+import httpx
+import pytest
+
+from app.tiptap_utils import TipTapClient
+
+
+def make_client(handler, **kwargs) -> TipTapClient:
+    """Клиент TipTap с подменой сети"""
+    return TipTapClient(
+        app_id="app", api_secret="secret", retry_delay_seconds=0, transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_client_retries():
+    """Запросы идут через общий клиент с ключом API и повторяются при 5xx и сетевых ошибках"""
+    requests: list[httpx.Request] = []
+    responses: Iterator[httpx.Response | httpx.TransportError] = iter(
+        [httpx.ConnectError("reset"), httpx.Response(503), httpx.Response(204)]
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    tiptap_client = make_client(handler, retries=2)
+    await tiptap_client.start()
+    async with tiptap_client.client() as first, tiptap_client.client() as second:
+        assert first is second
+    assert await tiptap_client.delete_document("text") is True
+    await tiptap_client.close()
+
+    assert len(requests) == 3
+    assert requests[0].url == "https://app.collab.tiptap.cloud/api/documents/text"
+    assert requests[0].headers["Authorization"] == "secret"
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted():
+    """Когда повторы кончились, возвращается последний ответ или пробрасывается сетевая ошибка"""
+    assert await make_client(lambda request: httpx.Response(503), retries=1).delete_document("text") is False
+
+    def unreachable(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("unreachable", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        await make_client(unreachable, retries=1).delete_document("text")
+
+
+@pytest.mark.asyncio
+async def test_delete_retried_not_found():
+    """404 на повторное удаление - успех: документ удалила попытка, ответ на которую потерян"""
+    responses = iter([httpx.Response(503), httpx.Response(404)])
+    assert await make_client(lambda request: next(responses), retries=1).delete_document("text") is True
+
+
+@pytest.mark.asyncio
+async def test_batch_operations():
+    """Пакетное удаление возвращает неудаленные документы, чтение отличает отсутствующие документы"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.path.rsplit("/", 1)[-1]
+        if request.method == "DELETE":
+            return httpx.Response(404 if name == "missing" else 204)
+        if name == "documents":
+            return httpx.Response(200, json=[{"name": "a"}])
+        if name == "missing":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"type": "doc", "name": name})
+
+    tiptap_client = make_client(handler, concurrency=2)
+    assert await tiptap_client.delete_documents(["a", "missing", "b"]) == ["missing"]
+    assert await tiptap_client.get_documents(["a", "missing"]) == {"a": {"type": "doc", "name": "a"}, "missing": None}
+    assert await tiptap_client.list_documents() == [{"name": "a"}]
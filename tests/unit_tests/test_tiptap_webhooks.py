@@ -0,0 +1,90 @@
+"""Юнит-тесты tiptap_webhooks.py"""
+import contextlib
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.change_feed import change_feed
+from app.models import ProjectModel, TextModel
+from app.tiptap_webhooks import DocumentUpdateBuffer, touch_texts
+
+OLD_UPDATED_AT = datetime.datetime(2026, 1, 1)
+
+
+async def create_texts(db_session: AsyncSession, count: int) -> list[TextModel]:
+    """Проект с count текстами, измененными давно"""
+    project = ProjectModel(owner_user_id=uuid.uuid4(), updated_at=OLD_UPDATED_AT)
+    db_session.add(project)
+    await db_session.flush()
+    texts = [TextModel(project_id=project.project_id, updated_at=OLD_UPDATED_AT) for _ in range(count)]
+    db_session.add_all(texts)
+    await db_session.commit()
+    return texts
+
+
+@pytest.mark.asyncio
+async def test_document_update_buffer_coalesces(db_session: AsyncSession, sql_statements: list[str]):
+    """Повторные обновления документов объединяются и записываются двумя UPDATE за пачку"""
+
+    @contextlib.asynccontextmanager
+    async def session_factory():
+        yield db_session
+
+    texts = await create_texts(db_session, 3)
+    buffer = DocumentUpdateBuffer(flush_interval_seconds=3600, session_factory=session_factory)
+    buffer.start()
+    try:
+        for _ in range(50):
+            for text in texts[:2]:
+                await buffer.submit(text.text_id, db_session)
+        await buffer.submit(uuid.uuid4(), db_session)
+        assert not [statement for statement in sql_statements if statement.startswith("UPDATE")]
+
+        sql_statements.clear()
+        assert await buffer.flush() == 2
+        assert [statement.split()[1] for statement in sql_statements if statement.startswith("UPDATE")] == [
+            "text",
+            "project",
+        ]
+        assert await buffer.flush() == 0
+    finally:
+        await buffer.stop()
+
+    updated_at = dict((await db_session.execute(select(TextModel.text_id, TextModel.updated_at))).tuples().all())
+    assert updated_at[texts[0].text_id] > OLD_UPDATED_AT
+    assert updated_at[texts[1].text_id] > OLD_UPDATED_AT
+    assert updated_at[texts[2].text_id] == OLD_UPDATED_AT
+    project_updated_at = await db_session.scalar(select(ProjectModel.updated_at))
+    assert project_updated_at is not None and project_updated_at > OLD_UPDATED_AT
+
+
+@pytest.mark.asyncio
+async def test_document_update_buffer_not_started(db_session: AsyncSession):
+    """До start обновление записывается сразу"""
+    [text] = await create_texts(db_session, 1)
+    buffer = DocumentUpdateBuffer(flush_interval_seconds=3600)
+    await buffer.submit(text.text_id, db_session)
+    text_updated_at = await db_session.scalar(select(TextModel.updated_at))
+    assert text_updated_at is not None and text_updated_at > OLD_UPDATED_AT
+
+
+@pytest.mark.asyncio
+async def test_touch_texts_resolves_audience_once(db_session: AsyncSession, sql_statements: list[str]):
+    """Получатели событий всех текстов пачки определяются одним запросом, каждый текст - отдельное событие"""
+    texts = await create_texts(db_session, 2) + await create_texts(db_session, 2)
+    owners = dict(
+        (await db_session.execute(select(ProjectModel.project_id, ProjectModel.owner_user_id))).tuples().all()
+    )
+    with contextlib.ExitStack() as stack:
+        queues = [stack.enter_context(change_feed.subscribe(owner_id)) for owner_id in owners.values()]
+        sql_statements.clear()
+        assert len(await touch_texts([text.text_id for text in texts], db_session)) == 4
+        assert len([statement for statement in sql_statements if statement.startswith("SELECT")]) == 1
+        events = [queue.get_nowait() for queue in queues for _ in range(queue.qsize())]
+
+    assert sorted((event.text_id, event.user_ids) for event in events) == sorted(
+        (text.text_id, [owners[text.project_id]]) for text in texts
+    )